@@ -1,5 +1,4 @@
 import streamlit as st
-import pandas as pd
 
 
 st.markdown("<h3 style='text-align: center;'>🍽️LOCAL FOOD WASTE MANAGEMENT SYSTEM🌍</h3>", unsafe_allow_html=True)
@@ -1,126 +1,92 @@
 import streamlit as st
 import pandas as pd
-import sqlite3
 import os
+import sqlite3
+import db
+import batches
+import bulk_import
+import frames
+import operations
+import search
 from datetime import date
 
 st.header('🍽️🥘 Food Listings')
 
 # Paths
-DB_PATH = 'D:/Guvi_Project1/env/Scripts/Local_food_WM.db'
-CSV_PATH = 'D:/Guvi_Project1/dataset/Food_listings_data.csv'
-
-# Show existing listings
-st.subheader("📋 All Listed Food Items")
-if os.path.exists(CSV_PATH):
-    food_df = pd.read_csv(CSV_PATH)
-else:
-    food_df = pd.DataFrame(columns=[
-        "Food_ID", "Food_Name", "Quantity", "Expiry_Date",
-        "Provider_ID", "Provider_Type", "Location", "Food_Type", "Meal_Type"
-    ])
-st.dataframe(food_df, use_container_width=True)
+CSV_PATH = operations.CSV_PATHS['food_listings']
+journal = operations.journal('food_listings')
 
 # Initialize database
 def initialize_db():
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS food_listings (
-            Food_ID INTEGER PRIMARY KEY AUTOINCREMENT,
-            Food_Name TEXT,
-            Quantity INTEGER,
-            Expiry_Date TEXT,
-            Provider_ID INTEGER,
-            Provider_Type TEXT,
-            Location TEXT,
-            Food_Type TEXT,
-            Meal_Type TEXT
-        )
-    ''')
-    conn.commit()
-
-    # Load from CSV if table is empty
-    cursor.execute("SELECT COUNT(*) FROM food_listings")
-    count = cursor.fetchone()[0]
-    if count == 0 and os.path.exists(CSV_PATH):
-        df = pd.read_csv(CSV_PATH)
-        df.to_sql('food_listings', conn, if_exists='append', index=False)
-    conn.close()
+    with db.transaction() as conn:
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS food_listings (
+                Food_ID INTEGER PRIMARY KEY AUTOINCREMENT,
+                Food_Name TEXT,
+                Quantity INTEGER,
+                Expiry_Date TEXT,
+                Provider_ID INTEGER,
+                Provider_Type TEXT,
+                Location TEXT,
+                Food_Type TEXT,
+                Meal_Type TEXT
+            )
+        ''')
+        empty = conn.execute("SELECT COUNT(*) FROM food_listings").fetchone()[0] == 0
+
+    # Load from CSV if table is empty; providers may not be loaded yet, so skip the FK lookups
+    if empty and os.path.exists(CSV_PATH):
+        journal.compact()
+        bulk_import.import_csv('food_listings', CSV_PATH, check_foreign_keys=False, report=None)
+
 
 # Get next auto-increment ID
 def get_next_food_id():
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("SELECT seq FROM sqlite_sequence WHERE name='food_listings'")
-    row = cursor.fetchone()
-    conn.close()
+    row = db.fetch_one("SELECT seq FROM sqlite_sequence WHERE name='food_listings'")
     return (row[0] + 1) if row else 1
 
 # Insert new food listing
 def insert_food(name, qty, exp, pid, ptype, loc, ftype, meal):
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute('''
-        INSERT INTO food_listings (Food_Name, Quantity, Expiry_Date, Provider_ID, Provider_Type, Location, Food_Type, Meal_Type)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-    ''', (name, qty, exp, pid, ptype, loc, ftype, meal))
-    conn.commit()
-    new_id = cursor.lastrowid
-    conn.close()
-    return new_id
-
-# Append to CSV
-def append_to_csv(new_row):
-    if os.path.exists(CSV_PATH):
-        new_row.to_csv(CSV_PATH, mode='a', header=False, index=False)
-    else:
-        new_row.to_csv(CSV_PATH, mode='w', index=False)
+    return operations.insert_food(name, qty, exp, pid, ptype, loc, ftype, meal)
 
 # Get latest inserted record
 def get_latest_food():
-    conn = sqlite3.connect(DB_PATH)
-    df = pd.read_sql_query("SELECT * FROM food_listings ORDER BY Food_ID DESC LIMIT 1", conn)
-    conn.close()
-    return df
+    return db.read_sql("SELECT * FROM food_listings ORDER BY Food_ID DESC LIMIT 1")
 
 # Update record
 def update_food(fid, name, qty, exp, ftype, meal):
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute('''
-        UPDATE food_listings
-        SET Food_Name=?, Quantity=?, Expiry_Date=?, Food_Type=?, Meal_Type=?
-        WHERE Food_ID=?
-    ''', (name, qty, exp, ftype, meal, fid))
-    conn.commit()
-    conn.close()
-
-    df = pd.read_csv(CSV_PATH)
-    df.loc[df['Food_ID'] == fid, ['Food_Name', 'Quantity', 'Expiry_Date', 'Food_Type', 'Meal_Type']] = [name, qty, exp, ftype, meal]
-    df.to_csv(CSV_PATH, index=False)
+    operations.update_food(fid, name, qty, exp, ftype, meal)
 
 # Delete record
 def delete_food(fid):
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM food_listings WHERE Food_ID=?", (fid,))
-    conn.commit()
-    conn.close()
+    operations.delete_food(fid)
 
-    df = pd.read_csv(CSV_PATH)
-    df = df[df['Food_ID'] != fid]
-    df.to_csv(CSV_PATH, index=False)
 
 # Initialize database
 initialize_db()
 
+# Show existing listings
+st.subheader("📋 All Listed Food Items")
+food_df = frames.load('food_listings', columns=[
+    "Food_ID", "Food_Name", "Quantity", "Expiry_Date",
+    "Provider_ID", "Provider_Type", "Location", "Food_Type", "Meal_Type"
+])
+# Search narrows the table (and the update/delete choices below) to the best matches, best first
+food_query = st.text_input("🔍 Search food names", key="food_search")
+if food_query.strip():
+    found, corrections = search.search("food", food_query, limit=search.MAX_RANKED)
+    for word, terms in corrections.items():
+        st.caption(f"No match for '{word}'; showing results for {', '.join(terms)}.")
+    order = {food_id: i for i, (food_id, _) in enumerate(found)}
+    food_df = food_df[food_df["Food_ID"].isin(order)].sort_values("Food_ID", key=lambda ids: ids.map(order))
+    st.caption(f"{len(food_df)} matching item(s)")
+st.dataframe(food_df, use_container_width=True)
+
 # Registration form
 st.markdown("<h3 style='text-align: center;'>📝 List Surplus Food</h3>", unsafe_allow_html=True)
 
 # Get provider options from DB
-with sqlite3.connect(DB_PATH) as conn:
-    providers = pd.read_sql_query("SELECT DISTINCT Provider_ID, Type, City FROM providers", conn)
+providers = db.read_sql("SELECT DISTINCT Provider_ID, Type, City FROM providers")
 
 provider_ids = sorted(providers["Provider_ID"].dropna().astype(int).unique())
 provider_id = st.selectbox("Provider ID", provider_ids)
@@ -135,8 +101,8 @@ with st.form("listing_form"):
     name = st.text_input("Food Name")
     qty = st.number_input("Quantity", min_value=1, step=1)
     exp_date = st.date_input("Expiry Date", min_value=date.today())
-    ftype = st.selectbox("Food Type", ["Vegetarian", "Non-Vegetarian", "Vegan"])
-    meal_type = st.selectbox("Meal Type", ["Breakfast", "Lunch", "Dinner", "Snacks"])
+    ftype = st.selectbox("Food Type", operations.FOOD_TYPES)
+    meal_type = st.selectbox("Meal Type", operations.MEAL_TYPES)
     submit = st.form_submit_button("List Food")
     st.subheader("Recently Provider Listing The Surplus Food ")
     st.dataframe(get_latest_food(), use_container_width=True)
@@ -155,13 +121,32 @@ with st.form("listing_form"):
                 'Food_Type': ftype,
                 'Meal_Type': meal_type
             }])
-            append_to_csv(new_row)
             st.success(f"✅ Food item listed with ID {new_id}")
             st.balloons()
             st.dataframe(new_row, use_container_width=True)
         else:
             st.error("Please fill in all fields.")
 
+# Bulk listings: a CSV with the form's fields, written as one batch; Provider_Type and Location
+# come from each row's provider
+st.markdown("<h3 style='text-align: center;'>📦 Bulk Listings</h3>", unsafe_allow_html=True)
+with st.form("bulk_listing_form"):
+    listings_file = st.file_uploader("Listings CSV (" + ", ".join(batches.LISTING_FIELDS) + ")", type=["csv"])
+    bulk_submit = st.form_submit_button("List Food")
+
+    if bulk_submit and listings_file is None:
+        st.warning("⚠️ Choose a CSV file first.")
+    elif bulk_submit:
+        try:
+            results = batches.submit_listings(batches.read_csv(listings_file.getvalue()))
+        except batches.BatchError as e:
+            st.error(f"❌ {e}")
+        else:
+            results_df = pd.DataFrame(results)
+            inserted = int((results_df["Result"] == "Inserted").sum()) if len(results_df) else 0
+            st.success(f"✅ {inserted} of {len(results_df)} food items listed")
+            st.dataframe(results_df, use_container_width=True, hide_index=True)
+
 # Update/Delete section
 st.markdown("---")
 st.markdown("<h3 style='text-align: center;'>✏️ Update or 🗑️ Delete Food Listing</h3>", unsafe_allow_html=True)
@@ -176,8 +161,8 @@ if selected_id:
         name_upd = st.text_input("Food Name", selected_row['Food_Name'])
         qty_upd = st.number_input("Quantity", value=int(selected_row['Quantity']), step=1)
         exp_upd = st.date_input("Expiry Date", pd.to_datetime(selected_row['Expiry_Date']))
-        ftype_upd = st.selectbox("Food Type", ["Vegetarian", "Non-Vegetarian", "Vegan"], index=["Vegetarian", "Non-Vegetarian", "Vegan"].index(selected_row["Food_Type"]))
-        meal_upd = st.selectbox("Meal Type", ["Breakfast", "Lunch", "Dinner", "Snacks"], index=["Breakfast", "Lunch", "Dinner", "Snacks"].index(selected_row["Meal_Type"]))
+        ftype_upd = st.selectbox("Food Type", operations.FOOD_TYPES, index=operations.FOOD_TYPES.index(selected_row["Food_Type"]))
+        meal_upd = st.selectbox("Meal Type", operations.MEAL_TYPES, index=operations.MEAL_TYPES.index(selected_row["Meal_Type"]))
 
         col1, col2 = st.columns(2)
         with col1:
@@ -186,8 +171,11 @@ if selected_id:
             deleted = st.form_submit_button("🗑️ Delete")
 
         if updated:
-            update_food(selected_id, name_upd, qty_upd, exp_upd.strftime("%Y-%m-%d"), ftype_upd, meal_upd)
-            st.success("✅ Food listing updated.")
+            try:
+                update_food(selected_id, name_upd, qty_upd, exp_upd.strftime("%Y-%m-%d"), ftype_upd, meal_upd)
+                st.success("✅ Food listing updated.")
+            except sqlite3.IntegrityError:
+                st.error("❌ Quantity can't go below what receivers have already claimed.")
 
         if deleted:
             delete_food(selected_id)
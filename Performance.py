@@ -0,0 +1,164 @@
+import time
+import streamlit as st
+import pandas as pd
+import csv_export
+import frames
+import instrumentation
+import startup
+
+st.title("⏱️ Performance")
+st.caption("Every SQL statement and page render since the app started (most recent "
+           f"{instrumentation.MAX_STATEMENTS} statements).")
+
+log = instrumentation.get_log()
+if not instrumentation.ENABLED:
+    st.warning("Instrumentation is turned off (LOCAL_FOOD_WM_INSTRUMENT=0).")
+
+col1, col2 = st.columns([3, 1])
+with col2:
+    if st.button("🗑️ Clear history"):
+        log.clear()
+        st.rerun()
+
+# Statements recorded before this page started rendering, so it doesn't measure itself
+statements = pd.DataFrame(log.statements(), columns=["at", "page", "name", "sql", "ms", "rows", "bytes",
+                                                    "plan", "full_scans", "error"])
+statements = statements[statements["page"] != "Performance"]
+with col1:
+    st.metric("Statements recorded", len(statements))
+
+# -------------------------------
+# Slowest queries
+# -------------------------------
+st.header("🐢 Slowest Queries")
+if statements.empty:
+    st.info("No statements recorded yet. Open the other pages and come back.")
+else:
+    grouped = statements.groupby(["page", "name"]).agg(
+        Calls=("ms", "size"),
+        Avg_ms=("ms", "mean"),
+        P95_ms=("ms", lambda s: s.quantile(0.95)),
+        Max_ms=("ms", "max"),
+        Total_ms=("ms", "sum"),
+        Avg_rows=("rows", "mean"),
+        Avg_KB=("bytes", lambda s: s.mean() / 1024),
+        Full_scan=("full_scans", lambda s: ", ".join(sorted({t for tables in s for t in tables}))),
+        Errors=("error", "count"),
+    ).reset_index()
+    order = st.radio("Sort by", ["Max_ms", "Total_ms", "Avg_ms", "Calls"], horizontal=True)
+    top = grouped.sort_values(order, ascending=False).head(25)
+    st.dataframe(top.round(2).rename(columns={"page": "Page", "name": "Query"}),
+                 use_container_width=True, hide_index=True)
+
+    # -------------------------------
+    # Full-scan warnings
+    # -------------------------------
+    st.header("⚠️ Full Table Scans")
+    scans = statements[statements["full_scans"].map(len) > 0]
+    if scans.empty:
+        st.success("✅ No recorded statement scans a whole table.")
+    else:
+        for sql, group in scans.groupby("sql", sort=False):
+            first = group.iloc[0]
+            tables = ", ".join(first["full_scans"])
+            st.warning(f"**{first['name']}** scans {tables} "
+                       f"({len(group)} calls, max {group['ms'].max():.1f} ms, pages: {', '.join(group['page'].unique())})")
+            with st.expander("Query plan"):
+                st.code("\n".join(first["plan"]) or "(no plan)", language="text")
+                st.code(sql.strip(), language="sql")
+
+    # -------------------------------
+    # Plan lookup
+    # -------------------------------
+    st.header("🔍 Query Plans")
+    picked = st.selectbox("Statement", sorted(statements["name"].unique()))
+    last = statements[statements["name"] == picked].iloc[-1]
+    st.code("\n".join(last["plan"]) or "(no plan)", language="text")
+    st.code(last["sql"].strip(), language="sql")
+
+# -------------------------------
+# Page render times
+# -------------------------------
+st.header("📊 Page Render Times")
+renders = {page: times for page, times in log.renders().items() if page != "Performance"}
+first_renders = log.first_renders()
+if not renders:
+    st.info("No page renders recorded yet.")
+else:
+    summary = pd.DataFrame([
+        {"Page": page, "Renders": len(times), "First_ms": first_renders.get(page),
+         "Median_ms": pd.Series(times).median(), "P95_ms": pd.Series(times).quantile(0.95),
+         "Max_ms": max(times)}
+        for page, times in renders.items()
+    ])
+    st.dataframe(summary.round(1), use_container_width=True, hide_index=True)
+
+    page_name = st.selectbox("Histogram for page", list(renders))
+    times = pd.Series(renders[page_name])
+    bins = pd.cut(times, bins=min(20, max(1, times.nunique())))
+    histogram = bins.value_counts(sort=False)
+    histogram = pd.DataFrame({"Render time (ms)": [round(interval.mid, 1) for interval in histogram.index],
+                              "Renders": histogram.values})
+    st.bar_chart(histogram, x="Render time (ms)", y="Renders")
+
+# -------------------------------
+# Memory per session
+# -------------------------------
+st.header("🧠 Memory per Session")
+st.caption("Tables are loaded once per process with categories for repeated text, the smallest integer types and "
+           "parsed dates, and every session gets a view of that shared copy. Default_MB is what a session's frames "
+           "would take with the dtypes they are read with; Private_MB is what it holds that is not shared.")
+shared = frames.get_shared()
+shared_stats = shared.stats()
+col1, col2, col3 = st.columns(3)
+rss = frames.process_rss()
+col1.metric("Process resident memory", f"{rss / 1e6:,.0f} MB" if rss is not None else "n/a")
+col2.metric("Shared frames", f"{shared_stats['bytes'] / 1e6:,.1f} / {shared.max_bytes / 1e6:,.0f} MB",
+            help=f"{shared_stats['entries']} frame(s), {shared_stats['evictions']} evicted")
+col3.metric("Shared frame hit rate", f"{shared_stats['hit_rate']:.0%}",
+            help=f"{shared_stats['hits']} hits, {shared_stats['misses']} loads")
+sessions = frames.session_summary()
+if not sessions:
+    st.info("No session has loaded a table yet.")
+else:
+    sessions = pd.DataFrame(sessions)
+    default_mb, private_mb = sessions["Default_MB"].sum(), sessions["Private_MB"].sum()
+    st.write(f"{len(sessions)} session(s) would hold {default_mb:,.1f} MB as private default-dtype copies; they hold "
+             f"{private_mb:,.1f} MB of their own plus views of {shared_stats['bytes'] / 1e6:,.1f} MB of shared frames.")
+    st.dataframe(sessions.round(2), use_container_width=True, hide_index=True)
+
+# -------------------------------
+# CSV snapshots
+# -------------------------------
+st.header("🗂️ CSV Snapshots")
+st.caption(f"Writes go to the database only. Every {csv_export.EXPORT_SECONDS:g}s a background thread rewrites the "
+           "CSV of each table that changed, from one consistent read, and renames it into place.")
+exporter = csv_export.get_exporter()
+lag = exporter.lag()
+if exporter.last_error is not None:
+    st.error(f"The last export failed: {exporter.last_error}")
+if exporter.last_export:
+    last = exporter.last_export
+    st.write(f"Last export: {', '.join(last['tables'])} in {last['ms']:,.0f} ms, "
+             f"{time.time() - last['time']:,.0f}s ago.")
+if lag:
+    st.info("Writes not in the CSVs yet: " + ", ".join(f"{table} ({n:,})" for table, n in lag.items()))
+else:
+    st.success("The CSVs match the database.")
+
+# -------------------------------
+# Startup warm-up
+# -------------------------------
+st.header("🚀 Startup Warm-up")
+st.caption("After the first page renders, a background thread imports pandas, pyarrow, matplotlib and "
+           "seaborn and fills the database caches, so the first visit to the other pages is fast.")
+warm = startup.get_warm_up()
+if not startup.WARM_UP:
+    st.info("The warm-up is turned off (LOCAL_FOOD_WM_WARMUP=0).")
+elif not warm.results():
+    st.info("The warm-up hasn't finished a step yet.")
+else:
+    steps = pd.DataFrame(warm.results()).rename(columns={"step": "Step", "error": "Error"})
+    st.dataframe(steps.round(1), use_container_width=True, hide_index=True)
+    if not warm.done():
+        st.info("⏳ Still warming up…")
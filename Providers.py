@@ -2,119 +2,67 @@ import streamlit as st
 import pandas as pd
 import sqlite3
 import os
+import db
+import bulk_import
+import frames
+import operations
 
 st.header('🚚📦 Providers')
 
 # Paths
-DB_PATH = 'D:/Guvi_Project1/env/Scripts/Local_food_WM.db'
-CSV_PATH = 'D:/Guvi_Project1/dataset/providers_data.csv'
-
-st.subheader("📋 All Registered Providers Information")
-providers_df = pd.read_csv(CSV_PATH)
-st.dataframe(providers_df)
-
+CSV_PATH = operations.CSV_PATHS['providers']
+journal = operations.journal('providers')
 
 # Initialize the database
 def initialize_db():
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS providers (
-            Provider_ID INTEGER PRIMARY KEY AUTOINCREMENT,
-            Name TEXT NOT NULL,
-            Type TEXT,
-            Address TEXT,
-            City TEXT,
-            Contact TEXT UNIQUE
-        )
-    ''')
-    conn.commit()
-
-    # Load from CSV if table is empty
-    cursor.execute("SELECT COUNT(*) FROM providers")
-    count = cursor.fetchone()[0]
-    if count == 0 and os.path.exists(CSV_PATH):
-        df = pd.read_csv(CSV_PATH)
-        df.to_sql('providers', conn, if_exists='append', index=False)
-    conn.close()
+    with db.transaction() as conn:
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS providers (
+                Provider_ID INTEGER PRIMARY KEY AUTOINCREMENT,
+                Name TEXT NOT NULL,
+                Type TEXT,
+                Address TEXT,
+                City TEXT,
+                Contact TEXT UNIQUE
+            )
+        ''')
+        empty = conn.execute("SELECT COUNT(*) FROM providers").fetchone()[0] == 0
+
+    # Load from CSV if table is empty, in batched transactions
+    if empty and os.path.exists(CSV_PATH):
+        journal.compact()
+        bulk_import.import_csv('providers', CSV_PATH, report=None)
+
 
 # Get next provider ID
 def get_next_provider_id():
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("SELECT seq FROM sqlite_sequence WHERE name='providers'")
-    row = cursor.fetchone()
-    conn.close()
+    row = db.fetch_one("SELECT seq FROM sqlite_sequence WHERE name='providers'")
     return (row[0] + 1) if row else 1
 
 # Insert provider into database
 def insert_provider(name, ptype, address, city, contact):
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute('''
-        INSERT INTO providers (Name, Type, Address, City, Contact)
-        VALUES (?, ?, ?, ?, ?)
-    ''', (name, ptype, address, city, contact))
-    conn.commit()
-    new_id = cursor.lastrowid
-    conn.close()
-    return new_id
+    return operations.insert_provider(name, ptype, address, city, contact)
 
 # Update
 def update_provider(pid, name, ptype, address, city, contact):
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute('''
-        UPDATE providers
-        SET Name=?, Type=?, Address=?, City=?, Contact=?
-        WHERE Provider_ID=?
-    ''', (name, ptype, address, city, contact, pid))
-    conn.commit()
-    conn.close()
-
-    # Update CSV
-    df = pd.read_csv(CSV_PATH)
-    df.loc[df['Provider_ID'] == pid, ['Name', 'Type', 'Address', 'City', 'Contact']] = [name, ptype, address, city, contact]
-    df.to_csv(CSV_PATH, index=False)
+    operations.update_provider(pid, name, ptype, address, city, contact)
 
 # Delete provider
 def delete_provider(pid):
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM providers WHERE Provider_ID=?", (pid,))
-    conn.commit()
-    conn.close()
-
-    df = pd.read_csv(CSV_PATH)
-    df = df[df['Provider_ID'] != pid]
-    df.to_csv(CSV_PATH, index=False)
-
-
-# Append to CSV
-def append_to_csv(provider_id, name, ptype, address, city, contact):
-    new_row = pd.DataFrame([{
-        'Provider_ID': provider_id,
-        'Name': name,
-        'Type': ptype,
-        'Address': address,
-        'City': city,
-        'Contact': contact
-    }])
-    if os.path.exists(CSV_PATH):
-        new_row.to_csv(CSV_PATH, mode='a', header=False, index=False)
-    else:
-        new_row.to_csv(CSV_PATH, mode='w', index=False)
+    operations.delete_provider(pid)
+
 
 # Get the last registered provider
 def get_latest_provider():
-    conn = sqlite3.connect(DB_PATH)
-    df = pd.read_sql_query("SELECT * FROM providers ORDER BY Provider_ID DESC LIMIT 1", conn)
-    conn.close()
-    return df
+    return db.read_sql("SELECT * FROM providers ORDER BY Provider_ID DESC LIMIT 1")
 
 # Initialize database
 initialize_db()
 
+st.subheader("📋 All Registered Providers Information")
+providers_df = frames.load('providers')
+st.dataframe(providers_df)
+
 # Streamlit App
 st.markdown("<h3 style='text-align: center;'>📝 Provider Registration Form</h3>", unsafe_allow_html=True)
 
@@ -124,7 +72,7 @@ with st.form("registration_form"):
     st.text_input("Provider ID", value=str(provider_id), disabled=True)
 
     name = st.text_input("Name")
-    ptype = st.selectbox("Provider Type", ["Restaurant", "Catering Service", "Grocery Store", "Supermarket"])
+    ptype = st.selectbox("Provider Type", operations.PROVIDER_TYPES)
     address = st.text_area("Address")
     city = st.text_input("City")
     contact = st.text_input("Contact (must be unique)")
@@ -137,7 +85,6 @@ with st.form("registration_form"):
         if name and contact and address and city:
             try:
                 new_id = insert_provider(name, ptype, address, city, contact)
-                append_to_csv(new_id, name, ptype, address, city, contact)
                 st.success(f"Provider registered with ID {new_id}")
                 st.balloons()
                 st.subheader("🎉 Just Registered Provider")
@@ -169,7 +116,7 @@ if selected_id:
 
     with st.form("update_delete_form"):
         name_upd = st.text_input("Name", selected_row['Name'])
-        type_upd = st.selectbox("Provider Type", ["Restaurant", "Catering Service", "Grocery Store", "Supermarket"], index=["Restaurant", "Catering Service", "Grocery Store", "Supermarket"].index(selected_row['Type']))
+        type_upd = st.selectbox("Provider Type", operations.PROVIDER_TYPES, index=operations.PROVIDER_TYPES.index(selected_row['Type']))
         address_upd = st.text_area("Address", selected_row['Address'])
         city_upd = st.text_input("City", selected_row['City'])
         contact_upd = st.text_input("Contact", selected_row['Contact'])
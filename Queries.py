@@ -1,316 +1,230 @@
+import io
+import time
 import streamlit as st
-import sqlite3
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
+import result_cache
+import exporter
+import expiry
+import instrumentation
+import timeseries
+import columnar
 
-st.title("📊 Food Waste Management - Queries")
+from query_catalog import query_map, chart_queries, CITY_QUERY, EXPIRED_QUERY, EXPIRING_QUERY
 
-# Connect to DB
-DB_PATH = 'D:\Guvi_Project1\env\Scripts\Local_food_WM.db'
-conn = sqlite3.connect(DB_PATH)
+# Each section below is a fragment: a widget inside it reruns only that section, so picking a
+# query never touches the charts, and the charts only compute the tab that is open
+_fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", lambda fn: fn)
 
-# -------------------------------
-# Query Map with Descriptions
-# -------------------------------
-query_map = {
-    # --- Providers & Receivers ---
-    "1. How many food providers and receivers are there in each city?": """
-        SELECT 
-            p.City,
-            COUNT(DISTINCT p.Provider_ID) AS Providers,
-            COUNT(DISTINCT r.Receiver_ID) AS Receivers
-        FROM providers p
-        LEFT JOIN receivers r ON p.City = r.City
-        GROUP BY p.City
-    """,
-
-    "2. Which type of food provider contributes the most food?": """
-        SELECT Provider_Type, COUNT(*) AS Total_Food_Items
-        FROM food_listings
-        GROUP BY Provider_Type
-        ORDER BY Total_Food_Items DESC
-        LIMIT 1
-    """,
-
-    "3. What is the contact information of food providers in a specific city?": """
-        SELECT Name, Type, Address, Contact
-        FROM providers
-        WHERE City = ?
-    """,
-
-    "4. Which receivers have claimed the most food?": """
-        SELECT r.Name, COUNT(c.Claim_ID) AS Claims
-        FROM claims c
-        JOIN receivers r ON c.Receiver_ID = r.Receiver_ID
-        GROUP BY r.Name
-        ORDER BY Claims DESC
-        LIMIT 5
-    """,
-
-    # --- Food Listings ---
-    "5. What is the total quantity of food available from all providers?": """
-        SELECT SUM(Quantity) AS Total_Quantity FROM food_listings
-    """,
-
-    "6. Which city has the highest number of food listings?": """
-        SELECT City, COUNT(*) AS Listings
-        FROM food_listings f
-        JOIN providers p ON f.Provider_ID = p.Provider_ID
-        GROUP BY City
-        ORDER BY Listings DESC
-        LIMIT 1
-    """,
-
-    "7. What are the most commonly available food types?": """
-        SELECT Food_Type, COUNT(*) AS Count
-        FROM food_listings
-        GROUP BY Food_Type
-        ORDER BY Count DESC
-        LIMIT 5
-    """,
-
-    # --- Claims & Distribution ---
-    "8. How many food claims have been made for each food item?": """
-        SELECT f.Food_Name, COUNT(c.Claim_ID) AS Total_Claims
-        FROM claims c
-        JOIN food_listings f ON c.Food_ID = f.Food_ID
-        GROUP BY f.Food_Name
-        ORDER BY Total_Claims DESC
-    """,
-
-    "9. Which provider has had the highest number of successful food claims?": """
-        SELECT p.Name, COUNT(*) AS Successful_Claims
-        FROM claims c
-        JOIN food_listings f ON c.Food_ID = f.Food_ID
-        JOIN providers p ON f.Provider_ID = p.Provider_ID
-        WHERE c.Status = 'Completed'
-        GROUP BY p.Name
-        ORDER BY Successful_Claims DESC
-        LIMIT 1
-    """,
-
-    "10. What percentage of food claims are completed vs. pending vs. canceled?": """
-        SELECT Status,
-               ROUND(COUNT(*) * 100.0 / (SELECT COUNT(*) FROM claims), 2) AS Percentage
-        FROM claims
-        GROUP BY Status
-    """,
-
-    # --- Insights & Analysis ---
-    "11. What is the average quantity of food claimed per receiver?": """
-        SELECT r.Name, ROUND(AVG(f.Quantity), 2) AS Avg_Quantity
-        FROM claims c
-        JOIN food_listings f ON c.Food_ID = f.Food_ID
-        JOIN receivers r ON c.Receiver_ID = r.Receiver_ID
-        GROUP BY r.Name
-        ORDER BY Avg_Quantity DESC
-        LIMIT 10
-    """,
-
-    "12. Which meal type is claimed the most?": """
-        SELECT Meal_Type, COUNT(*) AS Claim_Count
-        FROM food_listings f
-        JOIN claims c ON f.Food_ID = c.Food_ID
-        GROUP BY Meal_Type
-        ORDER BY Claim_Count DESC
-        LIMIT 1
-    """,
-
-    "13. What is the total quantity of food donated by each provider?": """
-        SELECT p.Name, SUM(f.Quantity) AS Total_Donated
-        FROM food_listings f
-        JOIN providers p ON f.Provider_ID = p.Provider_ID
-        GROUP BY p.Name
-        ORDER BY Total_Donated DESC
-        LIMIT 10""",
-        # --- Operational / Time-based ---
-    "14. What is the average time between food listing and claim?": """
-        SELECT AVG(JULIANDAY(c.Timestamp) - JULIANDAY(f.Expiry_Date)) AS Avg_Days_Before_Expiry
-        FROM claims c
-        JOIN food_listings f ON c.Food_ID = f.Food_ID
-    """,
-
-    "15. How many expired food items are still unclaimed?": """
-        SELECT COUNT(*) AS Expired_Unclaimed
-        FROM food_listings f
-        LEFT JOIN claims c ON f.Food_ID = c.Food_ID
-        WHERE f.Expiry_Date < DATE('now') AND c.Claim_ID IS NULL
-    """,
-
-    "16. What is the average quantity of food provided by each type of provider?": """
-        SELECT Provider_Type, ROUND(AVG(Quantity), 2) AS Avg_Quantity
-        FROM food_listings
-        GROUP BY Provider_Type
-    """,
-
-    "17. Which city has the highest amount of unclaimed food?": """
-        SELECT p.City, SUM(f.Quantity) AS Unclaimed_Quantity
-        FROM food_listings f
-        JOIN providers p ON f.Provider_ID = p.Provider_ID
-        LEFT JOIN claims c ON f.Food_ID = c.Food_ID
-        WHERE c.Claim_ID IS NULL
-        GROUP BY p.City
-        ORDER BY Unclaimed_Quantity DESC
-        LIMIT 1
-    """,
-
-    "18. List providers who haven't had any claims": """
-        SELECT DISTINCT p.Name, p.City
-        FROM providers p
-        LEFT JOIN food_listings f ON p.Provider_ID = f.Provider_ID
-        LEFT JOIN claims c ON f.Food_ID = c.Food_ID
-        WHERE c.Claim_ID IS NULL
-    """,
-
-    "19. Which food types are expiring soon (next 3 days)?": """
-        SELECT Food_Name, Expiry_Date, Quantity
-        FROM food_listings
-        WHERE DATE(Expiry_Date) <= DATE('now', '+3 days')
-        ORDER BY Expiry_Date
-    """,
-
-    "20. Monthly trend of food donations": """
-        SELECT strftime('%Y-%m', Expiry_Date) AS Month, SUM(Quantity) AS Total_Donated
-        FROM food_listings
-        GROUP BY Month
-        ORDER BY Month DESC
-    """,
-
-    "21. Top 5 most donated food items": """
-        SELECT Food_Name, SUM(Quantity) AS Total_Quantity
-        FROM food_listings
-        GROUP BY Food_Name
-        ORDER BY Total_Quantity DESC
-        LIMIT 5
-    """,
-
-    "22. Number of unique receivers per city": """
-        SELECT City, COUNT(DISTINCT Receiver_ID) AS Unique_Receivers
-        FROM receivers
-        GROUP BY City
-    """,
-
-    "23. What is the total number of canceled claims per receiver?": """
-        SELECT r.Name, COUNT(*) AS Canceled_Claims
-        FROM claims c
-        JOIN receivers r ON c.Receiver_ID = r.Receiver_ID
-        WHERE c.Status = 'Canceled'
-        GROUP BY r.Name
-        ORDER BY Canceled_Claims DESC
-        LIMIT 5
-    """,
-
-    "24. Average food quantity listed per provider per month": """
-        SELECT p.Name, strftime('%Y-%m', f.Expiry_Date) AS Month, ROUND(AVG(f.Quantity), 2) AS Avg_Quantity
-        FROM food_listings f
-        JOIN providers p ON f.Provider_ID = p.Provider_ID
-        GROUP BY p.Name, Month
-        ORDER BY Month DESC
-    """,
-
-    "25. Which day of the week has the most food donations?": """
-        SELECT strftime('%w', Expiry_Date) AS Weekday, COUNT(*) AS Listings
-        FROM food_listings
-        GROUP BY Weekday
-        ORDER BY Listings DESC
-
-    """
-}
-# -------------------------------
-# Dropdown Selection
-# -------------------------------
-selected_query = st.selectbox("🔍 Select a query:", list(query_map.keys()))
 
-# Get dynamic list of cities for filtering
-provider_cities = pd.read_sql("SELECT DISTINCT City FROM providers", conn)['City'].tolist()
-receiver_cities = pd.read_sql("SELECT DISTINCT City FROM receivers", conn)['City'].tolist()
-all_cities = sorted(set(provider_cities + receiver_cities))
+def section(name):
+    def wrap(fn):
+        def run():
+            with instrumentation.page(f"Queries: {name}"):
+                fn()
+        return _fragment(run)
+    return wrap
+
+
+def get_cities():
+    df = result_cache.cached_read_sql("cities", """
+        SELECT City FROM providers WHERE City IS NOT NULL
+        UNION
+        SELECT City FROM receivers WHERE City IS NOT NULL
+    """)
+    return sorted(df["City"])
+
+
+# Draw a seaborn bar chart off-screen and return it as PNG bytes for the figure cache
+def bar_chart_png(x, y, figsize=None):
+    from matplotlib.figure import Figure
+    import seaborn as sns
+
+    def render(df):
+        fig = Figure(figsize=figsize)
+        ax = fig.subplots()
+        sns.barplot(data=df, x=x, y=y, ax=ax)
+        ax.tick_params(axis='x', labelrotation=45)
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format="png", bbox_inches="tight")
+        return buffer.getvalue()
+    return render
+
 
+# A query_map / chart result from the engine picked at the top of the page: SQLite on the live
+# database, or the vectorized engine on the latest columnar snapshot (columnar.py)
+def use_columnar():
+    return st.session_state.get("query_engine") == "Columnar"
 
 
+def read_query(query_id, sql, params=None):
+    if use_columnar():
+        try:
+            return columnar.read_frame(query_id, params)
+        except columnar.SnapshotError as e:
+            st.warning(f"Columnar engine unavailable, answering from SQLite: {e}")
+    return result_cache.cached_read_sql(query_id, sql, params=params)
 
-# Special handling for city input (query 3)
-if selected_query == "3. What is the contact information of food providers in a specific city?":
-     selected_city = st.selectbox("📍 select a city:", all_cities)
-     city_input = selected_city
 
-# Execute query
-if st.button("Run Query"):
+st.title("📊 Food Waste Management - Queries")
+
+st.radio("⚙️ Query engine", columnar.ENGINES, horizontal=True, key="query_engine",
+         help="Columnar answers the same queries from a memory-mapped snapshot of the tables, "
+              f"refreshed at most every {columnar.REFRESH_SECONDS}s while the data changes")
+if use_columnar():
+    snapshotter = columnar.get_snapshotter()
     try:
-        query = query_map[selected_query]
-        if selected_query == "3. What is the contact information of food providers in a specific city?":
-            df = pd.read_sql_query(query, conn, params=(city_input,))
-        else:
-            df = pd.read_sql_query(query, conn)
-        st.dataframe(df)
-    except Exception as e:
-        st.error(f"Error running query: {e}")
+        with st.spinner("Taking a columnar snapshot…"):
+            snapshot = snapshotter.current()
+        behind = sum(snapshotter.lag().values())
+        st.caption(f"🧊 Snapshot of {snapshot.rows:,} rows taken {time.time() - snapshot.created:.0f}s ago"
+                   + (f"; {behind:,} write(s) behind the database" if behind else "; up to date"))
+    except columnar.SnapshotError as e:
+        st.warning(f"Columnar engine unavailable, answering from SQLite: {e}")
+
+
+@section("query")
+def query_explorer():
+    # -------------------------------
+    # Dropdown Selection
+    # -------------------------------
+    selected_query = st.selectbox("🔍 Select a query:", list(query_map.keys()))
+
+    # Special handling for city input (query 3)
+    if selected_query == CITY_QUERY:
+        selected_city = st.selectbox("📍 select a city:", get_cities())
+        city_input = selected_city
+
+    # Execute query
+    if st.button("Run Query"):
+        try:
+            query = query_map[selected_query]
+            if use_columnar():
+                df = read_query(selected_query, query, (city_input,) if selected_query == CITY_QUERY else None)
+            elif selected_query == CITY_QUERY:
+                df = result_cache.cached_read_sql(selected_query, query, params=(city_input,))
+            elif selected_query == EXPIRED_QUERY:
+                df = expiry.expired_unclaimed_frame()
+            elif selected_query == EXPIRING_QUERY:
+                df = expiry.expiring_frame(3 * 24)
+            else:
+                df = result_cache.cached_read_sql(selected_query, query)
+            st.dataframe(df)
+        except Exception as e:
+            st.error(f"Error running query: {e}")
+
+    stats = result_cache.get_cache().stats()
+    st.caption(f"⚡ Result cache: {stats['hits']} hits / {stats['misses']} misses "
+               f"({stats['hit_rate']:.0%}), {stats['entries']} entries, {stats['bytes'] / 1024:.0f} KB")
+
+
+query_explorer()
+
+
+# -------------------------------
+# Expiry watch (kept current by the background expiry scheduler)
+# -------------------------------
+@section("expiry watch")
+def expiry_watch():
+    st.header("⏰ Expiry Watch")
+    scheduler = expiry.get_scheduler()
+    scheduler.tick()
+    watch_hours = st.slider("Expiring within (hours)", 1, 168, expiry.EXPIRING_HOURS)
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Expired", scheduler.expired_count())
+    col2.metric("Expired, never claimed", scheduler.expired_unclaimed())
+    col3.metric(f"Expiring within {watch_hours}h", len(scheduler.expiring(watch_hours)))
+    recent = scheduler.events(20)
+    if recent:
+        st.dataframe(pd.DataFrame(recent, columns=["At", "Food_ID", "Now"]), hide_index=True)
+
+
+expiry_watch()
+
 
 st.title("📊 Food Waste Management - Data Analysis & Chart")
 
+CHARTS = [
+    "1️⃣ Wastage by Category & Location",
+    "2️⃣ Top Providers",
+    "3️⃣ High-Demand Locations",
+    "4️⃣ Wastage Over Time",
+]
+
+
+# Only the chosen chart runs its query and draws; figures come back from the result cache as
+# PNG bytes until the tables behind them change
+@section("charts")
+def analytics():
+    chart = st.radio("Chart", CHARTS, horizontal=True, label_visibility="collapsed")
+
+    # --- 1. Food Wastage by Category and Location ---
+    if chart == CHARTS[0]:
+        st.header("1️⃣ Food Wastage Trends by Category & Location")
+        df1 = read_query("wastage_by_category", chart_queries["wastage_by_category"])
+        st.dataframe(df1)
+
+    # --- 2. Most Frequent Food Providers and Their Contributions ---
+    elif chart == CHARTS[1]:
+        st.header("2️⃣ Top Food Providers by Contributions")
+        df2 = read_query("top_providers", chart_queries["top_providers"])
+        st.dataframe(df2)
+        render = bar_chart_png('Provider_Name', 'Contributions', figsize=(10, 4))
+        st.image(render(df2) if use_columnar() else
+                 result_cache.cached_figure("top_providers", chart_queries["top_providers"], render))
+
+    # --- 3. Highest Demand Locations Based on Food Claims ---
+    elif chart == CHARTS[2]:
+        st.header("3️⃣ High-Demand Locations by Food Claims")
+        df3 = read_query("demand_locations", chart_queries["demand_locations"])
+        st.dataframe(df3)
+        render = bar_chart_png('Location', 'Claim_Count')
+        st.image(render(df3) if use_columnar() else
+                 result_cache.cached_figure("demand_locations", chart_queries["demand_locations"], render))
+
+    # --- 4. Food Wastage Over Time (by Expiry Date) ---
+    else:
+        st.header("4️⃣ Wastage Trend Over Time")
+        first, last = timeseries.date_range()
+        if first is None:
+            st.info("No expiry dates on record yet.")
+            return
+        # Dragging the range zooms in: narrower ranges come back in finer buckets
+        start, end = (first, last) if first == last else st.slider(
+            "Expiry dates", min_value=first, max_value=last, value=(first, last), key="wastage_range")
+        df4, info = timeseries.wastage_series(start, end)
+        st.line_chart(df4.set_index('Date'), width=timeseries.CHART_WIDTH_PX)
+        note = f"{info['points']:,} points from {info['buckets']:,} {info['bucket']} buckets"
+        if info['points'] < info['buckets']:
+            note += " (downsampled with largest-triangle-three-buckets)"
+        st.caption(note)
+
+
+analytics()
 
-# --- 1. Food Wastage by Category and Location ---
-st.header("1️⃣ Food Wastage Trends by Category & Location")
-query1 = """
-    SELECT Food_Type, Location, COUNT(*) as Total_Wasted
-    FROM food_listings
-    GROUP BY Food_Type, Location
-"""
-df1 = pd.read_sql(query1, conn)
-st.dataframe(df1)
-
-
-# --- 2. Most Frequent Food Providers and Their Contributions ---
-st.header("2️⃣ Top Food Providers by Contributions")
-query2 = """
-    SELECT p.Name AS Provider_Name, COUNT(f.Food_ID) AS Contributions
-    FROM food_listings f
-    JOIN providers p ON f.Provider_ID = p.Provider_ID
-    GROUP BY p.Name
-    ORDER BY Contributions DESC
-    LIMIT 10
-"""
-df2 = pd.read_sql(query2, conn)
-st.dataframe(df2)
-
-fig2, ax2 = plt.subplots(figsize=(10, 4))
-sns.barplot(data=df2, x='Provider_Name', y='Contributions', ax=ax2)
-plt.xticks(rotation=45)
-st.pyplot(fig2)
-
-# --- 3. Highest Demand Locations Based on Food Claims ---
-st.header("3️⃣ High-Demand Locations by Food Claims")
-query3 = """
-    SELECT f.Location, COUNT(c.Claim_ID) AS Claim_Count
-    FROM claims c
-    JOIN food_listings f ON c.Food_ID = f.Food_ID
-    GROUP BY f.Location
-    ORDER BY Claim_Count DESC
-    LIMIT 10
-"""
-df3 = pd.read_sql(query3, conn)
-st.dataframe(df3)
-
-fig3, ax3 = plt.subplots()
-sns.barplot(data=df3, x='Location', y='Claim_Count', ax=ax3)
-plt.xticks(rotation=45)
-st.pyplot(fig3)
-
-# --- 4. Food Wastage Over Time (by Expiry Date) ---
-st.header("4️⃣ Wastage Trend Over Time")
-query4 = """
-    SELECT DATE(Expiry_Date) AS Date, COUNT(*) AS Wasted_Food_Count
-    FROM food_listings
-    GROUP BY Date
-    ORDER BY Date
-"""
-df4 = pd.read_sql(query4, conn)
-st.line_chart(df4.set_index('Date'))
 
 # --- Optional: Download Report ---
-st.markdown("### 📥 Download Report")
-csv = df1.to_csv(index=False).encode()
-st.download_button("Download Report", csv, "wastage_by_category.csv", "text/csv")
-
-conn.close()
+# Exports stream from a cursor in chunks on a background worker; finished files are reused
+# until the underlying tables change
+@section("export")
+def download_report():
+    st.markdown("### 📥 Download Report")
+    export_source = st.selectbox("Report", list(exporter.SOURCES.keys()))
+    export_format = st.radio("Format", list(exporter.FORMATS.keys()), horizontal=True, format_func=str.upper)
+    export_params = ()
+    if export_source == CITY_QUERY:
+        export_params = (st.selectbox("📍 City for the report:", get_cities(), key="export_city"),)
+
+    manager = exporter.get_manager()
+    ready_path = manager.ready(export_source, export_format, export_params)
+    if ready_path:
+        with open(ready_path, 'rb') as f:
+            st.download_button("Download Report", f, f"report.{export_format}", exporter.FORMATS[export_format])
+    elif manager.running(export_source, export_format, export_params):
+        st.info("⏳ Preparing the report in the background…")
+        st.button("🔄 Refresh")
+    elif st.button("Prepare Report"):
+        manager.request(export_source, export_format, export_params)
+        st.rerun(scope="fragment")
+
+
+download_report()
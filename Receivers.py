@@ -2,115 +2,66 @@ import streamlit as st
 import pandas as pd
 import sqlite3
 import os
+import db
+import bulk_import
+import frames
+import operations
 
 st.header('🍽️ Receivers ❤️🙏')
 
 # Paths
-DB_PATH = 'D:/Guvi_Project1/env/Scripts/Local_food_WM.db'
-CSV_PATH = 'D:/Guvi_Project1/dataset/Receivers_data.csv'
-
-st.subheader("📋 All Registered Receivers Information")
-receiver_df = pd.read_csv(CSV_PATH)
-st.dataframe(receiver_df)
+CSV_PATH = operations.CSV_PATHS['receivers']
+journal = operations.journal('receivers')
 
 # Initialize SQLite database and import from CSV
 def initialize_db():
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS receivers (
-            Receiver_ID INTEGER PRIMARY KEY AUTOINCREMENT,
-            Name TEXT,
-            Type TEXT,
-            City TEXT,
-            Contact TEXT UNIQUE
-        )
-    ''')
-    conn.commit()
-
-    cursor.execute("SELECT COUNT(*) FROM receivers")
-    count = cursor.fetchone()[0]
-
-    if count == 0 and os.path.exists(CSV_PATH):
-        df = pd.read_csv(CSV_PATH)
-        df.to_sql('receivers', conn, if_exists='append', index=False)
-
-    conn.close()
+    with db.transaction() as conn:
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS receivers (
+                Receiver_ID INTEGER PRIMARY KEY AUTOINCREMENT,
+                Name TEXT,
+                Type TEXT,
+                City TEXT,
+                Contact TEXT UNIQUE
+            )
+        ''')
+
+        empty = conn.execute("SELECT COUNT(*) FROM receivers").fetchone()[0] == 0
+
+    if empty and os.path.exists(CSV_PATH):
+        journal.compact()
+        bulk_import.import_csv('receivers', CSV_PATH, report=None)
+
 
 # Get next receiver ID
 def get_next_receiver_id():
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("SELECT seq FROM sqlite_sequence WHERE name='receivers'")
-    row = cursor.fetchone()
-    conn.close()
+    row = db.fetch_one("SELECT seq FROM sqlite_sequence WHERE name='receivers'")
     return (row[0] + 1) if row else 1
 
 # Insert a new receiver into DB
 def insert_receiver(name, rtype, city, contact):
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute('''
-        INSERT INTO receivers (Name, Type, City, Contact)
-        VALUES (?, ?, ?, ?)
-    ''', (name, rtype, city, contact))
-    conn.commit()
-    new_id = cursor.lastrowid
-    conn.close()
-    return new_id
+    return operations.insert_receiver(name, rtype, city, contact)
 
 # Update Receiver
 def update_receiver(rid, name, rtype, city, contact):
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute('''
-        UPDATE receivers
-        SET Name=?, Type=?, City=?, Contact=?
-        WHERE Receiver_ID=?
-    ''', (name, rtype, city, contact, rid))
-    conn.commit()
-    conn.close()
-
-    df = pd.read_csv(CSV_PATH)
-    df.loc[df['Receiver_ID'] == rid, ['Name', 'Type', 'City', 'Contact']] = [name, rtype, city, contact]
-    df.to_csv(CSV_PATH, index=False)
+    operations.update_receiver(rid, name, rtype, city, contact)
 
 # Delete Receiver
 def delete_receiver(rid):
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM receivers WHERE Receiver_ID=?", (rid,))
-    conn.commit()
-    conn.close()
-
-    df = pd.read_csv(CSV_PATH)
-    df = df[df['Receiver_ID'] != rid]
-    df.to_csv(CSV_PATH, index=False)
-
-# Append to CSV file
-def append_to_csv(receiver_id, name, rtype, city, contact):
-    new_row = pd.DataFrame([{
-        'Receiver_ID': receiver_id,
-        'Name': name,
-        'Type': rtype,
-        'City': city,
-        'Contact': contact
-    }])
-    if os.path.exists(CSV_PATH):
-        new_row.to_csv(CSV_PATH, mode='a', header=False, index=False)
-    else:
-        new_row.to_csv(CSV_PATH, mode='w', index=False)
+    operations.delete_receiver(rid)
+
 
 # Get the latest inserted receiver
 def get_latest_receiver():
-    conn = sqlite3.connect(DB_PATH)
-    df = pd.read_sql_query("SELECT * FROM receivers ORDER BY Receiver_ID DESC LIMIT 1", conn)
-    conn.close()
-    return df
+    return db.read_sql("SELECT * FROM receivers ORDER BY Receiver_ID DESC LIMIT 1")
 
 # Initialize database
 initialize_db()
 
+st.subheader("📋 All Registered Receivers Information")
+receiver_df = frames.load('receivers')
+st.dataframe(receiver_df)
+
 # Streamlit App
 st.markdown("<h3 style='text-align: center;'>📝 Receiver Registration Form</h3>", unsafe_allow_html=True)
 
@@ -119,7 +70,7 @@ with st.form("receiver_form"):
     st.text_input("Receiver ID", value=str(receiver_id), disabled=True)
 
     name = st.text_input("Name")
-    rtype = st.selectbox("Receiver Type", ["Individual", "Charity", "NGO", "Shelter"])
+    rtype = st.selectbox("Receiver Type", operations.RECEIVER_TYPES)
     city = st.text_input("City")
     contact = st.text_input("Contact (must be unique)")
 
@@ -132,7 +83,6 @@ with st.form("receiver_form"):
         if name and city and contact:
             try:
                 new_id = insert_receiver(name, rtype, city, contact)
-                append_to_csv(new_id, name, rtype, city, contact)
                 st.success(f"Receiver registered successfully with ID {new_id}")
                 st.balloons()
                 st.subheader("🎉 Just Registered Register")
@@ -165,8 +115,8 @@ if selected_id:
 
     with st.form("update_delete_form"):
         name_upd = st.text_input("Name", selected_row['Name'])
-        type_upd = st.selectbox("Receiver Type", ["Individual", "Charity", "NGO", "Shelter"],
-                                index=["Individual", "Charity", "NGO", "Shelter"].index(selected_row['Type']))
+        type_upd = st.selectbox("Receiver Type", operations.RECEIVER_TYPES,
+                                index=operations.RECEIVER_TYPES.index(selected_row['Type']))
         city_upd = st.text_input("City", selected_row['City'])
         contact_upd = st.text_input("Contact", selected_row['Contact'])
 
@@ -0,0 +1,103 @@
+import argparse
+
+import db
+from dates import sql_normalized
+
+
+# Day key for agg_expiry_date. Expiry dates are normalized to ISO first, since DATE() alone
+# returns NULL for the US-style ones.
+def expiry_day(column):
+    return f"IFNULL(DATE({sql_normalized(column)}), '')"
+
+
+# Summary tables behind the "Data Analysis & Chart" section of Queries.py.
+# Triggers keep them current on every write, so the charts read O(groups) rows; the tables and
+# triggers are created by migrations 3 and 8. "rebuild" is the GROUP BY each summary holds the
+# result of. NULL group keys are stored as '' (primary keys can't hold NULL) and mapped back on read.
+SUMMARIES = {
+    "agg_food_type_location": {
+        "sources": ("food_listings",),
+        "rebuild": '''
+            SELECT IFNULL(Food_Type, ''), IFNULL(Location, ''), COUNT(*)
+            FROM food_listings
+            GROUP BY 1, 2
+        ''',
+    },
+    "agg_provider_contributions": {
+        "sources": ("food_listings",),
+        "rebuild": '''
+            SELECT Provider_ID, COUNT(*)
+            FROM food_listings
+            WHERE Provider_ID IS NOT NULL
+            GROUP BY Provider_ID
+        ''',
+    },
+    "agg_location_claims": {
+        "sources": ("claims", "food_listings"),
+        "rebuild": '''
+            SELECT IFNULL(f.Location, ''), COUNT(*)
+            FROM claims c
+            JOIN food_listings f ON c.Food_ID = f.Food_ID
+            GROUP BY 1
+        ''',
+    },
+    "agg_expiry_date": {
+        "sources": ("food_listings",),
+        "rebuild": f'''
+            SELECT {expiry_day('Expiry_Date')}, COUNT(*)
+            FROM food_listings
+            GROUP BY 1
+        ''',
+    },
+}
+
+
+# Recompute every summary from the base tables
+def rebuild(conn):
+    for table, spec in SUMMARIES.items():
+        conn.execute(f"DELETE FROM {table}")
+        conn.execute(f"INSERT INTO {table} {spec['rebuild']}")
+
+
+# Rows that differ between each summary and a fresh GROUP BY over the base tables
+def check(conn):
+    problems = {}
+    for table, spec in SUMMARIES.items():
+        stored = set(conn.execute(f"SELECT * FROM {table}").fetchall())
+        expected = set(conn.execute(spec["rebuild"]).fetchall())
+        if stored != expected:
+            problems[table] = {
+                "missing_or_wrong": sorted(expected - stored, key=repr),
+                "unexpected": sorted(stored - expected, key=repr),
+            }
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild or verify the chart summary tables")
+    parser.add_argument("action", choices=["rebuild", "check"])
+    parser.add_argument("--db", default=db.DB_PATH)
+    args = parser.parse_args()
+
+    if args.action == "rebuild":
+        with db.transaction(args.db) as conn:
+            rebuild(conn)
+        print("Summary tables rebuilt.")
+        return
+
+    with db.snapshot(args.db) as conn:
+        problems = check(conn)
+    if not problems:
+        print("All summary tables match the base tables.")
+        return
+    for table, diff in problems.items():
+        print(f"{table}: {len(diff['missing_or_wrong'])} missing/wrong, {len(diff['unexpected'])} unexpected")
+        for row in diff["missing_or_wrong"][:10]:
+            print(f"  expected {row}")
+        for row in diff["unexpected"][:10]:
+            print(f"  found    {row}")
+    raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
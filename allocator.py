@@ -0,0 +1,85 @@
+from datetime import date, datetime
+
+import db
+from dates import parse_date
+
+# Claims in these states hold quantity; cancelling a claim releases it
+ACTIVE_STATUSES = ("Pending", "Completed")
+_ACTIVE = ", ".join(f"'{s}'" for s in ACTIVE_STATUSES)
+
+# Quantity held on listing `f` by active claims. Claims recorded before claims.Quantity existed
+# (migration 6) have no quantity and hold the whole listing, as they did in the original app.
+RESERVED_SQL = f'''(
+    SELECT IFNULL(SUM(COALESCE(c.Quantity, f.Quantity)), 0)
+    FROM claims c
+    WHERE c.Food_ID = f.Food_ID AND c.Status IN ({_ACTIVE})
+)'''
+AVAILABLE_SQL = f"MAX(IFNULL(f.Quantity, 0) - {RESERVED_SQL}, 0)"
+
+
+class ClaimError(ValueError):
+    pass
+
+
+# Quantity still claimable for a listing, or None if it doesn't exist
+def available(food_id, db_path=db.DB_PATH):
+    row = db.fetch_one(f"SELECT {AVAILABLE_SQL} FROM food_listings f WHERE f.Food_ID = ?", (food_id,),
+                       db_path=db_path, name="allocator: available")
+    return None if row is None else row[0]
+
+
+# Quantity to grant from a listing with `left` units that expires on `expiry`, or ClaimError.
+# Shared by claim() and the batch path in batches.py so both apply the same rules.
+def grant(food_id, expiry, left, quantity=None, partial=True):
+    expires = parse_date(expiry) if expiry else None
+    if expires is not None and expires.date() < date.today():
+        raise ClaimError(f"Food ID {food_id} expired on {expires.date().isoformat()}.")
+    if left <= 0:
+        raise ClaimError(f"Food ID {food_id} is fully claimed.")
+    granted = left if quantity is None else quantity
+    if granted > left:
+        if not partial:
+            raise ClaimError(f"Only {left} left for Food ID {food_id}.")
+        granted = left
+    return granted
+
+
+# Reserve `quantity` of a listing for a receiver (all that is left when quantity is None).
+# The check and the insert share one BEGIN IMMEDIATE transaction on the single writer, so two
+# sessions can never both take the last units. With partial=True a request for more than is
+# left gets the remainder instead of failing.
+# Returns (claim_id, timestamp, quantity granted).
+def claim(food_id, receiver_id, quantity=None, partial=True, db_path=db.DB_PATH):
+    if quantity is not None and quantity <= 0:
+        raise ClaimError("Quantity must be at least 1.")
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    with db.transaction(db_path) as conn:
+        listing = conn.execute(f"SELECT f.Expiry_Date, {AVAILABLE_SQL} FROM food_listings f WHERE f.Food_ID = ?",
+                               (food_id,)).fetchone()
+        if listing is None:
+            raise ClaimError(f"Food ID {food_id} does not exist.")
+        if conn.execute("SELECT 1 FROM receivers WHERE Receiver_ID = ?", (receiver_id,)).fetchone() is None:
+            raise ClaimError(f"Receiver ID {receiver_id} does not exist.")
+        expiry, left = listing
+        granted = grant(food_id, expiry, left, quantity, partial)
+        claim_id = conn.execute('''
+            INSERT INTO claims (Food_ID, Receiver_ID, Status, Timestamp, Quantity)
+            VALUES (?, ?, 'Pending', ?, ?)
+        ''', (food_id, receiver_id, timestamp, granted)).lastrowid
+    return claim_id, timestamp, granted
+
+
+# Cancel a claim and release its quantity; False if it was already cancelled or doesn't exist
+def cancel(claim_id, db_path=db.DB_PATH):
+    with db.transaction(db_path) as conn:
+        cursor = conn.execute("UPDATE claims SET Status='Cancelled' WHERE Claim_ID=? AND Status != 'Cancelled'",
+                              (claim_id,))
+        return cursor.rowcount == 1
+
+
+# Mark a pending claim completed (its quantity stays reserved); False if it wasn't pending
+def complete(claim_id, db_path=db.DB_PATH):
+    with db.transaction(db_path) as conn:
+        cursor = conn.execute("UPDATE claims SET Status='Completed' WHERE Claim_ID=? AND Status='Pending'",
+                              (claim_id,))
+        return cursor.rowcount == 1
@@ -0,0 +1,444 @@
+import argparse
+import base64
+import json
+import re
+import sqlite3
+import traceback
+import threading
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import allocator
+import batches
+import csv_export
+import dataset_view
+import db
+import instrumentation
+import matching
+import operations
+import search
+from dates import parse_date
+
+# Headless JSON API over the app's database, for partner systems that post surplus food and
+# NGO apps that claim it. Every write goes through operations.py, like the Streamlit pages, so
+# the triggers and allocator checks behave the same whichever way a change arrives, and the
+# CSV exporter picks the change up like any other.
+#
+# Concurrency: each connection gets a thread, up to MAX_CONNECTIONS at once (further clients
+# wait in the listen backlog). The database work is bounded by the shared connection pool:
+# reads borrow one of its read-only connections (WAL, so they never wait on writers) and
+# writes queue for the single writer connection, each in its own BEGIN IMMEDIATE transaction.
+# Connections are kept alive (HTTP/1.1) and closed after IDLE_TIMEOUT seconds without a request.
+HOST = "127.0.0.1"
+PORT = 8600
+MAX_CONNECTIONS = 256
+IDLE_TIMEOUT = 15
+BACKLOG = 256
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+# Room for a batch of a few thousand rows
+MAX_BODY_BYTES = 8 << 20
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+# The list endpoints page through dataset_view's keyset queries. `select` adds the columns the
+# homepage viewer leaves out; filter and sort parameters are named after the result columns.
+RESOURCES = {
+    "providers": {
+        "dataset": "Providers",
+        "select": None,
+    },
+    "receivers": {
+        "dataset": "Receivers",
+        "select": None,
+    },
+    "listings": {
+        "dataset": "Food Listings",
+        "select": f'''
+            f.Food_ID, f.Food_Name, f.Quantity, {allocator.AVAILABLE_SQL} AS Quantity_Left, f.Expiry_Date,
+            f.Provider_ID, f.Provider_Type, f.Location, f.Food_Type, f.Meal_Type
+        ''',
+    },
+    "claims": {
+        "dataset": "Claim Status",
+        "select": "c.Claim_ID, c.Food_ID, c.Receiver_ID, c.Status, c.Timestamp, c.Quantity",
+    },
+}
+
+
+def _column(expr):
+    return expr.split(".")[-1]
+
+
+for _resource in RESOURCES.values():
+    _spec = dataset_view.DATASETS[_resource["dataset"]]
+    # query parameter -> filter label, e.g. "City" -> "City", "Food_ID" -> "Food ID"
+    _resource["filters"] = {_column(expr): label for label, expr in _spec["filters"].items()}
+    _resource["sorts"] = {column: label for label, (_, column) in _spec["sorts"].items()}
+    _resource["id_param"] = _column(_spec["filters"][_spec["id_filter"]])
+
+
+# Opaque page token: the keyset cursor as URL-safe base64 JSON
+def encode_cursor(cursor):
+    if cursor is None:
+        return None
+    return base64.urlsafe_b64encode(json.dumps(list(cursor)).encode()).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    try:
+        value, key = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        return value, key
+    except (TypeError, ValueError):
+        raise ApiError(400, "Invalid cursor.")
+
+
+def _int(value, name, minimum=None):
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        raise ApiError(400, f"{name} must be an integer.")
+    if minimum is not None and number < minimum:
+        raise ApiError(400, f"{name} must be at least {minimum}.")
+    return number
+
+
+# --- Reads ---
+# `q` searches the dataset's full-text index (search.py) and allows sort=relevance, which is then
+# the default
+def list_resource(name, query, db_path):
+    resource = RESOURCES[name]
+    dataset = resource["dataset"]
+    filters = {}
+    for param, values in query.items():
+        if param in ("limit", "cursor", "sort", "order", "count", "q"):
+            continue
+        if param not in resource["filters"]:
+            raise ApiError(400, f"Unknown filter '{param}'; use one of {', '.join(resource['filters'])}.")
+        value = values[-1]
+        filters[resource["filters"][param]] = _int(value, param) if param == resource["id_param"] else value
+    match = None
+    sorts = dict(resource["sorts"])
+    if "q" in query:
+        match, _ = search.match_expression(dataset_view.DATASETS[dataset]["search"][0], query["q"][-1], db_path)
+    if match is not None:
+        sorts["relevance"] = dataset_view.RELEVANCE
+    sort = query.get("sort", ["relevance" if match else resource["id_param"]])[-1]
+    if sort not in sorts:
+        raise ApiError(400, f"Can't sort by '{sort}'; use one of {', '.join(sorts)}.")
+    order = query.get("order", ["asc"])[-1]
+    if order not in ("asc", "desc"):
+        raise ApiError(400, "order must be asc or desc.")
+    limit = min(_int(query.get("limit", [DEFAULT_LIMIT])[-1], "limit", 1), MAX_LIMIT)
+    cursor = decode_cursor(query["cursor"][-1]) if "cursor" in query else None
+
+    columns, rows, next_cursor = dataset_view.fetch_rows(dataset, filters, sorts[sort], order == "desc",
+                                                         limit, cursor, db_path, resource["select"], match)
+    body = {"items": [dict(zip(columns, row)) for row in rows], "next_cursor": encode_cursor(next_cursor)}
+    if query.get("count", ["0"])[-1] not in ("0", "false"):
+        body["total"] = dataset_view.count_rows(dataset, filters, db_path, match)
+    return 200, body
+
+
+def get_one(name, item_id, db_path):
+    resource = RESOURCES[name]
+    spec = dataset_view.DATASETS[resource["dataset"]]
+    columns, rows, _ = dataset_view.fetch_rows(resource["dataset"], {spec["id_filter"]: item_id},
+                                               next(iter(spec["sorts"])), page_size=1, db_path=db_path,
+                                               select=resource["select"])
+    if not rows:
+        raise ApiError(404, f"{name[:-1].capitalize()} {item_id} not found.")
+    return dict(zip(columns, rows[0]))
+
+
+# --- Writes ---
+# Field values from a JSON body; `current` fills in what a PATCH leaves out
+def _fields(body, required, optional=(), current=None):
+    values = {}
+    for field in list(required) + list(optional):
+        value = body.get(field, None if current is None else current.get(field))
+        if isinstance(value, str):
+            value = value.strip()
+        if field in required and value in (None, ""):
+            raise ApiError(400, f"{field} is required.")
+        values[field] = value
+    unknown = set(body) - set(required) - set(optional)
+    if unknown:
+        raise ApiError(400, f"Unknown field(s): {', '.join(sorted(unknown))}.")
+    return values
+
+
+def _choice(value, choices, name):
+    if value is not None and value not in choices:
+        raise ApiError(400, f"{name} must be one of {', '.join(choices)}.")
+    return value
+
+
+def _expiry(value):
+    parsed = parse_date(str(value)) if value is not None else None
+    if parsed is None:
+        raise ApiError(400, "Expiry_Date must be a date (YYYY-MM-DD).")
+    return parsed.date()
+
+
+def save_provider(body, db_path, provider_id=None):
+    current = get_one("providers", provider_id, db_path) if provider_id is not None else None
+    f = _fields(body, ["Name", "Address", "City", "Contact"], ["Type"], current)
+    _choice(f["Type"], operations.PROVIDER_TYPES, "Type")
+    args = (f["Name"], f["Type"], f["Address"], f["City"], f["Contact"])
+    if provider_id is None:
+        return 201, get_one("providers", operations.insert_provider(*args, db_path=db_path), db_path)
+    operations.update_provider(provider_id, *args, db_path=db_path)
+    return 200, get_one("providers", provider_id, db_path)
+
+
+def save_receiver(body, db_path, receiver_id=None):
+    current = get_one("receivers", receiver_id, db_path) if receiver_id is not None else None
+    f = _fields(body, ["Name", "City", "Contact"], ["Type"], current)
+    _choice(f["Type"], operations.RECEIVER_TYPES, "Type")
+    args = (f["Name"], f["Type"], f["City"], f["Contact"])
+    if receiver_id is None:
+        return 201, get_one("receivers", operations.insert_receiver(*args, db_path=db_path), db_path)
+    operations.update_receiver(receiver_id, *args, db_path=db_path)
+    return 200, get_one("receivers", receiver_id, db_path)
+
+
+# Provider_Type and Location come from the provider, as on the Food Listings page
+def save_listing(body, db_path, food_id=None):
+    current = get_one("listings", food_id, db_path) if food_id is not None else None
+    fixed = ["Provider_ID"] if food_id is None else []
+    f = _fields(body, ["Food_Name", "Quantity", "Expiry_Date", "Food_Type", "Meal_Type"] + fixed, [], current)
+    quantity = _int(f["Quantity"], "Quantity", 1)
+    expiry = _expiry(f["Expiry_Date"])
+    _choice(f["Food_Type"], operations.FOOD_TYPES, "Food_Type")
+    _choice(f["Meal_Type"], operations.MEAL_TYPES, "Meal_Type")
+    if food_id is not None:
+        operations.update_food(food_id, f["Food_Name"], quantity, expiry.isoformat(), f["Food_Type"],
+                               f["Meal_Type"], db_path=db_path)
+        return 200, get_one("listings", food_id, db_path)
+    if expiry < date.today():
+        raise ApiError(400, "Expiry_Date is in the past.")
+    provider_id = _int(f["Provider_ID"], "Provider_ID")
+    provider = db.fetch_one("SELECT Type, City FROM providers WHERE Provider_ID = ?", (provider_id,),
+                            db_path=db_path, name="api: listing provider")
+    if provider is None:
+        raise ApiError(400, f"Provider {provider_id} does not exist.")
+    new_id = operations.insert_food(f["Food_Name"], quantity, expiry.isoformat(), provider_id, provider[0],
+                                    provider[1], f["Food_Type"], f["Meal_Type"], db_path=db_path)
+    return 201, get_one("listings", new_id, db_path)
+
+
+def create_claim(body, db_path):
+    f = _fields(body, ["Food_ID", "Receiver_ID"], ["Quantity"])
+    quantity = None if f["Quantity"] is None else _int(f["Quantity"], "Quantity", 1)
+    try:
+        claim_id, _, _ = operations.insert_claim(_int(f["Food_ID"], "Food_ID"), _int(f["Receiver_ID"], "Receiver_ID"),
+                                                 quantity, db_path=db_path)
+    except allocator.ClaimError as e:
+        raise ApiError(409, str(e))
+    return 201, get_one("claims", claim_id, db_path)
+
+
+# {"items": [...]} (claims may add "partial": false). Rows that fail validation are rejected
+# individually, so the response is 200 with one result per item, in order.
+def submit_batch(name, body, db_path):
+    items = body.get("items")
+    if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+        raise ApiError(400, "items must be a list of objects.")
+    try:
+        if name == "claims":
+            results = batches.submit_claims(items, partial=body.get("partial", True) is not False, db_path=db_path)
+        else:
+            results = batches.submit_listings(items, db_path=db_path)
+    except batches.BatchError as e:
+        raise ApiError(400, str(e))
+    inserted = sum(1 for r in results if r["Result"] == "Inserted")
+    return 200, {"inserted": inserted, "rejected": len(results) - inserted, "results": results}
+
+
+def change_claim(claim_id, action, db_path):
+    done = (operations.complete_claim if action == "complete" else operations.cancel_claim)(claim_id, db_path=db_path)
+    claim = get_one("claims", claim_id, db_path)
+    if not done:
+        raise ApiError(409, f"Claim {claim_id} is {claim['Status']}; it can't be {action}d.")
+    return 200, claim
+
+
+def delete(name, item_id, db_path):
+    remove = {"providers": operations.delete_provider, "receivers": operations.delete_receiver,
+              "listings": operations.delete_food}[name]
+    if not remove(item_id, db_path=db_path):
+        raise ApiError(404, f"{name[:-1].capitalize()} {item_id} not found.")
+    return 204, None
+
+
+def matches(receiver_id, query, db_path):
+    get_one("receivers", receiver_id, db_path)
+    k = min(_int(query.get("k", [matching.TOP_K])[-1], "k", 1), MAX_LIMIT)
+    food_type = query.get("Food_Type", [None])[-1]
+    meal_type = query.get("Meal_Type", [None])[-1]
+    return 200, {"items": matching.get_index(db_path).top_matches(receiver_id, k, food_type, meal_type)}
+
+
+_SAVE = {"providers": save_provider, "receivers": save_receiver, "listings": save_listing}
+_COLLECTION = re.compile(r"^/(providers|receivers|listings|claims)$")
+_ITEM = re.compile(r"^/(providers|receivers|listings|claims)/(\d+)$")
+_BATCH = re.compile(r"^/(claims|listings)/batch$")
+_CLAIM_ACTION = re.compile(r"^/claims/(\d+)/(complete|cancel)$")
+_MATCHES = re.compile(r"^/receivers/(\d+)/matches$")
+_ID = re.compile(r"/\d+")
+
+
+# (status, body) for one request
+def route(method, path, query, body, db_path):
+    if path == "/health":
+        return 200, {"status": "ok"}
+    match = _COLLECTION.match(path)
+    if match:
+        name = match.group(1)
+        if method == "GET":
+            return list_resource(name, query, db_path)
+        if method == "POST":
+            return create_claim(body, db_path) if name == "claims" else _SAVE[name](body, db_path)
+        raise ApiError(405, f"{method} is not allowed on {path}.")
+    match = _ITEM.match(path)
+    if match:
+        name, item_id = match.group(1), int(match.group(2))
+        if method == "GET":
+            return 200, get_one(name, item_id, db_path)
+        if method in ("PUT", "PATCH") and name in _SAVE:
+            return _SAVE[name](body, db_path, item_id)
+        if method == "DELETE" and name in _SAVE:
+            return delete(name, item_id, db_path)
+        raise ApiError(405, f"{method} is not allowed on {path}.")
+    match = _BATCH.match(path)
+    if match:
+        if method != "POST":
+            raise ApiError(405, f"{method} is not allowed on {path}.")
+        return submit_batch(match.group(1), body, db_path)
+    match = _CLAIM_ACTION.match(path)
+    if match and method == "POST":
+        return change_claim(int(match.group(1)), match.group(2), db_path)
+    match = _MATCHES.match(path)
+    if match and method == "GET":
+        return matches(int(match.group(1)), query, db_path)
+    raise ApiError(404, f"No route for {method} {path}.")
+
+
+# Path with numeric IDs folded, to tag statements on the Performance page without one entry per ID
+def _route_name(method, path):
+    return f"API {method} {_ID.sub('/{id}', path)}"
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    timeout = IDLE_TIMEOUT
+    # Headers and body go out in separate writes; without this, delayed ACKs add ~40ms to each
+    disable_nagle_algorithm = True
+
+    def _dispatch(self):
+        parts = urlsplit(self.path)
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            if length > MAX_BODY_BYTES:
+                raise ApiError(413, "Request body is too large.")
+            raw = self.rfile.read(length) if length else b""
+            try:
+                body = json.loads(raw) if raw else {}
+            except ValueError:
+                raise ApiError(400, "Request body must be JSON.")
+            if not isinstance(body, dict):
+                raise ApiError(400, "Request body must be a JSON object.")
+            with instrumentation.page(_route_name(self.command, parts.path)):
+                status, payload = route(self.command, parts.path, parse_qs(parts.query), body, self.server.db_path)
+        except ApiError as e:
+            status, payload = e.status, {"error": str(e)}
+        except sqlite3.IntegrityError as e:
+            status, payload = 409, {"error": f"Conflicts with existing data: {e}"}
+        except sqlite3.OperationalError as e:
+            # Usually "database is locked" after busy_timeout; the client can retry
+            status, payload = 503, {"error": str(e)}
+        except Exception as e:
+            traceback.print_exc()
+            status, payload = 500, {"error": f"{type(e).__name__}: {e}"}
+        self._send(status, payload)
+
+    def _send(self, status, payload):
+        data = b"" if payload is None else json.dumps(payload, default=str).encode()
+        self.send_response(status)
+        if data:
+            self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = _dispatch
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+# Thread per connection, capped: the accept loop stops accepting while `max_connections` are open
+class ApiServer(ThreadingHTTPServer):
+    request_queue_size = BACKLOG
+
+    def __init__(self, address, db_path=db.DB_PATH, max_connections=MAX_CONNECTIONS, verbose=False):
+        super().__init__(address, Handler)
+        self.db_path = db_path
+        self.verbose = verbose
+        self._slots = threading.BoundedSemaphore(max_connections)
+
+    def process_request(self, request, client_address):
+        self._slots.acquire()
+        try:
+            super().process_request(request, client_address)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def process_request_thread(self, request, client_address):
+        try:
+            super().process_request_thread(request, client_address)
+        finally:
+            self._slots.release()
+
+
+def serve(host=HOST, port=PORT, db_path=db.DB_PATH, max_connections=MAX_CONNECTIONS, verbose=False):
+    # Open the pool (and run pending migrations) before taking requests
+    db.get_pool(db_path)
+    server = ApiServer((host, port), db_path, max_connections, verbose)
+    exporter = csv_export.get_exporter(db_path)
+    exporter.start()
+    print(f"Serving {db_path} on http://{server.server_address[0]}:{server.server_address[1]} "
+          f"(up to {max_connections} connections)", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        # Leave the CSVs in step with the last writes
+        exporter.stop()
+        exporter.export()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON API for providers, receivers, food listings and claims")
+    parser.add_argument("--db", default=db.DB_PATH)
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--max-connections", type=int, default=MAX_CONNECTIONS)
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    args = parser.parse_args()
+    serve(args.host, args.port, args.db, args.max_connections, args.verbose)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+import argparse
+import csv
+import io
+import os
+import shutil
+import tempfile
+import time
+from datetime import date, datetime
+
+import allocator
+import bulk_import
+import db
+import instrumentation
+import operations
+from dates import parse_date
+
+# Batch submission of claims and food listings for NGOs and store chains that send many at once.
+# A batch is validated against the database in one pass (one IN lookup per referenced table),
+# written with a single executemany inside one BEGIN IMMEDIATE transaction. Rows that fail
+# validation are reported and skipped; the rest still go in. Every row gets a result, in input order.
+
+# Largest batch one call accepts; bigger files belong in bulk_import.py
+MAX_ROWS = 50000
+
+# Field kinds as in bulk_import.SCHEMAS; "!" marks a required value
+CLAIM_FIELDS = {"Food_ID": "int!", "Receiver_ID": "int!", "Quantity": "int"}
+LISTING_FIELDS = {"Food_Name": "text!", "Quantity": "int!", "Expiry_Date": "date!", "Provider_ID": "int!",
+                  "Food_Type": "text!", "Meal_Type": "text!"}
+
+
+class BatchError(ValueError):
+    pass
+
+
+# Rows of an uploaded CSV (bytes or text) as dicts keyed by the stripped header names
+def read_csv(data):
+    if isinstance(data, bytes):
+        data = data.decode('utf-8-sig')
+    reader = csv.reader(io.StringIO(data))
+    header = [h.strip() for h in next(reader, [])]
+    return [dict(zip(header, record)) for record in reader if any(field.strip() for field in record)]
+
+
+def _result(index, error=None, **values):
+    return {"Row": index + 1, "Result": "Rejected" if error else "Inserted", **values, "Error": error}
+
+
+# Convert every row with bulk_import.convert; returns ([(index, values)], results with the rejects filled in)
+def _parse(rows, fields):
+    if len(rows) > MAX_ROWS:
+        raise BatchError(f"A batch can hold at most {MAX_ROWS:,} rows; this one has {len(rows):,}.")
+    missing = [f for f, kind in fields.items() if kind.endswith('!') and rows and all(f not in row for row in rows)]
+    if missing:
+        raise BatchError(f"Missing column(s): {', '.join(missing)}.")
+    parsed, results = [], [None] * len(rows)
+    for index, row in enumerate(rows):
+        try:
+            values = {f: bulk_import.convert(f, kind, None if row.get(f) is None else str(row.get(f)))
+                      for f, kind in fields.items()}
+            if values["Quantity"] is not None and values["Quantity"] < 1:
+                raise bulk_import.RowError("Quantity must be at least 1.")
+        except bulk_import.RowError as e:
+            results[index] = _result(index, str(e))
+            continue
+        parsed.append((index, values))
+    return parsed, results
+
+
+# {id: rest of the row} for the ids `sql` finds; `sql` has a {marks} placeholder for the IN list
+def _lookup(conn, sql, ids):
+    found = {}
+    ids = sorted(ids)
+    for start in range(0, len(ids), bulk_import.IN_BATCH):
+        chunk = ids[start:start + bulk_import.IN_BATCH]
+        for row in conn.execute(sql.format(marks=",".join("?" * len(chunk))), chunk):
+            found[row[0]] = row[1:]
+    return found
+
+
+# executemany on the writer; returns the new rowids. AUTOINCREMENT hands out consecutive ids and
+# the writer is held for the whole transaction, so they end at last_insert_rowid().
+def _insert_many(conn, sql, params, name):
+    if not params:
+        return []
+    instrumentation.observe(conn, sql, params[0], lambda: conn.executemany(sql, params), name)
+    last = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+    return list(range(last - len(params) + 1, last + 1))
+
+
+# Claim each row's Quantity (all that is left when blank) of Food_ID for Receiver_ID. Rows are
+# granted in order against the quantity left after the rows before them, with the same rules as
+# allocator.claim. Returns one result per row: Claim_ID, Quantity granted and Timestamp, or Error.
+def submit_claims(rows, partial=True, db_path=db.DB_PATH):
+    parsed, results = _parse(rows, CLAIM_FIELDS)
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    accepted = []
+    with db.transaction(db_path) as conn:
+        listings = _lookup(conn, f"SELECT f.Food_ID, f.Expiry_Date, {allocator.AVAILABLE_SQL} FROM food_listings f "
+                                 "WHERE f.Food_ID IN ({marks})", {v["Food_ID"] for _, v in parsed})
+        receivers = _lookup(conn, "SELECT Receiver_ID FROM receivers WHERE Receiver_ID IN ({marks})",
+                            {v["Receiver_ID"] for _, v in parsed})
+        left = {food_id: row[1] for food_id, row in listings.items()}
+        for index, v in parsed:
+            food_id = v["Food_ID"]
+            try:
+                if food_id not in listings:
+                    raise allocator.ClaimError(f"Food ID {food_id} does not exist.")
+                if v["Receiver_ID"] not in receivers:
+                    raise allocator.ClaimError(f"Receiver ID {v['Receiver_ID']} does not exist.")
+                granted = allocator.grant(food_id, listings[food_id][0], left[food_id], v["Quantity"], partial)
+            except allocator.ClaimError as e:
+                results[index] = _result(index, str(e))
+                continue
+            left[food_id] -= granted
+            accepted.append((index, food_id, v["Receiver_ID"], granted))
+        claim_ids = _insert_many(conn, '''
+            INSERT INTO claims (Food_ID, Receiver_ID, Status, Timestamp, Quantity)
+            VALUES (?, ?, 'Pending', ?, ?)
+        ''', [(food_id, receiver_id, timestamp, granted) for _, food_id, receiver_id, granted in accepted],
+            "batch: insert claims")
+
+    for claim_id, (index, _, _, granted) in zip(claim_ids, accepted):
+        results[index] = _result(index, Claim_ID=claim_id, Quantity=granted, Timestamp=timestamp)
+    return results
+
+
+# List each row as surplus food. Provider_Type and Location come from the provider, as on the
+# Food Listings page; an expiry date in the past is rejected. Returns one result per row: Food_ID
+# or Error.
+def submit_listings(rows, db_path=db.DB_PATH):
+    parsed, results = _parse(rows, LISTING_FIELDS)
+    today = date.today()
+    accepted = []
+    with db.transaction(db_path) as conn:
+        providers = _lookup(conn, "SELECT Provider_ID, Type, City FROM providers WHERE Provider_ID IN ({marks})",
+                            {v["Provider_ID"] for _, v in parsed})
+        for index, v in parsed:
+            expiry = parse_date(v["Expiry_Date"]).date()
+            if expiry < today:
+                error = f"Expiry_Date {expiry.isoformat()} is in the past."
+            elif v["Provider_ID"] not in providers:
+                error = f"Provider {v['Provider_ID']} does not exist."
+            elif v["Food_Type"] not in operations.FOOD_TYPES:
+                error = f"Food_Type must be one of {', '.join(operations.FOOD_TYPES)}."
+            elif v["Meal_Type"] not in operations.MEAL_TYPES:
+                error = f"Meal_Type must be one of {', '.join(operations.MEAL_TYPES)}."
+            else:
+                ptype, location = providers[v["Provider_ID"]]
+                accepted.append((index, (v["Food_Name"], v["Quantity"], expiry.isoformat(), v["Provider_ID"], ptype,
+                                         location, v["Food_Type"], v["Meal_Type"])))
+                continue
+            results[index] = _result(index, error)
+        food_ids = _insert_many(conn, '''
+            INSERT INTO food_listings (Food_Name, Quantity, Expiry_Date, Provider_ID, Provider_Type, Location, Food_Type, Meal_Type)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', [params for _, params in accepted], "batch: insert food")
+
+    for food_id, (index, _) in zip(food_ids, accepted):
+        results[index] = _result(index, Food_ID=food_id)
+    return results
+
+
+# --- Benchmark: claims one call each (operations.insert_claim) against one batch, each run on
+# its own fresh listings (about 20 claims per listing) ---
+def _bench_rows(db_path, count):
+    with db.transaction(db_path) as conn:
+        provider = conn.execute("SELECT Provider_ID FROM providers LIMIT 1").fetchone()[0]
+        receivers = [row[0] for row in conn.execute("SELECT Receiver_ID FROM receivers LIMIT 1000")]
+    listings = submit_listings([{"Food_Name": f"Batch test {i}", "Quantity": count, "Expiry_Date": "2099-12-31",
+                                 "Provider_ID": provider, "Food_Type": "Vegan", "Meal_Type": "Lunch"}
+                                for i in range(max(count // 20, 1))], db_path)
+    food_ids = [r["Food_ID"] for r in listings]
+    return [{"Food_ID": food_ids[i % len(food_ids)], "Receiver_ID": receivers[i % len(receivers)], "Quantity": 1}
+            for i in range(count)]
+
+
+def benchmark(source, count):
+    workdir = tempfile.mkdtemp()
+    try:
+        db_path = os.path.join(workdir, "batch.db")
+        shutil.copyfile(source, db_path)
+        rows = _bench_rows(db_path, count)
+        start = time.perf_counter()
+        for row in rows:
+            operations.insert_claim(row["Food_ID"], row["Receiver_ID"], row["Quantity"], db_path=db_path)
+        single = time.perf_counter() - start
+        rows = _bench_rows(db_path, count)
+        start = time.perf_counter()
+        results = submit_claims(rows, db_path=db_path)
+        batched = time.perf_counter() - start
+    finally:
+        db.get_pool(db_path).close()
+        shutil.rmtree(workdir, ignore_errors=True)
+    inserted = sum(1 for r in results if r["Result"] == "Inserted")
+    print(f"{count:,} claims one call each: {single * 1000:9.1f}ms ({count / single:,.0f} rows/s)")
+    print(f"{count:,} claims as one batch:  {batched * 1000:9.1f}ms ({count / batched:,.0f} rows/s, "
+          f"{inserted:,} inserted)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Submit a CSV of claims or food listings as one batch")
+    parser.add_argument("kind", choices=["claims", "listings", "benchmark"])
+    parser.add_argument("csv_path", nargs="?")
+    parser.add_argument("--db", default=db.DB_PATH)
+    parser.add_argument("--rows", type=int, default=2000, help="claims to time with 'benchmark'")
+    parser.add_argument("--all-or-nothing", action="store_true",
+                        help="reject claims for more than is left instead of granting the remainder")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        raise SystemExit(f"Database file not found: {args.db}")
+    if args.kind == "benchmark":
+        benchmark(args.db, args.rows)
+        return
+    if not args.csv_path:
+        parser.error("csv_path is required")
+    with open(args.csv_path, 'rb') as f:
+        rows = read_csv(f.read())
+    start = time.perf_counter()
+    try:
+        if args.kind == "claims":
+            results = submit_claims(rows, partial=not args.all_or_nothing, db_path=args.db)
+        else:
+            results = submit_listings(rows, db_path=args.db)
+    except BatchError as e:
+        raise SystemExit(str(e))
+    elapsed = time.perf_counter() - start
+    rejected = [r for r in results if r["Result"] == "Rejected"]
+    print(f"{len(results) - len(rejected):,} inserted, {len(rejected):,} rejected in {elapsed * 1000:.1f}ms")
+    for r in rejected[:20]:
+        print(f"  row {r['Row']}: {r['Error']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlsplit
+
+import db
+
+# Request mix: operation -> share of requests. Writes claim one unit of the listings created
+# for the run, so they contend on the single writer like real claims do.
+MIX = {
+    "list listings by city": 0.30,
+    "page through providers": 0.20,
+    "get listing": 0.25,
+    "receiver matches": 0.10,
+    "create claim": 0.10,
+    "create listing": 0.05,
+}
+
+
+def _request(conn, method, path, body=None):
+    data = None if body is None else json.dumps(body)
+    headers = {"Content-Type": "application/json"} if data else {}
+    conn.request(method, path, data, headers)
+    response = conn.getresponse()
+    payload = response.read()
+    return response.status, json.loads(payload) if payload else None
+
+
+# Listings, cities, providers and receivers the clients pick from
+def prepare(url, listings, quantity):
+    parts = urlsplit(url)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+    _, providers = _request(conn, "GET", "/providers?limit=200")
+    _, receivers = _request(conn, "GET", "/receivers?limit=200")
+    provider_ids = [p["Provider_ID"] for p in providers["items"]]
+    cities = sorted({p["City"] for p in providers["items"] if p["City"]})
+    food_ids = []
+    for i in range(listings):
+        status, listing = _request(conn, "POST", "/listings", {
+            "Food_Name": f"Load test {i}", "Quantity": quantity, "Expiry_Date": "2099-12-31",
+            "Provider_ID": provider_ids[i % len(provider_ids)], "Food_Type": "Vegan", "Meal_Type": "Lunch",
+        })
+        if status != 201:
+            raise SystemExit(f"Could not create a listing: {status} {listing}")
+        food_ids.append(listing["Food_ID"])
+    conn.close()
+    return {"food_ids": food_ids, "cities": cities, "providers": provider_ids,
+            "receivers": [r["Receiver_ID"] for r in receivers["items"]]}
+
+
+def _pick(rng, data, cursors):
+    op = rng.choices(list(MIX), weights=list(MIX.values()))[0]
+    if op == "list listings by city":
+        return op, "GET", f"/listings?limit=50&Location={rng.choice(data['cities']).replace(' ', '%20')}", None
+    if op == "page through providers":
+        cursor = cursors.get("providers")
+        return op, "GET", "/providers?limit=50" + (f"&cursor={cursor}" if cursor else ""), None
+    if op == "get listing":
+        return op, "GET", f"/listings/{rng.choice(data['food_ids'])}", None
+    if op == "receiver matches":
+        return op, "GET", f"/receivers/{rng.choice(data['receivers'])}/matches?k=10", None
+    if op == "create claim":
+        return op, "POST", "/claims", {"Food_ID": rng.choice(data["food_ids"]),
+                                       "Receiver_ID": rng.choice(data["receivers"]), "Quantity": 1}
+    return op, "POST", "/listings", {"Food_Name": "Load test", "Quantity": 10, "Expiry_Date": "2099-12-31",
+                                     "Provider_ID": rng.choice(data["providers"]), "Food_Type": "Vegan",
+                                     "Meal_Type": "Dinner"}
+
+
+# One client: a kept-alive connection sending requests back to back until `deadline`.
+# Returns [(operation, status, ms)].
+def run_client(url, data, deadline, seed):
+    rng = random.Random(seed)
+    parts = urlsplit(url)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+    cursors = {}
+    samples = []
+    while time.time() < deadline:
+        op, method, path, body = _pick(rng, data, cursors)
+        start = time.perf_counter()
+        try:
+            status, payload = _request(conn, method, path, body)
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+            status, payload = 0, None
+        samples.append((op, status, (time.perf_counter() - start) * 1000))
+        if op == "page through providers" and status == 200:
+            cursors["providers"] = payload["next_cursor"]
+    conn.close()
+    return samples
+
+
+def run_process(args):
+    url, data, deadline, clients, seed = args
+    results = [None] * clients
+
+    def work(i):
+        results[i] = run_client(url, data, deadline, seed * 1000 + i)
+
+    threads = [threading.Thread(target=work, args=(i,)) for i in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return [sample for result in results for sample in result]
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+# Start api.py on a copy of `source` in `workdir`; returns (process, url)
+def start_server(source, workdir, max_connections):
+    db_path = os.path.join(workdir, "api.db")
+    shutil.copyfile(source, db_path)
+    port = _free_port()
+    env = {**os.environ, "LOCAL_FOOD_WM_CSV_DIR": workdir, "LOCAL_FOOD_WM_INSTRUMENT": "0"}
+    server = subprocess.Popen([sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "api.py"),
+                               "--db", db_path, "--port", str(port), "--max-connections", str(max_connections)],
+                              env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(300):
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            if _request(conn, "GET", "/health")[0] == 200:
+                return server, url
+        except OSError:
+            if server.poll() is not None:
+                raise SystemExit(f"api.py exited:\n{server.stderr.read().decode()}")
+            time.sleep(0.1)
+    server.kill()
+    raise SystemExit("api.py did not start within 30s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the JSON API and report requests/s and latency")
+    parser.add_argument("--db", default=db.DB_PATH, help="source database (the server runs on a temporary copy)")
+    parser.add_argument("--url", help="test an already running server instead (its database gets the writes)")
+    parser.add_argument("--max-connections", type=int, default=256, help="server connection limit")
+    parser.add_argument("--clients", type=int, default=16, help="concurrent connections per process")
+    parser.add_argument("--processes", type=int, default=2, help="client processes, each with --clients")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--listings", type=int, default=50)
+    parser.add_argument("--quantity", type=int, default=1000000)
+    args = parser.parse_args()
+
+    server = workdir = None
+    url = args.url
+    if url is None:
+        if not os.path.exists(args.db):
+            raise SystemExit(f"Database file not found: {args.db}")
+        workdir = tempfile.mkdtemp()
+    try:
+        if url is None:
+            server, url = start_server(args.db, workdir, args.max_connections)
+        data = prepare(url, args.listings, args.quantity)
+        deadline = time.time() + args.seconds
+        jobs = [(url, data, deadline, args.clients, seed) for seed in range(args.processes)]
+        start = time.perf_counter()
+        if args.processes == 1:
+            samples = run_process(jobs[0])
+        else:
+            with multiprocessing.get_context("spawn").Pool(args.processes) as procs:
+                samples = [s for batch in procs.map(run_process, jobs) for s in batch]
+        elapsed = time.perf_counter() - start
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+        if workdir is not None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    connections = args.processes * args.clients
+    ok = [ms for _, status, ms in samples if 200 <= status < 300]
+    print(f"{len(samples):,} requests over {connections} connections in {elapsed:.1f}s: "
+          f"{len(samples) / elapsed:,.0f} req/s ({len(ok) / elapsed:,.0f} successful)")
+    print(f"{'Operation':<26}{'requests':>10}{'errors':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for op in list(MIX) + ["all"]:
+        rows = [(status, ms) for name, status, ms in samples if op in ("all", name)]
+        if not rows:
+            continue
+        times = [ms for _, ms in rows]
+        errors = sum(1 for status, _ in rows if not 200 <= status < 300)
+        print(f"{op:<26}{len(rows):>10,}{errors:>8,}{statistics.median(times):>9.1f}"
+              f"{percentile(times, 95):>9.1f}{percentile(times, 99):>9.1f}")
+    statuses = {}
+    for _, status, _ in samples:
+        statuses[status] = statuses.get(status, 0) + 1
+    print("Status codes: " + ", ".join(f"{status}: {n:,}" for status, n in sorted(statuses.items())))
+
+
+if __name__ == "__main__":
+    main()
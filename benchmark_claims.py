@@ -0,0 +1,148 @@
+import argparse
+import multiprocessing
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+
+import allocator
+import db
+import migrations
+
+
+# Fresh listings every worker competes for, so contention is high and balances are easy to check
+def create_listings(db_path, count, quantity):
+    with db.transaction(db_path) as conn:
+        ids = []
+        for i in range(count):
+            ids.append(conn.execute('''
+                INSERT INTO food_listings (Food_Name, Quantity, Expiry_Date, Provider_ID, Location, Food_Type, Meal_Type)
+                VALUES (?, ?, '2099-12-31', NULL, 'Loadtest', 'Vegetarian', 'Lunch')
+            ''', (f"Load test {i}", quantity)).lastrowid)
+        receivers = [row[0] for row in conn.execute("SELECT Receiver_ID FROM receivers LIMIT 1000")]
+    return ids, receivers
+
+
+# One thread: claim random amounts (sometimes all-or-nothing) and cancel some of its own claims.
+# Returns (claims still held {claim_id: (food_id, qty)}, counters).
+def run_thread(db_path, listings, receivers, ops, max_qty, cancel_rate, seed):
+    rng = random.Random(seed)
+    held = {}
+    counts = {"claimed": 0, "cancelled": 0, "rejected": 0, "locked": 0}
+    for _ in range(ops):
+        try:
+            if held and rng.random() < cancel_rate:
+                claim_id = rng.choice(list(held))
+                if allocator.cancel(claim_id, db_path=db_path):
+                    del held[claim_id]
+                    counts["cancelled"] += 1
+                continue
+            food_id = rng.choice(listings)
+            claim_id, _, granted = allocator.claim(food_id, rng.choice(receivers), rng.randint(1, max_qty),
+                                                   partial=rng.random() < 0.5, db_path=db_path)
+            held[claim_id] = (food_id, granted)
+            counts["claimed"] += 1
+        except allocator.ClaimError:
+            counts["rejected"] += 1
+        except sqlite3.OperationalError:
+            counts["locked"] += 1
+    return held, counts
+
+
+def run_process(args):
+    db_path, listings, receivers, threads, ops, max_qty, cancel_rate, seed = args
+    results = [None] * threads
+
+    def work(i):
+        results[i] = run_thread(db_path, listings, receivers, ops, max_qty, cancel_rate, seed * 1000 + i)
+
+    workers = [threading.Thread(target=work, args=(i,)) for i in range(threads)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return results
+
+
+# Compare what the workers think they hold with the database, listing by listing
+def check_balances(db_path, listings, quantity, results):
+    expected = {food_id: 0 for food_id in listings}
+    for held, _ in results:
+        for food_id, granted in held.values():
+            expected[food_id] += granted
+    problems = []
+    with db.reader(db_path) as conn:
+        for food_id in listings:
+            reserved = conn.execute(f'''
+                SELECT {allocator.RESERVED_SQL} FROM food_listings f WHERE f.Food_ID = ?
+            ''', (food_id,)).fetchone()[0]
+            if reserved != expected[food_id] or reserved > quantity:
+                problems.append((food_id, quantity, reserved, expected[food_id]))
+    return expected, problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hammer allocator.claim/cancel from many threads and check balances")
+    parser.add_argument("--db", default=db.DB_PATH, help="source database (a temporary copy is used)")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--processes", type=int, default=1, help="separate processes, each with --threads")
+    parser.add_argument("--ops", type=int, default=500, help="operations per thread")
+    parser.add_argument("--listings", type=int, default=20)
+    parser.add_argument("--quantity", type=int, default=100)
+    parser.add_argument("--max-qty", type=int, default=8)
+    parser.add_argument("--cancel-rate", type=float, default=0.2)
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        raise SystemExit(f"Database file not found: {args.db}")
+    workdir = tempfile.mkdtemp()
+    try:
+        db_path = os.path.join(workdir, "claims.db")
+        shutil.copyfile(args.db, db_path)
+        pool = db.ConnectionPool(db_path)
+        migrations.migrate(pool)
+        pool.close()
+        listings, receivers = create_listings(db_path, args.listings, args.quantity)
+
+        jobs = [(db_path, listings, receivers, args.threads, args.ops, args.max_qty, args.cancel_rate, seed)
+                for seed in range(args.processes)]
+        start = time.perf_counter()
+        if args.processes == 1:
+            batches = [run_process(jobs[0])]
+        else:
+            # Spawned, not forked: SQLite connections must not cross a fork
+            with multiprocessing.get_context("spawn").Pool(args.processes) as procs:
+                batches = procs.map(run_process, jobs)
+        elapsed = time.perf_counter() - start
+
+        results = [result for batch in batches for result in batch]
+        totals = {}
+        for _, counts in results:
+            for name, n in counts.items():
+                totals[name] = totals.get(name, 0) + n
+        expected, problems = check_balances(db_path, listings, args.quantity, results)
+        db.get_pool(db_path).close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    workers = args.processes * args.threads
+    operations = workers * args.ops
+    print(f"{workers} workers ({args.processes} process(es) x {args.threads} threads), "
+          f"{args.listings} listings of {args.quantity}")
+    print(f"{operations:,} operations in {elapsed:.2f}s: {operations / elapsed:,.0f} ops/s, "
+          f"{totals['claimed'] / elapsed:,.0f} claims/s")
+    print(f"claimed {totals['claimed']:,}, cancelled {totals['cancelled']:,}, "
+          f"rejected (nothing left) {totals['rejected']:,}, database locked {totals['locked']:,}")
+    print(f"Reserved at the end: {sum(expected.values()):,} of {args.listings * args.quantity:,}")
+    if problems:
+        for food_id, quantity, reserved, want in problems[:10]:
+            print(f"  Food_ID {food_id}: quantity {quantity}, reserved {reserved}, workers hold {want}")
+        raise SystemExit("FAIL: balances do not match")
+    print("OK: every listing's reserved quantity matches the claims held and never exceeds its quantity")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+import argparse
+import os
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import time
+
+import db
+
+# Statements each page runs on a single rerun (reads only, so the benchmark never mutates the DB)
+PAGE_RERUNS = {
+    "Providers": [
+        "SELECT COUNT(*) FROM providers",
+        "SELECT seq FROM sqlite_sequence WHERE name='providers'",
+        "SELECT * FROM providers ORDER BY Provider_ID DESC LIMIT 1",
+    ],
+    "Receivers": [
+        "SELECT COUNT(*) FROM receivers",
+        "SELECT seq FROM sqlite_sequence WHERE name='receivers'",
+        "SELECT * FROM receivers ORDER BY Receiver_ID DESC LIMIT 1",
+    ],
+    "Food Details": [
+        "SELECT COUNT(*) FROM food_listings",
+        "SELECT DISTINCT Provider_ID, Type, City FROM providers",
+        "SELECT seq FROM sqlite_sequence WHERE name='food_listings'",
+        "SELECT * FROM food_listings ORDER BY Food_ID DESC LIMIT 1",
+    ],
+    "Claim Status": [
+        "SELECT COUNT(*) FROM claims",
+        "SELECT Food_ID FROM food_listings",
+        "SELECT Receiver_ID FROM receivers",
+        "SELECT seq FROM sqlite_sequence WHERE name='claims'",
+        "SELECT * FROM claims ORDER BY Claim_ID DESC LIMIT 1",
+    ],
+}
+
+
+# Old behaviour: a fresh connection per helper call
+def rerun_per_call(db_path, statements):
+    for sql in statements:
+        conn = sqlite3.connect(db_path)
+        conn.execute(sql).fetchall()
+        conn.close()
+
+
+# New behaviour: every helper borrows from the shared pool
+def rerun_pooled(pool, statements):
+    for sql in statements:
+        with pool.reader() as conn:
+            conn.execute(sql).fetchall()
+
+
+def time_reruns(fn, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.mean(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-rerun latency: per-call sqlite3.connect vs the shared pool")
+    parser.add_argument("--db", default=db.DB_PATH)
+    parser.add_argument("--runs", type=int, default=500)
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        raise SystemExit(f"Database file not found: {args.db}")
+
+    # Work on a copy so switching it to WAL does not touch the real file
+    workdir = tempfile.mkdtemp()
+    db_path = os.path.join(workdir, "bench.db")
+    shutil.copyfile(args.db, db_path)
+    pool = db.ConnectionPool(db_path)
+
+    print(f"{'Page':<15}{'before mean':>13}{'before p95':>12}{'after mean':>12}{'after p95':>11}{'speedup':>9}")
+    try:
+        for page, statements in PAGE_RERUNS.items():
+            before = time_reruns(lambda: rerun_per_call(db_path, statements), args.runs)
+            after = time_reruns(lambda: rerun_pooled(pool, statements), args.runs)
+            print(f"{page:<15}{before[0]:>11.3f}ms{before[1]:>10.3f}ms{after[0]:>10.3f}ms{after[1]:>9.3f}ms"
+                  f"{before[0] / after[0]:>8.1f}x")
+    finally:
+        pool.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+import argparse
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+import db
+import migrations
+from query_catalog import query_map, chart_queries, CITY_QUERY
+
+
+def query_params(conn, name):
+    if name == CITY_QUERY:
+        city = conn.execute("SELECT City FROM providers GROUP BY City ORDER BY COUNT(*) DESC LIMIT 1").fetchone()
+        return (city[0] if city else "",)
+    return ()
+
+
+# Median wall time in milliseconds, or None when the query does not run on this schema
+def time_query(pool, name, sql, runs):
+    samples = []
+    with pool.reader() as conn:
+        params = query_params(conn, name)
+        try:
+            for _ in range(runs):
+                start = time.perf_counter()
+                conn.execute(sql, params).fetchall()
+                samples.append((time.perf_counter() - start) * 1000)
+        except Exception:
+            return None
+    return statistics.median(samples)
+
+
+def time_all(db_path, runs):
+    pool = db.ConnectionPool(db_path)
+    try:
+        queries = list(query_map.items()) + [(f"Chart: {key}", sql) for key, sql in chart_queries.items()]
+        return {name: time_query(pool, name, sql, runs) for name, sql in queries}
+    finally:
+        pool.close()
+
+
+# EXPLAIN QUERY PLAN for every query, to check which ones use an index
+def query_plans(db_path):
+    pool = db.ConnectionPool(db_path)
+    try:
+        queries = list(query_map.items()) + [(f"Chart: {key}", sql) for key, sql in chart_queries.items()]
+        plans = {}
+        with pool.reader() as conn:
+            for name, sql in queries:
+                try:
+                    plans[name] = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", query_params(conn, name))]
+                except Exception as e:
+                    plans[name] = [f"error: {e}"]
+        return plans
+    finally:
+        pool.close()
+
+
+def fmt(ms):
+    return f"{ms:>9.3f}ms" if ms is not None else f"{'n/a':>11}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time every query_map entry before and after the schema migrations")
+    parser.add_argument("--db", default=db.DB_PATH)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--plans", action="store_true", help="also print the query plans after migrating")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        raise SystemExit(f"Database file not found: {args.db}")
+
+    workdir = tempfile.mkdtemp()
+    try:
+        before_path = os.path.join(workdir, "before.db")
+        after_path = os.path.join(workdir, "after.db")
+        shutil.copyfile(args.db, before_path)
+        shutil.copyfile(args.db, after_path)
+
+        with db.ConnectionPool(before_path).reader() as conn:
+            version = migrations.current_version(conn)
+        pool = db.ConnectionPool(after_path)
+        migrations.migrate(pool)
+        pool.close()
+
+        before = time_all(before_path, args.runs)
+        after = time_all(after_path, args.runs)
+        plans = query_plans(after_path) if args.plans else {}
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"Schema version {version} -> {migrations.LATEST_VERSION}, median of {args.runs} runs")
+    print(f"{'Query':<60}{'before':>11}{'after':>11}{'speedup':>9}")
+    for name in before:
+        speedup = f"{before[name] / after[name]:>8.1f}x" if before[name] and after[name] else f"{'':>9}"
+        print(f"{name[:58]:<60}{fmt(before[name])}{fmt(after[name])}{speedup}")
+        for line in plans.get(name, []):
+            print(f"    {line}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import synthetic_data
+
+WORKDIR = os.path.join(tempfile.gettempdir(), 'food_wm_scale')
+# Stop repeating a step once it has used this much wall time (10M-row scans are slow)
+STEP_BUDGET_S = 30.0
+
+
+def _measure(fn, runs):
+    samples, rows = [], None
+    spent = 0.0
+    for _ in range(runs):
+        start = time.perf_counter()
+        rows = fn()
+        elapsed = time.perf_counter() - start
+        samples.append(elapsed * 1000)
+        spent += elapsed
+        if spent > STEP_BUDGET_S:
+            break
+    samples.sort()
+    return {
+        "median_ms": round(statistics.median(samples), 3),
+        "min_ms": round(samples[0], 3),
+        "max_ms": round(samples[-1], 3),
+        "runs": len(samples),
+        "rows": rows,
+    }
+
+
+def _step(fn, runs):
+    try:
+        return _measure(fn, runs)
+    except Exception as e:
+        return {"error": f"{type(e).__name__}: {e}"}
+
+
+# Runs inside a child process whose LOCAL_FOOD_WM_DB points at the synthetic database,
+# so the app modules (db, dataset_view, result_cache) read it through their normal defaults
+def run_worker(runs):
+    import db
+    import dataset_view
+    import frames
+    import result_cache
+    from benchmark_queries import query_params
+    from query_catalog import query_map, chart_queries
+
+    pool = db.get_pool()
+    with pool.reader() as conn:
+        counts = {t: conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0] for t in synthetic_data.CSV_FILES}
+        params = {name: query_params(conn, name) for name in query_map}
+
+    def run_sql(sql, args=()):
+        with pool.reader() as conn:
+            return len(conn.execute(sql, args).fetchall())
+
+    results = {"row_counts": counts, "queries": {}, "charts": {}, "pages": {}}
+    for name, sql in query_map.items():
+        results["queries"][name] = _step(lambda: run_sql(sql, params[name]), runs)
+    for name, sql in chart_queries.items():
+        results["charts"][name] = _step(lambda: run_sql(sql), runs)
+
+    # Each page's data loading on a fresh render (no warm result cache or shared frames)
+    def table_read(table, columns=None):
+        return len(frames.read(table, columns))
+
+    def homepage(dataset):
+        spec = dataset_view.DATASETS[dataset]
+        for label in spec["filters"]:
+            if label != spec["id_filter"]:
+                dataset_view.filter_options(dataset, label)
+        dataset_view.count_rows(dataset, {})
+        df, _ = dataset_view.fetch_page(dataset, {}, next(iter(spec["sorts"])), page_size=50)
+        return len(df)
+
+    def queries_page():
+        cache = result_cache.ResultCache()
+        db.fetch_all("SELECT DISTINCT City FROM providers")
+        db.fetch_all("SELECT DISTINCT City FROM receivers")
+        return sum(len(cache.get_or_run(name, sql, ())) for name, sql in chart_queries.items())
+
+    def with_latest(table, key, read):
+        def load():
+            rows = read()
+            db.read_sql(f"SELECT * FROM {table} ORDER BY {key} DESC LIMIT 1")
+            db.fetch_one(f"SELECT seq FROM sqlite_sequence WHERE name='{table}'")
+            return rows
+        return load
+
+    pages = {f"homepage.py: {name}": (lambda name=name: homepage(name)) for name in dataset_view.DATASETS}
+    pages["Queries.py"] = queries_page
+    pages["Providers.py"] = with_latest("providers", "Provider_ID", lambda: table_read("providers"))
+    pages["Receivers.py"] = with_latest("receivers", "Receiver_ID", lambda: table_read("receivers"))
+    pages["Food_listing_datas.py"] = with_latest("food_listings", "Food_ID", lambda: (
+        table_read("food_listings", ["Food_ID", "Food_Name", "Quantity", "Expiry_Date", "Provider_ID",
+                                     "Provider_Type", "Location", "Food_Type", "Meal_Type"]),
+        db.read_sql("SELECT DISTINCT Provider_ID, Type, City FROM providers"),
+    )[0])
+    pages["claim_status.py"] = with_latest("claims", "Claim_ID", lambda: (
+        table_read("claims", ["Claim_ID", "Food_ID", "Receiver_ID", "Status", "Timestamp"]),
+        db.fetch_all("SELECT Food_ID FROM food_listings"),
+        db.fetch_all("SELECT Receiver_ID FROM receivers"),
+    )[0])
+    for name, fn in pages.items():
+        results["pages"][name] = _step(fn, runs)
+    return results
+
+
+# Synthetic database for one size, generated once and reused across runs
+def prepare(size, seed, workdir, regenerate):
+    db_path = os.path.join(workdir, f"synthetic_{size}_seed{seed}.db")
+    generated = None
+    if regenerate and os.path.exists(db_path):
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(db_path + suffix):
+                os.remove(db_path + suffix)
+    if not os.path.exists(db_path):
+        os.makedirs(workdir, exist_ok=True)
+        start = time.perf_counter()
+        synthetic_data.generate(db_path, synthetic_data.parse_size(size), seed=seed,
+                                report=lambda msg: print(f"  {msg}"))
+        generated = round(time.perf_counter() - start, 1)
+    return db_path, generated
+
+
+def _git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)))
+        return out.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time every query, chart and page data load on synthetic databases")
+    parser.add_argument("--sizes", default="10k,100k", help=f"comma separated: {', '.join(synthetic_data.SIZES)}")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--workdir", default=WORKDIR, help="where generated databases are kept between runs")
+    parser.add_argument("--out", default="scale_benchmark.json")
+    parser.add_argument("--regenerate", action="store_true")
+    parser.add_argument("--baseline", help="earlier results file to compare against")
+    parser.add_argument("--worker", metavar="RUNS", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        json.dump(run_worker(args.worker), sys.stdout)
+        return
+
+    report = {
+        "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "seed": args.seed,
+        "runs": args.runs,
+        "sizes": {},
+    }
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["sizes"]
+
+    for size in args.sizes.split(","):
+        print(f"[{size}]")
+        db_path, generated = prepare(size, args.seed, args.workdir, args.regenerate)
+        env = dict(os.environ, LOCAL_FOOD_WM_DB=db_path)
+        out = subprocess.run([sys.executable, os.path.abspath(__file__), "--worker", str(args.runs)],
+                             env=env, capture_output=True, text=True)
+        if out.returncode != 0:
+            raise SystemExit(f"Benchmark worker failed for {size}:\n{out.stderr}")
+        result = json.loads(out.stdout)
+        result["generate_seconds"] = generated
+        report["sizes"][size] = result
+
+        for section, label in (("queries", "query"), ("charts", "chart"), ("pages", "page")):
+            for name, timing in result[section].items():
+                shown = f"{timing['median_ms']:>10.1f}ms" if "median_ms" in timing else "     error"
+                before = baseline.get(size, {}).get(section, {}).get(name, {}).get("median_ms")
+                if before and "median_ms" in timing:
+                    shown += f"  ({timing['median_ms'] / before:.2f}x baseline)"
+                print(f"  {label:<6} {name[:60]:<62}{shown}")
+
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,280 @@
+import argparse
+import csv
+import json
+import os
+import sqlite3
+import time
+
+import db
+from dates import parse_date, parse_timestamp
+
+CHUNK_ROWS = 5000
+# Stay below SQLITE_MAX_VARIABLE_NUMBER on older SQLite builds
+IN_BATCH = 500
+
+# Column types per table; the first column is the primary key.
+# "!" marks a required value, "?" a column older CSVs don't have (left out of the import when absent).
+SCHEMAS = {
+    "providers": {"Provider_ID": "id", "Name": "text!", "Type": "text", "Address": "text", "City": "text",
+                  "Contact": "text"},
+    "receivers": {"Receiver_ID": "id", "Name": "text", "Type": "text", "City": "text", "Contact": "text"},
+    "food_listings": {"Food_ID": "id", "Food_Name": "text", "Quantity": "int", "Expiry_Date": "date",
+                      "Provider_ID": "int", "Provider_Type": "text", "Location": "text", "Food_Type": "text",
+                      "Meal_Type": "text"},
+    "claims": {"Claim_ID": "id", "Food_ID": "int", "Receiver_ID": "int", "Status": "text",
+               "Timestamp": "timestamp", "Quantity": "int?"},
+}
+
+FOREIGN_KEYS = {
+    "food_listings": {"Provider_ID": ("providers", "Provider_ID")},
+    "claims": {"Food_ID": ("food_listings", "Food_ID"), "Receiver_ID": ("receivers", "Receiver_ID")},
+}
+
+
+class RowError(ValueError):
+    pass
+
+
+def _to_int(column, value):
+    try:
+        number = float(value)
+    except ValueError:
+        raise RowError(f"{column} is not a number: {value!r}")
+    if not number.is_integer():
+        raise RowError(f"{column} is not a whole number: {value!r}")
+    return int(number)
+
+
+# Convert one CSV field to its SQLite value; empty fields become NULL
+def convert(column, kind, value):
+    value = value.strip() if value is not None else ''
+    if value == '':
+        if kind.endswith('!'):
+            raise RowError(f"{column} is required")
+        return None
+    kind = kind.rstrip('!?')
+    if kind in ('id', 'int'):
+        number = _to_int(column, value)
+        if number < 0:
+            raise RowError(f"{column} must not be negative: {value!r}")
+        return number
+    if kind == 'date' and parse_date(value) is None:
+        raise RowError(f"{column} is not a date: {value!r}")
+    if kind == 'timestamp' and parse_timestamp(value) is None:
+        raise RowError(f"{column} is not a timestamp: {value!r}")
+    return value
+
+
+# Line iterator over a binary file that knows the byte offset just past the last line handed out,
+# so a checkpoint can seek straight back to the next record
+class _TrackedLines:
+    def __init__(self, f):
+        self.f = f
+        self.offset = f.tell()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        line = self.f.readline()
+        if not line:
+            raise StopIteration
+        self.offset += len(line)
+        return line.decode('utf-8-sig')
+
+
+def _checkpoint_path(path):
+    return path + '.import-checkpoint.json'
+
+
+# True while an import of `path` is unfinished (running, or stopped and waiting to resume)
+def importing(path):
+    return os.path.exists(_checkpoint_path(path))
+
+
+def _load_checkpoint(table, path):
+    cp_path = _checkpoint_path(path)
+    if not os.path.exists(cp_path):
+        return None
+    with open(cp_path) as f:
+        checkpoint = json.load(f)
+    stat = os.stat(path)
+    # Only resume against the very same file
+    if checkpoint.get("table") != table or checkpoint.get("size") != stat.st_size \
+            or checkpoint.get("mtime") != stat.st_mtime:
+        return None
+    return checkpoint
+
+
+def _save_checkpoint(table, path, offset, line, stats):
+    stat = os.stat(path)
+    tmp = _checkpoint_path(path) + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump({"table": table, "size": stat.st_size, "mtime": stat.st_mtime,
+                   "offset": offset, "line": line, "stats": stats}, f)
+    os.replace(tmp, _checkpoint_path(path))
+
+
+def _existing_ids(conn, table, column, ids):
+    found = set()
+    ids = list(ids)
+    for start in range(0, len(ids), IN_BATCH):
+        batch = ids[start:start + IN_BATCH]
+        marks = ",".join("?" * len(batch))
+        found.update(r[0] for r in conn.execute(f"SELECT {column} FROM {table} WHERE {column} IN ({marks})", batch))
+    return found
+
+
+def _check_foreign_keys(conn, table, columns, rows):
+    good, bad = [], []
+    known = {}
+    for column, (ref_table, ref_column) in FOREIGN_KEYS.get(table, {}).items():
+        idx = columns.index(column)
+        wanted = {row[idx] for _, row in rows if row[idx] is not None}
+        known[column] = (idx, ref_table, _existing_ids(conn, ref_table, ref_column, wanted))
+    for line, row in rows:
+        for column, (idx, ref_table, ids) in known.items():
+            if row[idx] is not None and row[idx] not in ids:
+                bad.append((line, row, f"{column} {row[idx]} not found in {ref_table}"))
+                break
+        else:
+            good.append((line, row))
+    return good, bad
+
+
+def _upsert_sql(table, columns):
+    key = columns[0]
+    updates = ", ".join(f"{c}=excluded.{c}" for c in columns[1:])
+    return (f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+            f"ON CONFLICT({key}) DO UPDATE SET {updates}")
+
+
+# executemany for the whole batch; if any row violates a constraint, redo the batch row by row
+def _upsert(conn, table, columns, rows):
+    sql = _upsert_sql(table, columns)
+    conn.execute("SAVEPOINT bulk_chunk")
+    try:
+        conn.executemany(sql, [row for _, row in rows])
+        conn.execute("RELEASE bulk_chunk")
+        return len(rows), []
+    except sqlite3.IntegrityError:
+        conn.execute("ROLLBACK TO bulk_chunk")
+    done, bad = 0, []
+    for line, row in rows:
+        try:
+            conn.execute(sql, row)
+            done += 1
+        except sqlite3.IntegrityError as e:
+            bad.append((line, row, str(e)))
+    conn.execute("RELEASE bulk_chunk")
+    return done, bad
+
+
+def _rejects_path(path):
+    return path + '.rejects.csv'
+
+
+def _write_rejects(path, header, rejects):
+    if not rejects:
+        return
+    reject_path = _rejects_path(path)
+    new_file = not os.path.exists(reject_path)
+    with open(reject_path, 'a', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        if new_file:
+            writer.writerow(["Line", "Reason"] + header)
+        for line, row, reason in rejects:
+            writer.writerow([line, reason] + list(row))
+
+
+# Stream `path` into `table` in batched, checkpointed transactions.
+# Returns the counters: rows read, upserted and rejected.
+def import_csv(table, path, db_path=db.DB_PATH, chunk_rows=CHUNK_ROWS, check_foreign_keys=True,
+               resume=True, report=print):
+    schema = SCHEMAS[table]
+    columns = list(schema)
+    checkpoint = _load_checkpoint(table, path) if resume else None
+    stats = dict(checkpoint["stats"]) if checkpoint else {"read": 0, "upserted": 0, "rejected": 0}
+    started = time.perf_counter()
+    done_before = stats["read"]
+
+    with open(path, 'rb') as f:
+        lines = _TrackedLines(f)
+        reader = csv.reader(lines)
+        header = [h.strip() for h in next(reader)]
+        missing = [c for c in columns if c not in header and c != columns[0] and not schema[c].endswith('?')]
+        if missing:
+            raise ValueError(f"{path} is missing columns: {', '.join(missing)}")
+        columns = [c for c in columns if c in header or not schema[c].endswith('?')]
+        positions = [header.index(c) if c in header else None for c in columns]
+
+        line_no = 1
+        if checkpoint:
+            f.seek(checkpoint["offset"])
+            lines.offset = checkpoint["offset"]
+            line_no = checkpoint["line"]
+            if report:
+                report(f"Resuming {table} import at line {line_no + 1} ({stats['read']} rows already done)")
+        elif os.path.exists(_rejects_path(path)):
+            os.remove(_rejects_path(path))
+
+        while True:
+            chunk, rejects = [], []
+            for record in reader:
+                line_no += 1
+                try:
+                    row = tuple(convert(c, schema[c], record[p] if p is not None and p < len(record) else '')
+                                for c, p in zip(columns, positions))
+                    chunk.append((line_no, row))
+                except RowError as e:
+                    rejects.append((line_no, record, str(e)))
+                if len(chunk) + len(rejects) >= chunk_rows:
+                    break
+            if not chunk and not rejects:
+                break
+            read = len(chunk) + len(rejects)
+
+            with db.transaction(db_path) as conn:
+                if check_foreign_keys:
+                    chunk, fk_rejects = _check_foreign_keys(conn, table, columns, chunk)
+                    rejects += fk_rejects
+                upserted, failed = _upsert(conn, table, columns, chunk)
+                rejects += failed
+
+            stats["read"] += read
+            stats["upserted"] += upserted
+            stats["rejected"] += len(rejects)
+            _write_rejects(path, header, rejects)
+            _save_checkpoint(table, path, lines.offset, line_no, stats)
+            if report:
+                rate = (stats["read"] - done_before) / max(time.perf_counter() - started, 1e-9)
+                report(f"{table}: {stats['read']:,} rows read, {stats['upserted']:,} upserted, "
+                       f"{stats['rejected']:,} rejected ({rate:,.0f} rows/s)")
+
+    if os.path.exists(_checkpoint_path(path)):
+        os.remove(_checkpoint_path(path))
+    stats["seconds"] = time.perf_counter() - started
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import a providers/receivers/food/claims CSV")
+    parser.add_argument("table", choices=list(SCHEMAS))
+    parser.add_argument("csv_path")
+    parser.add_argument("--db", default=db.DB_PATH)
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--no-fk-check", action="store_true", help="skip the foreign key lookups")
+    parser.add_argument("--restart", action="store_true", help="ignore any saved checkpoint")
+    args = parser.parse_args()
+
+    stats = import_csv(args.table, args.csv_path, db_path=args.db, chunk_rows=args.chunk_rows,
+                       check_foreign_keys=not args.no_fk_check, resume=not args.restart)
+    rate = stats["read"] / max(stats["seconds"], 1e-9)
+    print(f"Done: {stats['upserted']:,} upserted, {stats['rejected']:,} rejected "
+          f"in {stats['seconds']:.1f}s ({rate:,.0f} rows/s)")
+    if stats["rejected"]:
+        print(f"Rejected rows written to {_rejects_path(args.csv_path)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,145 +1,152 @@
 import streamlit as st
 import pandas as pd
-import sqlite3
 import os
-from datetime import datetime
+import db
+import bulk_import
+import frames
+import operations
+import matching
+import allocator
+import batches
+import expiry
+
+import dataset_view
 
 # Paths
-DB_PATH = 'D:/Guvi_Project1/env/Scripts/Local_food_WM.db'
-CSV_PATH = 'D:/Guvi_Project1/dataset/claims_data.csv'
+CSV_PATH = operations.CSV_PATHS['claims']
+journal = operations.journal('claims')
 
 
 st.header('📋Claim Status⏳')
 
-clm_sts = pd.read_csv(CSV_PATH )
-st.dataframe(clm_sts) 
-
-
-
-
-# Load claims data
-if os.path.exists(CSV_PATH):
-    claims_df = pd.read_csv(CSV_PATH)
-else:
-    claims_df = pd.DataFrame(columns=["Claim_ID", "Food_ID", "Receiver_ID", "Status", "Timestamp"])
-
-
-
 # Initialize database
 def initialize_db():
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS claims (
-            Claim_ID INTEGER PRIMARY KEY AUTOINCREMENT,
-            Food_ID INTEGER,
-            Receiver_ID INTEGER,
-            Status TEXT,
-            Timestamp TEXT
-        )
-    ''')
-    conn.commit()
-    if cursor.execute("SELECT COUNT(*) FROM claims").fetchone()[0] == 0 and os.path.exists(CSV_PATH):
-        df = pd.read_csv(CSV_PATH)
-        df.to_sql('claims', conn, if_exists='append', index=False)
-    conn.close()
+    with db.transaction() as conn:
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS claims (
+                Claim_ID INTEGER PRIMARY KEY AUTOINCREMENT,
+                Food_ID INTEGER,
+                Receiver_ID INTEGER,
+                Status TEXT,
+                Timestamp TEXT
+            )
+        ''')
+        empty = conn.execute("SELECT COUNT(*) FROM claims").fetchone()[0] == 0
+
+    # Pages can be opened in any order, so the referenced tables may still be empty: skip the FK lookups
+    if empty and os.path.exists(CSV_PATH):
+        journal.compact()
+        bulk_import.import_csv('claims', CSV_PATH, check_foreign_keys=False, report=None)
+
 
 # Get next Claim ID
 def get_next_claim_id():
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("SELECT seq FROM sqlite_sequence WHERE name='claims'")
-    row = cursor.fetchone()
-    conn.close()
+    row = db.fetch_one("SELECT seq FROM sqlite_sequence WHERE name='claims'")
     return (row[0] + 1) if row else 1
 
-# Insert claim into DB
-def insert_claim(food_id, receiver_id):
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    cursor.execute('''
-        INSERT INTO claims (Food_ID, Receiver_ID, Status, Timestamp)
-        VALUES (?, ?, 'Pending', ?)
-    ''', (food_id, receiver_id, timestamp))
-    conn.commit()
-    new_id = cursor.lastrowid
-    conn.close()
-    return new_id, timestamp
+# Insert claim into DB, reserving the quantity atomically (raises allocator.ClaimError)
+def insert_claim(food_id, receiver_id, quantity=None):
+    return operations.insert_claim(food_id, receiver_id, quantity)
 
 # Completed a claim
 def Completed_claim(claim_id):
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("UPDATE claims SET Status='Completed' WHERE Claim_ID=?", (claim_id,))
-    conn.commit()
-    conn.close()
-
-    # Also update CSV
-    if os.path.exists(CSV_PATH):
-        df = pd.read_csv(CSV_PATH)
-        df.loc[df['Claim_ID'] == claim_id, 'Status'] = 'Completed'
-        df.to_csv(CSV_PATH, index=False)
+    return operations.complete_claim(claim_id)
 
 
-# Cancel a claim
+# Cancel a claim; its reserved quantity goes back to the listing
 def cancel_claim(claim_id):
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("UPDATE claims SET Status='Cancelled' WHERE Claim_ID=?", (claim_id,))
-    conn.commit()
-    conn.close()
-
-    # Also update CSV
-    if os.path.exists(CSV_PATH):
-        df = pd.read_csv(CSV_PATH)
-        df.loc[df['Claim_ID'] == claim_id, 'Status'] = 'Cancelled'
-        df.to_csv(CSV_PATH, index=False)
-
-# Append to CSV
-def append_to_csv(new_row):
-    if os.path.exists(CSV_PATH):
-        new_row.to_csv(CSV_PATH, mode='a', header=False, index=False)
-    else:
-        new_row.to_csv(CSV_PATH, mode='w', index=False)
+    return operations.cancel_claim(claim_id)
+
 
 # Get latest claim
 def get_latest_claim():
-    conn = sqlite3.connect(DB_PATH)
-    df = pd.read_sql_query("SELECT * FROM claims ORDER BY Claim_ID DESC LIMIT 1", conn)
-    conn.close()
-    return df
+    return db.read_sql("SELECT * FROM claims ORDER BY Claim_ID DESC LIMIT 1")
 
 # Initialize DB
 initialize_db()
 
-# Get available Food_IDs and Receiver_IDs
-with sqlite3.connect(DB_PATH) as conn:
-    food_ids = pd.read_sql_query("SELECT Food_ID FROM food_listings", conn)['Food_ID'].tolist()
-    receiver_ids = pd.read_sql_query("SELECT Receiver_ID FROM receivers", conn)['Receiver_ID'].tolist()
+# Load claims data
+claims_df = frames.load('claims', columns=["Claim_ID", "Food_ID", "Receiver_ID", "Status", "Timestamp"])
+clm_sts = claims_df
+st.dataframe(clm_sts) 
+
+# Get available Receiver_IDs
+receiver_ids = [row[0] for row in db.fetch_all("SELECT Receiver_ID FROM receivers")]
+
 
 # Claim Form
 st.markdown("<h3 style='text-align: center;'>📝 Claim Food</h3>", unsafe_allow_html=True)
 
+# Best matches for the receiver: same city first, then soonest expiry, largest quantity
+# and the food / meal types they usually claim. Only unexpired, unclaimed listings are offered.
+selected_receiver_id = st.selectbox("Receiver ID", receiver_ids)
+col1, col2, col3 = st.columns(3)
+with col1:
+    food_type = st.selectbox("Food Type", ["Any"] + dataset_view.filter_options("Food Listings", "Food Type"))
+with col2:
+    meal_type = st.selectbox("Meal Type", ["Any"] + dataset_view.filter_options("Food Listings", "Meal Type"))
+with col3:
+    top_k = st.selectbox("Suggestions", [5, 10, 25, 50], index=1)
+
+matches = pd.DataFrame(columns=["Food_ID"])
+if selected_receiver_id is not None:
+    matches = matching.match_frame(selected_receiver_id, top_k,
+                                   None if food_type == "Any" else food_type,
+                                   None if meal_type == "Any" else meal_type)
+if matches.empty:
+    st.info("No unexpired, unclaimed food matches this receiver right now.")
+else:
+    st.dataframe(matches, use_container_width=True, hide_index=True)
+    expiring = int(matches["Expiring_Soon"].sum())
+    if expiring:
+        st.warning(f"⏰ {expiring} of these expire within {expiry.EXPIRING_HOURS} hours.")
+
 with st.form("claim_form"):
     claim_id = get_next_claim_id()
     st.text_input("Claim ID", value=str(claim_id), disabled=True)
-    selected_food_id = st.selectbox("Food ID", food_ids)
-    selected_receiver_id = st.selectbox("Receiver ID", receiver_ids)
+    selected_food_id = st.selectbox("Food ID", matches["Food_ID"].tolist())
+    st.text_input("Receiver ID", value=str(selected_receiver_id), disabled=True, key="claim_receiver")
+    claim_qty = st.number_input("Quantity (more than is left claims the rest)", min_value=1, step=1)
     submit = st.form_submit_button("📥 Submit Claim")
 
-    if submit:
-        new_id, timestamp = insert_claim(selected_food_id, selected_receiver_id)
-        new_row = pd.DataFrame([{
-            "Claim_ID": new_id,
-            "Food_ID": selected_food_id,
-            "Receiver_ID": selected_receiver_id,
-            "Status": "Pending",
-            "Timestamp": timestamp
-        }])
-        append_to_csv(new_row)
-        st.success(f"✅ Claim submitted with ID {new_id}")
-        st.dataframe(new_row, use_container_width=True)
+    if submit and selected_food_id is None:
+        st.warning("⚠️ Pick a food item to claim.")
+    elif submit:
+        try:
+            new_id, timestamp, granted = insert_claim(selected_food_id, selected_receiver_id, int(claim_qty))
+        except allocator.ClaimError as e:
+            st.error(f"❌ {e}")
+        else:
+            new_row = pd.DataFrame([{
+                "Claim_ID": new_id,
+                "Food_ID": selected_food_id,
+                "Receiver_ID": selected_receiver_id,
+                "Status": "Pending",
+                "Timestamp": timestamp,
+                "Quantity": granted
+            }])
+            st.success(f"✅ Claim submitted with ID {new_id} for {granted} of Food ID {selected_food_id}")
+            st.dataframe(new_row, use_container_width=True)
+
+# Bulk claims: a CSV with Food_ID, Receiver_ID and optionally Quantity, written as one batch
+st.markdown("<h3 style='text-align: center;'>📦 Bulk Claims</h3>", unsafe_allow_html=True)
+with st.form("bulk_claim_form"):
+    claims_file = st.file_uploader("Claims CSV (Food_ID, Receiver_ID, Quantity)", type=["csv"])
+    all_or_nothing = st.checkbox("Reject claims for more than is left instead of claiming the rest")
+    bulk_submit = st.form_submit_button("📥 Submit Claims")
+
+    if bulk_submit and claims_file is None:
+        st.warning("⚠️ Choose a CSV file first.")
+    elif bulk_submit:
+        try:
+            results = batches.submit_claims(batches.read_csv(claims_file.getvalue()), partial=not all_or_nothing)
+        except batches.BatchError as e:
+            st.error(f"❌ {e}")
+        else:
+            results_df = pd.DataFrame(results)
+            inserted = int((results_df["Result"] == "Inserted").sum()) if len(results_df) else 0
+            st.success(f"✅ {inserted} of {len(results_df)} claims submitted")
+            st.dataframe(results_df, use_container_width=True, hide_index=True)
 
 # Recently submitted claim
 st.subheader("📝 Recently Submitted Claim")
@@ -162,12 +169,17 @@ if not pending_claims.empty:
         Cancel = st.button("❌ Cancel Claim", key="cancel_button")
 
     if Complete:
-        Completed_claim(selected_claim_id)
-        st.success(f"✅ Claim ID {selected_claim_id} has been marked as Completed.")
+        if Completed_claim(selected_claim_id):
+            st.success(f"✅ Claim ID {selected_claim_id} has been marked as Completed.")
+        else:
+            st.info(f"Claim ID {selected_claim_id} is no longer pending.")
 
     if Cancel:
-        cancel_claim(selected_claim_id)
-        st.warning(f"⚠️ Claim ID {selected_claim_id} has been Cancelled.")
+        if cancel_claim(selected_claim_id):
+            st.warning(f"⚠️ Claim ID {selected_claim_id} has been Cancelled and its quantity released.")
+        else:
+            st.info(f"Claim ID {selected_claim_id} was already cancelled.")
+
 else:
     st.info("No pending claims available to cancel.")
 
@@ -0,0 +1,768 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+
+import db
+from query_catalog import query_map, chart_queries, CITY_QUERY
+
+# Columnar analytics engine for the Queries page.
+# The four tables are snapshotted from one SQLite read transaction into Arrow IPC files, which
+# are memory-mapped back (zero copy: pages are shared with the OS cache and only touched
+# columns are read). Every query_map entry and chart query has a vectorized pyarrow.compute
+# equivalent below that reproduces SQLite's answer exactly: groups come out in SQLite's order
+# (ascending, NULL first), ORDER BY sorts NULL as the smallest value and breaks ties as the
+# catalog does, NULLs never join, COUNT / SUM stay integers, AVG is the float sum over the
+# non-NULL count and ROUND follows SQLite's printf rounding. A background thread re-snapshots
+# when the data versions move.
+
+SNAPSHOT_DIR = os.environ.get('LOCAL_FOOD_WM_SNAPSHOTS', os.path.join(tempfile.gettempdir(), 'food_wm_snapshots'))
+# Least time between two snapshots while writes keep coming in
+REFRESH_SECONDS = int(os.environ.get('LOCAL_FOOD_WM_SNAPSHOT_SECONDS', 60))
+CHUNK_ROWS = 65536
+
+TABLES = ("providers", "receivers", "food_listings", "claims")
+_KEYS = {"providers": "Provider_ID", "receivers": "Receiver_ID", "food_listings": "Food_ID", "claims": "Claim_ID"}
+ENGINES = ("SQLite", "Columnar")
+
+DAY = 86400
+
+
+class SnapshotError(RuntimeError):
+    pass
+
+
+# Snapshots of one database live in their own directory: a manifest naming the current
+# generation, and one sub-directory of .arrow files per generation
+def snapshot_dir(db_path=db.DB_PATH, root=None):
+    digest = hashlib.sha1(os.path.abspath(db_path).encode()).hexdigest()[:12]
+    return os.path.join(root or SNAPSHOT_DIR, digest)
+
+
+def _arrow_type(declared):
+    import pyarrow as pa
+
+    declared = (declared or "").upper()
+    if "INT" in declared:
+        return pa.int64()
+    if any(t in declared for t in ("REAL", "FLOA", "DOUB")):
+        return pa.float64()
+    return pa.string()
+
+
+# Stream a table to an Arrow IPC file in rowid order, CHUNK_ROWS per record batch
+def _write_table(conn, table, path):
+    import pyarrow as pa
+
+    columns = [(row[1], _arrow_type(row[2])) for row in conn.execute(f"PRAGMA table_info({table})")]
+    schema = pa.schema([pa.field(name, type_) for name, type_ in columns])
+    cursor = conn.execute(f"SELECT {', '.join(name for name, _ in columns)} FROM {table} ORDER BY rowid")
+    rows = 0
+    with pa.OSFile(path, 'wb') as sink, pa.ipc.new_file(sink, schema) as writer:
+        while True:
+            chunk = cursor.fetchmany(CHUNK_ROWS)
+            if not chunk:
+                break
+            try:
+                arrays = [pa.array(values, type=field.type) for values, field in zip(zip(*chunk), schema)]
+            except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError) as e:
+                # e.g. text stored in an INTEGER column; the engine can't match SQLite on it
+                raise SnapshotError(f"{table} has values that don't fit their declared column type: {e}")
+            writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+            rows += len(chunk)
+    return rows
+
+
+def _read_manifest(directory):
+    try:
+        with open(os.path.join(directory, "manifest.json"), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+# Write a new generation from one read transaction, then switch the manifest to it with an
+# atomic rename. Returns the manifest.
+def write_snapshot(db_path=db.DB_PATH, directory=None):
+    directory = directory or snapshot_dir(db_path)
+    os.makedirs(directory, exist_ok=True)
+    generation = f"gen-{time.time_ns()}"
+    target = os.path.join(directory, generation)
+    os.makedirs(target)
+    try:
+        with db.snapshot(db_path) as conn:
+            versions = db.data_versions(conn=conn)
+            rows = {table: _write_table(conn, table, os.path.join(target, f"{table}.arrow")) for table in TABLES}
+    except BaseException:
+        shutil.rmtree(target, ignore_errors=True)
+        raise
+    manifest = {"generation": generation, "created": time.time(), "versions": versions, "rows": rows}
+    tmp_path = os.path.join(directory, f"manifest.{threading.get_ident()}.tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, os.path.join(directory, "manifest.json"))
+    _prune(directory, generation)
+    return manifest
+
+
+# Older generations go once nothing maps them any more (Windows refuses to delete a mapped
+# file, so those are retried after the next snapshot)
+def _prune(directory, keep):
+    for name in os.listdir(directory):
+        if name.startswith("gen-") and name != keep:
+            shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+
+
+# One immutable generation of the four tables, memory-mapped. Join positions are computed
+# once per snapshot and shared by every query that needs them.
+class Snapshot:
+    def __init__(self, directory, manifest):
+        import pyarrow as pa
+
+        self.manifest = manifest
+        self.versions = manifest["versions"]
+        self.created = manifest["created"]
+        self.tables = {}
+        for table in TABLES:
+            path = os.path.join(directory, manifest["generation"], f"{table}.arrow")
+            self.tables[table] = pa.ipc.open_file(pa.memory_map(path)).read_all()
+        self._positions = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, table):
+        return self.tables[table]
+
+    @property
+    def rows(self):
+        return sum(t.num_rows for t in self.tables.values())
+
+    # Row position in `table` of each value of `column` (NULL where nothing matches): a
+    # many-to-one join on the table's key
+    def positions(self, source, column, table):
+        import pyarrow.compute as pc
+
+        key = (source, column, table)
+        with self._lock:
+            found = self._positions.get(key)
+        if found is None:
+            found = pc.index_in(self.tables[source][column], options=pc.SetLookupOptions(
+                self.tables[table][_KEYS[table]], skip_nulls=True))
+            with self._lock:
+                self._positions[key] = found
+        return found
+
+
+# Keeps a database's snapshot current: a new one is written when the data versions have moved
+# and the last one is at least REFRESH_SECONDS old
+class Snapshotter:
+    def __init__(self, db_path=db.DB_PATH, directory=None, refresh_seconds=REFRESH_SECONDS):
+        self.db_path = db_path
+        self.directory = directory or snapshot_dir(db_path)
+        self.refresh_seconds = refresh_seconds
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.last_error = None
+
+    # The snapshot on disk, loaded once per generation; written first when there is none
+    def current(self):
+        manifest = _read_manifest(self.directory)
+        if manifest is None:
+            self.refresh(force=True)
+            manifest = _read_manifest(self.directory)
+        with self._lock:
+            if self._snapshot is None or self._snapshot.manifest["generation"] != manifest["generation"]:
+                self._snapshot = Snapshot(self.directory, manifest)
+            return self._snapshot
+
+    # True when a new snapshot was written
+    def refresh(self, force=False):
+        with self._write_lock:
+            manifest = _read_manifest(self.directory)
+            if manifest is not None and not force:
+                if manifest["versions"] == db.data_versions(self.db_path):
+                    return False
+                if time.time() - manifest["created"] < self.refresh_seconds:
+                    return False
+            write_snapshot(self.db_path, self.directory)
+            return True
+
+    # Table versions the snapshot is behind the database by, {table: writes}
+    def lag(self):
+        with self._lock:
+            snapshot = self._snapshot
+        if snapshot is None:
+            return {}
+        versions = db.data_versions(self.db_path)
+        return {t: versions.get(t, 0) - snapshot.versions.get(t, 0) for t in TABLES
+                if versions.get(t, 0) != snapshot.versions.get(t, 0)}
+
+    def start(self, interval=None):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, args=(interval or self.refresh_seconds,),
+                                            daemon=True, name="columnar-snapshotter")
+        self._thread.start()
+
+    def _run(self, interval):
+        while not self._stop.wait(interval):
+            try:
+                self.refresh()
+                self.last_error = None
+            except Exception as e:
+                # A locked database or a full disk shouldn't kill the thread; try again next time
+                self.last_error = e
+
+    def stop(self):
+        self._stop.set()
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join()
+
+
+_snapshotters = {}
+_snapshotters_lock = threading.Lock()
+
+
+# The process-wide snapshotter for a database, refreshing in the background from first use
+def get_snapshotter(db_path=db.DB_PATH):
+    with _snapshotters_lock:
+        if db_path not in _snapshotters:
+            _snapshotters[db_path] = Snapshotter(db_path)
+        snapshotter = _snapshotters[db_path]
+    snapshotter.start()
+    return snapshotter
+
+
+# --- SQLite semantics on Arrow tables ---
+
+# Stable sort on [(column, "ascending" | "descending")] with SQLite's NULL placement: NULLs
+# are the smallest value, so first ascending and last descending
+def order_by(table, keys, limit=None):
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    columns, sort_keys = {}, []
+    for i, (column, direction) in enumerate(keys):
+        values = table[column]
+        if values.null_count:
+            columns[f"valid{i}"] = pc.is_valid(values)
+            sort_keys.append((f"valid{i}", direction))
+        columns[f"key{i}"] = values
+        sort_keys.append((f"key{i}", direction))
+    indices = pc.sort_indices(pa.table(columns), sort_keys=sort_keys)
+    return table.take(indices if limit is None else indices[:limit])
+
+
+# GROUP BY `keys` with [(column, function, output name)] aggregations, function one of
+# count_all, count, sum, avg, count_distinct. Groups come out sorted by key, as SQLite emits them.
+def group_by(table, keys, aggregations):
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    specs, outputs = [], []
+    for column, function, name in aggregations:
+        if function == "count_all":
+            specs.append(([], "count_all"))
+            outputs.append((name, ["count_all"], function))
+        elif function == "avg":
+            specs += [(column, "sum"), (column, "count")]
+            outputs.append((name, [f"{column}_sum", f"{column}_count"], function))
+        else:
+            specs.append((column, function))
+            outputs.append((name, [f"{column}_{function}"], function))
+    grouped = table.group_by(keys, use_threads=False).aggregate(specs)
+    columns = {key: grouped[key] for key in keys}
+    for name, sources, function in outputs:
+        if function == "avg":
+            total, count = grouped[sources[0]], grouped[sources[1]]
+            # NULL for a group with no values, like AVG over nothing
+            count = pc.if_else(pc.equal(count, 0), pa.scalar(None, pa.int64()), count)
+            columns[name] = pc.divide(pc.cast(total, pa.float64()), pc.cast(count, pa.float64()))
+        else:
+            columns[name] = grouped[sources[0]]
+    return order_by(pa.table(columns), [(key, "ascending") for key in keys])
+
+
+# ROUND(x, 2) as SQLite 3.x computes it: printf("%.2f") in long double, with the 3e-16 nudge
+# SQLite adds to values below 2^39, then read back. numpy's longdouble is the same type the
+# platform's SQLite uses (80-bit on x86 Linux / macOS, plain double with MSVC).
+def _round2_emulated(values):
+    import numpy as np
+
+    ld = np.longdouble
+    magnitude = np.abs(values)
+    exponent = ((magnitude.view(np.uint64) >> np.uint64(52)) & np.uint64(0x7ff)).astype(np.int64) - 1023
+    v = magnitude.astype(ld)
+    rounder = np.full(len(v), ld(np.float64(5.0e-3)))
+    nudge = 2 + np.trunc(exponent / 3) < 15
+    rounder[nudge] += v[nudge] * ld(np.float64(3e-16))
+    result = (np.floor((v + rounder) * ld(100)) / ld(100)).astype(np.float64)
+    return np.where(values < 0, -result, result)
+
+
+def _round2_sqlite(values):
+    import numpy as np
+
+    conn = sqlite3.connect(":memory:")
+    try:
+        conn.execute("CREATE TABLE v (x REAL)")
+        conn.executemany("INSERT INTO v VALUES (?)", ((float(x),) for x in values))
+        rows = conn.execute("SELECT ROUND(x, 2) FROM v ORDER BY rowid")
+        return np.array([row[0] for row in rows], dtype=np.float64)
+    finally:
+        conn.close()
+
+
+_round2 = None
+
+
+# The emulation is checked once against the linked SQLite on awkward values (halves, thirds,
+# large magnitudes); if a SQLite build rounds differently, rounding is left to SQLite itself
+def _rounder():
+    global _round2
+    if _round2 is None:
+        import numpy as np
+
+        probe = np.concatenate([np.arange(-2000, 2000) / 400 + 0.005, np.arange(1, 3000) / 3,
+                                np.arange(1, 3000) * 100.0 / 7, [1e12 + 0.125, 2.0 ** 40 / 3, 0.0]])
+        matches = np.array_equal(_round2_emulated(probe), _round2_sqlite(probe))
+        _round2 = _round2_emulated if matches else _round2_sqlite
+    return _round2
+
+
+def round2(array):
+    import numpy as np
+    import pyarrow as pa
+
+    array = array.combine_chunks() if isinstance(array, pa.ChunkedArray) else array
+    rounded = array.to_numpy(zero_copy_only=False).astype(np.float64)
+    valid = array.is_valid().to_numpy(zero_copy_only=False)
+    rounded[valid] = _rounder()(rounded[valid])
+    return pa.array(rounded, type=pa.float64(), mask=None if array.null_count == 0 else ~valid)
+
+
+# Columns of `table` joined onto `source` rows through Snapshot.positions (an inner join:
+# rows without a match are dropped). `columns` is {output name: column of `table`}; `rows` is
+# the filter already applied to `source_table`, if any.
+def _join(s, source_table, source, column, table, columns, rows=None):
+    import pyarrow.compute as pc
+
+    positions = s.positions(source, column, table)
+    if rows is not None:
+        positions = positions.filter(rows)
+    matched = pc.is_valid(positions)
+    result = source_table.filter(matched)
+    positions = positions.filter(matched)
+    for name, target in columns.items():
+        result = result.append_column(name, s[table][target].take(positions))
+    return result
+
+
+def _today():
+    return int(time.time()) // DAY * DAY
+
+
+# --- query_map ---
+
+def q1(s):
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    p = group_by(s["providers"].select(["City"]), ["City"], [(None, "count_all", "Providers")])
+    r = group_by(s["receivers"].select(["City"]), ["City"], [(None, "count_all", "Receivers")])
+    found = pc.index_in(p["City"], options=pc.SetLookupOptions(r["City"], skip_nulls=True))
+    receivers = pc.fill_null(r["Receivers"].take(found), 0)
+    return pa.table({"City": p["City"], "Providers": p["Providers"], "Receivers": receivers})
+
+
+def q2(s):
+    grouped = group_by(s["food_listings"].select(["Provider_Type"]), ["Provider_Type"],
+                       [(None, "count_all", "Total_Food_Items")])
+    return order_by(grouped, [("Total_Food_Items", "descending"), ("Provider_Type", "ascending")], limit=1)
+
+
+def q3(s, city):
+    import pyarrow.compute as pc
+
+    providers = s["providers"]
+    return providers.filter(pc.equal(providers["City"], city)).select(["Name", "Type", "Address", "Contact"])
+
+
+def _claims_by_receiver(s, status=None):
+    import pyarrow.compute as pc
+
+    claims = s["claims"].select(["Claim_ID", "Status"])
+    rows = None if status is None else pc.fill_null(pc.equal(claims["Status"], status), False)
+    if rows is not None:
+        claims = claims.filter(rows)
+    return _join(s, claims, "claims", "Receiver_ID", "receivers", {"Name": "Name"}, rows)
+
+
+def q4(s):
+    grouped = group_by(_claims_by_receiver(s), ["Name"], [("Claim_ID", "count", "Claims")])
+    return order_by(grouped, [("Claims", "descending"), ("Name", "ascending")], limit=5)
+
+
+def q5(s):
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    return pa.table({"Total_Quantity": pa.array([pc.sum(s["food_listings"]["Quantity"]).as_py()], pa.int64())})
+
+
+def q6(s):
+    food = _join(s, s["food_listings"].select(["Food_ID"]), "food_listings", "Provider_ID", "providers",
+                 {"City": "City"})
+    grouped = group_by(food.select(["City"]), ["City"], [(None, "count_all", "Listings")])
+    return order_by(grouped, [("Listings", "descending"), ("City", "ascending")], limit=1)
+
+
+def q7(s):
+    grouped = group_by(s["food_listings"].select(["Food_Type"]), ["Food_Type"], [(None, "count_all", "Count")])
+    return order_by(grouped, [("Count", "descending"), ("Food_Type", "ascending")], limit=5)
+
+
+def q8(s):
+    claims = _join(s, s["claims"].select(["Claim_ID"]), "claims", "Food_ID", "food_listings",
+                   {"Food_Name": "Food_Name"})
+    grouped = group_by(claims, ["Food_Name"], [("Claim_ID", "count", "Total_Claims")])
+    return order_by(grouped, [("Total_Claims", "descending"), ("Food_Name", "ascending")])
+
+
+def q9(s):
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    claims = s["claims"]
+    completed = pc.fill_null(pc.equal(claims["Status"], "Completed"), False)
+    food_rows = s.positions("claims", "Food_ID", "food_listings").filter(completed).drop_null()
+    provider_rows = s.positions("food_listings", "Provider_ID", "providers").take(food_rows).drop_null()
+    names = pa.table({"Name": s["providers"]["Name"].take(provider_rows)})
+    grouped = group_by(names, ["Name"], [(None, "count_all", "Successful_Claims")])
+    return order_by(grouped, [("Successful_Claims", "descending"), ("Name", "ascending")], limit=1)
+
+
+def q10(s):
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    claims = s["claims"]
+    grouped = group_by(claims.select(["Status"]), ["Status"], [(None, "count_all", "Count")])
+    share = pc.divide(pc.multiply(pc.cast(grouped["Count"], pa.float64()), 100.0), float(claims.num_rows))
+    return pa.table({"Status": grouped["Status"], "Percentage": round2(share)})
+
+
+def _rounded(table, column):
+    return table.set_column(table.schema.get_field_index(column), column, round2(table[column]))
+
+
+def q11(s):
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    food_rows = s.positions("claims", "Food_ID", "food_listings")
+    receiver_rows = s.positions("claims", "Receiver_ID", "receivers")
+    both = pc.and_(pc.is_valid(food_rows), pc.is_valid(receiver_rows))
+    joined = pa.table({"Name": s["receivers"]["Name"].take(receiver_rows.filter(both)),
+                       "Quantity": s["food_listings"]["Quantity"].take(food_rows.filter(both))})
+    grouped = _rounded(group_by(joined, ["Name"], [("Quantity", "avg", "Avg_Quantity")]), "Avg_Quantity")
+    return order_by(grouped, [("Avg_Quantity", "descending"), ("Name", "ascending")], limit=10)
+
+
+def q12(s):
+    claims = _join(s, s["claims"].select(["Claim_ID"]), "claims", "Food_ID", "food_listings",
+                   {"Meal_Type": "Meal_Type"})
+    grouped = group_by(claims.select(["Meal_Type"]), ["Meal_Type"], [(None, "count_all", "Claim_Count")])
+    return order_by(grouped, [("Claim_Count", "descending"), ("Meal_Type", "ascending")], limit=1)
+
+
+def q13(s):
+    food = _join(s, s["food_listings"].select(["Quantity"]), "food_listings", "Provider_ID", "providers",
+                 {"Name": "Name"})
+    grouped = group_by(food, ["Name"], [("Quantity", "sum", "Total_Donated")])
+    return order_by(grouped, [("Total_Donated", "descending"), ("Name", "ascending")], limit=10)
+
+
+def q14(s):
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    claims = _join(s, s["claims"].select(["Timestamp_Epoch"]), "claims", "Food_ID", "food_listings",
+                   {"Expiry_Epoch": "Expiry_Epoch"})
+    gaps = pc.subtract(claims["Timestamp_Epoch"], claims["Expiry_Epoch"])
+    count = pc.count(gaps).as_py()
+    average = pc.sum(gaps).as_py() / count / 86400.0 if count else None
+    return pa.table({"Avg_Days_Before_Expiry": round2(pa.array([average], pa.float64()))})
+
+
+def _unclaimed(s):
+    import pyarrow.compute as pc
+
+    return pc.invert(pc.is_in(s["food_listings"]["Food_ID"], value_set=s["claims"]["Food_ID"]))
+
+
+def q15(s):
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    expired = pc.fill_null(pc.less(s["food_listings"]["Expiry_Epoch"], _today()), False)
+    return pa.table({"Expired_Unclaimed": pa.array([pc.sum(pc.and_(expired, _unclaimed(s))).as_py() or 0], pa.int64())})
+
+
+def q16(s):
+    grouped = group_by(s["food_listings"].select(["Provider_Type", "Quantity"]), ["Provider_Type"],
+                       [("Quantity", "avg", "Avg_Quantity")])
+    return _rounded(grouped, "Avg_Quantity")
+
+
+def q17(s):
+    food = s["food_listings"].select(["Quantity"])
+    unclaimed = _unclaimed(s)
+    food = _join(s, food.filter(unclaimed), "food_listings", "Provider_ID", "providers", {"City": "City"}, unclaimed)
+    grouped = group_by(food, ["City"], [("Quantity", "sum", "Unclaimed_Quantity")])
+    return order_by(grouped, [("Unclaimed_Quantity", "descending"), ("City", "ascending")], limit=1)
+
+
+# DISTINCT keeps the first occurrence of each (Name, City), in providers' rowid order
+def q18(s):
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    providers, food = s["providers"], s["food_listings"]
+    listed = pc.is_in(providers["Provider_ID"], value_set=food["Provider_ID"])
+    with_unclaimed = pc.is_in(providers["Provider_ID"], value_set=food["Provider_ID"].filter(_unclaimed(s)))
+    chosen = providers.filter(pc.or_(pc.invert(listed), with_unclaimed)).select(["Name", "City"])
+    chosen = chosen.append_column("_row", pa.array(range(chosen.num_rows), pa.int64()))
+    first = chosen.group_by(["Name", "City"], use_threads=False).aggregate([("_row", "min")])["_row_min"]
+    return chosen.take(first.sort()).select(["Name", "City"])
+
+
+def q19(s):
+    import pyarrow.compute as pc
+
+    food = s["food_listings"]
+    today = _today()
+    epoch = food["Expiry_Epoch"]
+    due = pc.fill_null(pc.and_(pc.greater_equal(epoch, today), pc.less_equal(epoch, today + 3 * DAY)), False)
+    due = order_by(food.filter(due), [("Expiry_Epoch", "ascending"), ("Food_ID", "ascending")])
+    return due.select(["Food_Name", "Expiry_Date", "Quantity"])
+
+
+def q20(s):
+    grouped = group_by(s["food_listings"].select(["Expiry_Month", "Quantity"]), ["Expiry_Month"],
+                       [("Quantity", "sum", "Total_Donated")])
+    grouped = grouped.rename_columns(["Month", "Total_Donated"])
+    return order_by(grouped, [("Month", "descending")])
+
+
+def q21(s):
+    grouped = group_by(s["food_listings"].select(["Food_Name", "Quantity"]), ["Food_Name"],
+                       [("Quantity", "sum", "Total_Quantity")])
+    return order_by(grouped, [("Total_Quantity", "descending"), ("Food_Name", "ascending")], limit=5)
+
+
+def q22(s):
+    return group_by(s["receivers"].select(["City", "Receiver_ID"]), ["City"],
+                    [("Receiver_ID", "count_distinct", "Unique_Receivers")])
+
+
+def q23(s):
+    grouped = group_by(_claims_by_receiver(s, "Canceled"), ["Name"], [(None, "count_all", "Canceled_Claims")])
+    return order_by(grouped, [("Canceled_Claims", "descending"), ("Name", "ascending")], limit=5)
+
+
+def q24(s):
+    food = _join(s, s["food_listings"].select(["Expiry_Month", "Quantity"]), "food_listings", "Provider_ID",
+                 "providers", {"Name": "Name"})
+    grouped = group_by(food, ["Name", "Expiry_Month"], [("Quantity", "avg", "Avg_Quantity")])
+    grouped = _rounded(grouped, "Avg_Quantity").rename_columns(["Name", "Month", "Avg_Quantity"])
+    return order_by(grouped, [("Month", "descending"), ("Name", "ascending")])
+
+
+def q25(s):
+    grouped = group_by(s["food_listings"].select(["Expiry_Weekday"]), ["Expiry_Weekday"],
+                       [(None, "count_all", "Listings")])
+    grouped = grouped.rename_columns(["Weekday", "Listings"])
+    return order_by(grouped, [("Listings", "descending"), ("Weekday", "ascending")])
+
+
+# --- chart_queries: recomputed from the base tables, with the summary tables' rules
+# (NULL group keys stored as '' and read back as NULL) ---
+
+def _blank_to_null(array):
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    return pc.if_else(pc.equal(array, ""), pa.scalar(None, pa.string()), array)
+
+
+def wastage_by_category(s):
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    food = s["food_listings"]
+    keys = pa.table({"Food_Type": pc.fill_null(food["Food_Type"], ""), "Location": pc.fill_null(food["Location"], "")})
+    grouped = group_by(keys, ["Food_Type", "Location"], [(None, "count_all", "Total_Wasted")])
+    grouped = pa.table({"Food_Type": _blank_to_null(grouped["Food_Type"]),
+                        "Location": _blank_to_null(grouped["Location"]), "Total_Wasted": grouped["Total_Wasted"]})
+    return order_by(grouped, [("Food_Type", "ascending"), ("Location", "ascending")])
+
+
+def top_providers(s):
+    food = _join(s, s["food_listings"].select(["Food_ID"]), "food_listings", "Provider_ID", "providers",
+                 {"Provider_Name": "Name"})
+    grouped = group_by(food.select(["Provider_Name"]), ["Provider_Name"], [(None, "count_all", "Contributions")])
+    return order_by(grouped, [("Contributions", "descending"), ("Provider_Name", "ascending")], limit=10)
+
+
+def demand_locations(s):
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    claims = _join(s, s["claims"].select(["Claim_ID"]), "claims", "Food_ID", "food_listings", {"Location": "Location"})
+    keys = pa.table({"Location": pc.fill_null(claims["Location"], "")})
+    grouped = group_by(keys, ["Location"], [(None, "count_all", "Claim_Count")])
+    grouped = grouped.set_column(0, "Location", _blank_to_null(grouped["Location"]))
+    return order_by(grouped, [("Claim_Count", "descending"), ("Location", "ascending")], limit=10)
+
+
+# Expiry_Epoch is the start of the same normalized day aggregates.expiry_day takes the DATE()
+# of, so days are counted by epoch and only the distinct days are formatted
+def wastage_over_time(s):
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    grouped = group_by(s["food_listings"].select(["Expiry_Epoch"]), ["Expiry_Epoch"],
+                       [(None, "count_all", "Wasted_Food_Count")])
+    days = pc.strftime(pc.cast(grouped["Expiry_Epoch"], pa.timestamp('s')), format="%Y-%m-%d")
+    return pa.table({"Date": days, "Wasted_Food_Count": grouped["Wasted_Food_Count"]})
+
+
+QUERIES = dict(zip(query_map, (q1, q2, q3, q4, q5, q6, q7, q8, q9, q10, q11, q12, q13, q14, q15, q16, q17, q18,
+                               q19, q20, q21, q22, q23, q24, q25)))
+CHARTS = {"wastage_by_category": wastage_by_category, "top_providers": top_providers,
+          "demand_locations": demand_locations, "wastage_over_time": wastage_over_time}
+
+
+# Answer a query_map question or chart query (by its key) as a pyarrow Table, from `snapshot`
+# or the database's current one
+def run(query_id, params=(), snapshot=None, db_path=db.DB_PATH):
+    snapshot = snapshot or get_snapshotter(db_path).current()
+    return (QUERIES.get(query_id) or CHARTS[query_id])(snapshot, *params)
+
+
+def read_frame(query_id, params=(), db_path=db.DB_PATH):
+    return run(query_id, tuple(params or ()), db_path=db_path).to_pandas()
+
+
+# --- Benchmark: every query on both engines, with the answers compared value for value ---
+
+def _sqlite_answer(conn, sql, params):
+    cursor = conn.execute(sql, params)
+    return [d[0] for d in cursor.description], cursor.fetchall()
+
+
+def _arrow_answer(table):
+    return table.column_names, [tuple(row.values()) for row in table.to_pylist()]
+
+
+def _typed(rows):
+    return [tuple((type(v).__name__, v) for v in row) for row in rows]
+
+
+# "exact" when columns, values, value types and row order all match; "tie order" when only
+# the order of rows that tie on every ORDER BY key differs, which SQL leaves unspecified
+def compare(expected, actual):
+    (expected_columns, expected_rows), (actual_columns, actual_rows) = expected, actual
+    if expected_columns != actual_columns:
+        return "columns differ"
+    expected_rows, actual_rows = _typed(expected_rows), _typed(actual_rows)
+    if expected_rows == actual_rows:
+        return "exact"
+    if sorted(expected_rows, key=repr) == sorted(actual_rows, key=repr):
+        return "tie order"
+    return "MISMATCH"
+
+
+def _median_ms(fn, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return sorted(times)[len(times) // 2], result
+
+
+def benchmark(db_path, runs=3, only=None):
+    directory = tempfile.mkdtemp()
+    try:
+        start = time.perf_counter()
+        manifest = write_snapshot(db_path, directory)
+        written = time.perf_counter() - start
+        start = time.perf_counter()
+        snapshot = Snapshot(directory, manifest)
+        loaded = time.perf_counter() - start
+        size = sum(os.path.getsize(os.path.join(directory, manifest["generation"], f)) for f in
+                   os.listdir(os.path.join(directory, manifest["generation"])))
+        print(f"Snapshot of {snapshot.rows:,} rows ({', '.join(f'{t} {n:,}' for t, n in manifest['rows'].items())}): "
+              f"written in {written:.2f}s, {size / 1024 ** 2:.0f} MB, memory-mapped in {loaded * 1000:.1f}ms")
+
+        with db.get_pool(db_path).reader() as conn:
+            city = conn.execute("SELECT City FROM providers WHERE City IS NOT NULL "
+                                "GROUP BY City ORDER BY COUNT(*) DESC LIMIT 1").fetchone()
+            cases = [(q, sql, ((city or [""])[0],) if q == CITY_QUERY else ()) for q, sql in query_map.items()]
+            cases += [(name, sql, ()) for name, sql in chart_queries.items()]
+            if only:
+                cases = [case for case in cases if any(case[0].startswith(o) for o in only)]
+            print(f"{'Query':<58}{'SQLite ms':>11}{'Columnar ms':>13}{'speed-up':>10}  result")
+            totals = [0.0, 0.0]
+            outcomes = {}
+            for query_id, sql, params in cases:
+                sqlite_ms, expected = _median_ms(lambda: _sqlite_answer(conn, sql, params), runs)
+                # The first run also pays for the join positions the snapshot caches
+                columnar_ms, actual = _median_ms(lambda: _arrow_answer(run(query_id, params, snapshot)), runs)
+                outcome = compare(expected, actual)
+                outcomes[outcome] = outcomes.get(outcome, 0) + 1
+                totals[0] += sqlite_ms
+                totals[1] += columnar_ms
+                print(f"{query_id[:56]:<58}{sqlite_ms:>11.1f}{columnar_ms:>13.1f}"
+                      f"{sqlite_ms / max(columnar_ms, 0.001):>9.1f}x  {outcome}")
+        print(f"{'Total':<58}{totals[0]:>11.1f}{totals[1]:>13.1f}{totals[0] / max(totals[1], 0.001):>9.1f}x")
+        print("Results: " + ", ".join(f"{n} {outcome}" for outcome, n in sorted(outcomes.items())))
+        del snapshot
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Columnar snapshots and the vectorized query engine")
+    parser.add_argument("command", choices=["snapshot", "benchmark"])
+    parser.add_argument("--db", default=db.DB_PATH)
+    parser.add_argument("--runs", type=int, default=3, help="timed runs per query and engine (median reported)")
+    parser.add_argument("--only", nargs="*", help="query ids (or their number prefix, e.g. '8.') to benchmark")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        raise SystemExit(f"Database file not found: {args.db}")
+    if args.command == "benchmark":
+        benchmark(args.db, args.runs, args.only)
+        return
+    start = time.perf_counter()
+    manifest = write_snapshot(args.db)
+    print(f"Wrote {sum(manifest['rows'].values()):,} rows to {snapshot_dir(args.db)} "
+          f"in {time.perf_counter() - start:.2f}s (versions {manifest['versions']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+
+import bulk_import
+import db
+import operations
+from exporter import stream_csv
+
+# The dataset CSVs are snapshots of the database, which is the only copy writes go to.
+# A background thread checks the tables' write versions and rewrites the CSV of each table that
+# changed since its last export. All tables are read in one read transaction, so the files agree
+# with each other (no claim for a listing missing from the listings file), and each file is
+# written beside its target and renamed over it, so readers see the old file or the new one.
+#
+# A table still at version 0 has never been written through the database: its CSV is the
+# original dataset the pages seed the table from, so it is left alone, as is a CSV that
+# bulk_import.py is part-way through importing.
+
+# Seconds between checks of the write versions
+EXPORT_SECONDS = float(os.environ.get('LOCAL_FOOD_WM_CSV_EXPORT_SECONDS', '10'))
+TABLES = ("providers", "receivers", "food_listings", "claims")
+
+
+# Sidecar with the database and write version a CSV was exported at
+def _manifest_path(path):
+    return path + '.export.json'
+
+
+def _read_manifest(path):
+    try:
+        with open(_manifest_path(path)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_atomic(path, write):
+    fd, tmp = tempfile.mkstemp(prefix=os.path.basename(path) + '.', suffix='.tmp', dir=os.path.dirname(path) or '.')
+    os.close(fd)
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+# Version of `table` its CSV was last exported at from `db_path`, or None
+def exported_version(table, db_path=db.DB_PATH):
+    manifest = _read_manifest(operations.CSV_PATHS[table])
+    if manifest is None or manifest.get("db") != os.path.abspath(db_path):
+        return None
+    return manifest.get("version")
+
+
+def _export_table(conn, table, version, db_path):
+    path = operations.CSV_PATHS[table]
+    columns = list(bulk_import.SCHEMAS[table])
+    cursor = conn.execute(f"SELECT {', '.join(columns)} FROM {table} ORDER BY {columns[0]}")
+    _write_atomic(path, lambda tmp: stream_csv(cursor, tmp))
+
+    def write_manifest(tmp):
+        with open(tmp, 'w') as f:
+            json.dump({"db": os.path.abspath(db_path), "version": version, "exported": time.time()}, f)
+    _write_atomic(_manifest_path(path), write_manifest)
+    # Logs left by the CSV journal of earlier versions hold writes the database already has
+    for leftover in (path + '.journal', path + '.journal.compacting'):
+        if os.path.exists(leftover):
+            os.remove(leftover)
+
+
+# Rewrite the CSVs whose tables changed since their last export (every one with `force`);
+# returns the tables written. CSVs whose directory doesn't exist are skipped.
+def export(db_path=db.DB_PATH, force=False):
+    written = []
+    with db.snapshot(db_path) as conn:
+        versions = db.data_versions(conn=conn)
+        for table in TABLES:
+            path = operations.CSV_PATHS[table]
+            version = versions.get(table, 0)
+            if not os.path.isdir(os.path.dirname(path) or '.') or bulk_import.importing(path):
+                continue
+            if not force and (version == 0 or version == exported_version(table, db_path)):
+                continue
+            _export_table(conn, table, version, db_path)
+            written.append(table)
+    return written
+
+
+class CsvExporter:
+    def __init__(self, db_path=db.DB_PATH, interval=EXPORT_SECONDS):
+        self.db_path = db_path
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._export_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.last_export = None
+        self.last_error = None
+
+    # Tables written; runs are serialized so two never write the same file at once
+    def export(self, force=False):
+        with self._export_lock:
+            start = time.perf_counter()
+            written = export(self.db_path, force)
+            if written:
+                self.last_export = {"time": time.time(), "tables": written,
+                                    "ms": (time.perf_counter() - start) * 1000}
+            return written
+
+    # Writes each CSV is behind the database by, {table: writes}
+    def lag(self):
+        versions = db.data_versions(self.db_path)
+        lag = {}
+        for table in TABLES:
+            behind = versions.get(table, 0) - (exported_version(table, self.db_path) or 0)
+            if versions.get(table, 0) and behind:
+                lag[table] = behind
+        return lag
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True, name="csv-exporter")
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.export()
+                self.last_error = None
+            except Exception as e:
+                # A locked file (e.g. a CSV open in a spreadsheet on Windows) or a full disk
+                # shouldn't kill the thread; try again next time
+                self.last_error = e
+
+    def stop(self):
+        self._stop.set()
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join()
+
+
+_exporters = {}
+_exporters_lock = threading.Lock()
+
+
+# The process-wide exporter for a database; start() it once per process
+def get_exporter(db_path=db.DB_PATH):
+    with _exporters_lock:
+        if db_path not in _exporters:
+            _exporters[db_path] = CsvExporter(db_path)
+        return _exporters[db_path]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write the dataset CSVs from the database")
+    parser.add_argument("--db", default=db.DB_PATH)
+    parser.add_argument("--csv-dir", help="directory to write the CSVs to (default: LOCAL_FOOD_WM_CSV_DIR)")
+    parser.add_argument("--force", action="store_true", help="rewrite every CSV, changed or not")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        raise SystemExit(f"Database file not found: {args.db}")
+    if args.csv_dir:
+        operations.CSV_PATHS = {table: os.path.join(args.csv_dir, os.path.basename(path))
+                                for table, path in operations.CSV_PATHS.items()}
+    start = time.perf_counter()
+    written = export(args.db, force=args.force)
+    elapsed = time.perf_counter() - start
+    print(f"Wrote {', '.join(written) if written else 'nothing (every CSV is up to date)'} in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
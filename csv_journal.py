@@ -0,0 +1,114 @@
+import json
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+
+# Change log an earlier version of the app kept next to each CSV snapshot: every write appended
+# one JSON line to <csv>.journal and a compactor folded the log into the CSV with an atomic
+# rename. Writes now go to the database only, so nothing appends to these logs any more; all
+# that is left is folding a log still on disk into its CSV before the pages seed an empty
+# table from it.
+class CsvJournal:
+    def __init__(self, csv_path, key):
+        self.csv_path = csv_path
+        self.key = key
+        self.log_path = csv_path + '.journal'
+        self.compacting_path = csv_path + '.journal.compacting'
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _fold(log_chunks):
+        # key -> ('row', full row) | ('update', changed columns) | ('delete', None)
+        state = {}
+        for chunk in log_chunks:
+            if not chunk:
+                continue
+            for line in chunk.decode('utf-8').splitlines():
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                key_value, op = record['key'], record['op']
+                if op == 'delete':
+                    state[key_value] = ('delete', None)
+                elif op == 'upsert':
+                    state[key_value] = ('row', dict(record['row']))
+                elif key_value in state:
+                    kind, values = state[key_value]
+                    if kind != 'delete':
+                        values.update(record['row'])
+                else:
+                    state[key_value] = ('update', dict(record['row']))
+        return state
+
+    def _apply(self, df, state):
+        if not state:
+            return df
+        if self.key in df.columns:
+            keys = df[self.key]
+            positions = np.flatnonzero(keys.isin(list(state)).to_numpy())
+        else:
+            positions = []
+
+        seen = set()
+        dropped = []
+        for pos in positions:
+            key_value = keys.iat[pos]
+            kind, values = state[key_value]
+            seen.add(key_value)
+            if kind == 'delete':
+                dropped.append(pos)
+                continue
+            for col, value in values.items():
+                if col not in df.columns:
+                    df[col] = None
+                try:
+                    df.iat[pos, df.columns.get_loc(col)] = value
+                except (TypeError, ValueError):
+                    # e.g. text written into a column pandas parsed as numeric
+                    df[col] = df[col].astype(object)
+                    df.iat[pos, df.columns.get_loc(col)] = value
+
+        if dropped:
+            df = df.drop(df.index[dropped])
+        new_rows = [values for key_value, (kind, values) in state.items()
+                    if kind == 'row' and key_value not in seen]
+        if new_rows:
+            added = pd.DataFrame(new_rows)
+            if len(df.columns):
+                added = added.reindex(columns=list(df.columns) + [c for c in added.columns if c not in df.columns])
+            df = pd.concat([df, added], ignore_index=True) if len(df) else added
+        return df.reset_index(drop=True)
+
+    # Fold the leftover logs into the CSV; does nothing when there are none. A compaction that
+    # died part-way left its log as <csv>.journal.compacting, older than <csv>.journal.
+    def compact(self):
+        with self._lock:
+            logs = [p for p in (self.compacting_path, self.log_path) if os.path.exists(p)]
+            if not logs:
+                return
+            chunks = []
+            for path in logs:
+                with open(path, 'rb') as f:
+                    chunks.append(f.read())
+            df = pd.read_csv(self.csv_path) if os.path.exists(self.csv_path) else pd.DataFrame()
+            df = self._apply(df, self._fold(chunks))
+            tmp_path = self.csv_path + '.tmp'
+            df.to_csv(tmp_path, index=False)
+            os.replace(tmp_path, self.csv_path)
+            for path in logs:
+                os.remove(path)
+
+
+# One journal per CSV file for the whole process, shared by every session
+_journals = {}
+_journals_lock = threading.Lock()
+
+
+def get_journal(csv_path, key):
+    with _journals_lock:
+        if csv_path not in _journals:
+            _journals[csv_path] = CsvJournal(csv_path, key)
+        return _journals[csv_path]
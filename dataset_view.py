@@ -0,0 +1,192 @@
+import db
+import instrumentation
+import search
+
+# Datasets shown by the homepage.py viewer.
+# "filters": sidebar label -> column on the main table (pushed into the WHERE clause)
+# "id_filter": label of the filter that takes a typed-in ID rather than a dropdown
+# "sorts": sort label -> (SQL expression, column name in the result); only indexed columns
+# "search": (search.py index, column its keys match) for the search box
+DATASETS = {
+    "Providers": {
+        "from": "providers p",
+        "select": "p.Provider_ID, p.Name, p.Type, p.Address, p.City, p.Contact",
+        "count_from": "providers p",
+        "key": ("p.Provider_ID", "Provider_ID"),
+        "filters": {"Provider ID": "p.Provider_ID", "City": "p.City", "Provider Type": "p.Type"},
+        "id_filter": "Provider ID",
+        "sorts": {"Provider ID": ("p.Provider_ID", "Provider_ID"), "City": ("p.City", "City")},
+        "search": ("providers", "p.Provider_ID"),
+    },
+    "Receivers": {
+        "from": "receivers r",
+        "select": "r.Receiver_ID, r.Name, r.Type, r.City, r.Contact",
+        "count_from": "receivers r",
+        "key": ("r.Receiver_ID", "Receiver_ID"),
+        "filters": {"Receiver ID": "r.Receiver_ID", "City": "r.City", "Receiver Type": "r.Type"},
+        "id_filter": "Receiver ID",
+        "sorts": {"Receiver ID": ("r.Receiver_ID", "Receiver_ID"), "City": ("r.City", "City")},
+        "search": ("receivers", "r.Receiver_ID"),
+    },
+    "Food Listings": {
+        "from": "food_listings f LEFT JOIN providers p ON f.Provider_ID = p.Provider_ID",
+        "select": '''
+            f.Food_ID, f.Food_Name, f.Food_Type, f.Meal_Type, f.Quantity, f.Location,
+            p.Provider_ID, p.Name AS Provider_Name, p.City AS Provider_City, p.Type AS Provider_Type
+        ''',
+        "count_from": "food_listings f",
+        "key": ("f.Food_ID", "Food_ID"),
+        "filters": {"Food ID": "f.Food_ID", "City": "f.Location", "Food Type": "f.Food_Type",
+                    "Meal Type": "f.Meal_Type"},
+        "id_filter": "Food ID",
+        "sorts": {"Food ID": ("f.Food_ID", "Food_ID"), "City": ("f.Location", "Location")},
+        "search": ("food", "f.Food_ID"),
+    },
+    "Claim Status": {
+        "from": '''
+            claims c
+            LEFT JOIN food_listings f ON c.Food_ID = f.Food_ID
+            LEFT JOIN providers p ON f.Provider_ID = p.Provider_ID
+            LEFT JOIN receivers r ON c.Receiver_ID = r.Receiver_ID
+        ''',
+        "select": '''
+            c.Claim_ID, c.Status, c.Timestamp, c.Quantity AS Claimed_Quantity,
+            f.Food_ID, f.Food_Type, f.Meal_Type, f.Quantity, f.Location,
+            p.Provider_ID, p.Name AS Provider_Name, p.City AS Provider_City, p.Type AS Provider_Type,
+            r.Receiver_ID, r.Name AS Receiver_Name, r.City AS Receiver_City, r.Type AS Receiver_Type
+        ''',
+        "count_from": "claims c",
+        "key": ("c.Claim_ID", "Claim_ID"),
+        "filters": {"Claim ID": "c.Claim_ID", "Claim Status": "c.Status"},
+        "id_filter": "Claim ID",
+        "sorts": {"Claim ID": ("c.Claim_ID", "Claim_ID"), "Claim Status": ("c.Status", "Status")},
+        "search": ("receivers", "c.Receiver_ID"),
+    },
+}
+
+# Extra sort offered while searching: best match first (see search.ranked_sql)
+RELEVANCE = "Relevance"
+
+
+# Distinct values for a dropdown filter (served from the column's index)
+def filter_options(dataset, label, db_path=db.DB_PATH):
+    spec = DATASETS[dataset]
+    column = spec["filters"][label]
+    table = spec["count_from"]
+    rows = db.fetch_all(f"SELECT DISTINCT {column} FROM {table} WHERE {column} IS NOT NULL ORDER BY {column}",
+                        db_path=db_path, name=f"{dataset}: {label} options")
+    return [row[0] for row in rows]
+
+
+# filters: {label: value}; labels whose value is None are ignored.
+# match: FTS5 expression from search.match_expression, or None for no search.
+def _where(spec, filters, match=None):
+    clauses, params = [], []
+    for label, value in filters.items():
+        if value is not None:
+            clauses.append(f"{spec['filters'][label]} = ?")
+            params.append(value)
+    if match is not None:
+        index, column = spec["search"]
+        clauses.append(f"{column} IN ({search.matching_sql(index)})")
+        params.append(match)
+    return clauses, params
+
+
+def count_rows(dataset, filters, db_path=db.DB_PATH, match=None):
+    spec = DATASETS[dataset]
+    index, column = spec["search"]
+    # Without other filters a search over the table's own keys is counted by the FTS index alone
+    if match is not None and all(v is None for v in filters.values()) and column == spec["key"][0]:
+        with db.reader(db_path) as conn:
+            return search.count(conn, index, match)
+    clauses, params = _where(spec, filters, match)
+    sql = f"SELECT COUNT(*) FROM {spec['count_from']}"
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    return db.fetch_one(sql, params, db_path=db_path, name=f"{dataset}: count")[0]
+
+
+# Keyset condition for "rows after cursor" in (sort, key) order; NULL sort values come first ascending.
+# Row-value comparisons let SQLite seek straight into the (sort column, rowid) index.
+def _seek(sort_expr, key_expr, cursor, descending):
+    value, key = cursor
+    op = "<" if descending else ">"
+    if sort_expr == key_expr:
+        return f"{key_expr} {op} ?", [key]
+    if value is None:
+        if descending:
+            return f"({sort_expr} IS NULL AND {key_expr} < ?)", [key]
+        return f"(({sort_expr} IS NULL AND {key_expr} > ?) OR {sort_expr} IS NOT NULL)", [key]
+    seek = f"({sort_expr}, {key_expr}) {op} (?, ?)"
+    if descending:
+        seek = f"({seek} OR {sort_expr} IS NULL)"
+    return seek, [value, key]
+
+
+# One page of rows starting after `cursor` (None for the first page), as plain tuples. `select`
+# replaces the dataset's column list (it must still include the sort and key columns). `match`
+# limits the rows to a search; sorting by RELEVANCE needs one and pages through at most
+# search.MAX_RANKED matches, best first, with their Search_Rank.
+# Returns (column names, rows, cursor for the next page or None when this is the last page).
+def fetch_rows(dataset, filters, sort_label, descending=False, page_size=50, cursor=None, db_path=db.DB_PATH,
+               select=None, match=None):
+    spec = DATASETS[dataset]
+    key_expr, key_col = spec["key"]
+    select = select or spec["select"]
+    source = spec["from"]
+
+    with db.reader(db_path) as conn:
+        if sort_label == RELEVANCE:
+            if match is None:
+                raise ValueError("Sorting by relevance needs a search.")
+            index, column = spec["search"]
+            ranked = search.count(conn, index, match) <= search.RANK_LIMIT
+            source += f" JOIN ({search.ranked_sql(index, ranked)}) m ON {column} = m.Match_ID"
+            select += ", m.Search_Rank"
+            sort_expr, sort_col = "m.Search_Rank", "Search_Rank"
+            clauses, params = _where(spec, filters)
+            params.insert(0, match)
+        else:
+            sort_expr, sort_col = spec["sorts"][sort_label]
+            clauses, params = _where(spec, filters, match)
+        rows, columns = _page(conn, dataset, select, source, clauses, params, sort_expr, key_expr, cursor,
+                              descending, page_size)
+
+    if len(rows) <= page_size:
+        return columns, rows, None
+    rows = rows[:page_size]
+    last = dict(zip(columns, rows[-1]))
+    return columns, rows, (last[sort_col], last[key_col])
+
+
+# Run one keyset page query on `conn`: (rows, column names)
+def _page(conn, dataset, select, source, clauses, params, sort_expr, key_expr, cursor, descending, page_size):
+    if cursor is not None:
+        seek, seek_params = _seek(sort_expr, key_expr, cursor, descending)
+        clauses.append(seek)
+        params += seek_params
+
+    direction = "DESC" if descending else "ASC"
+    order = f"{key_expr} {direction}" if sort_expr == key_expr else f"{sort_expr} {direction}, {key_expr} {direction}"
+    sql = f"SELECT {select} FROM {source}"
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    # One extra row tells us whether another page exists without a second query
+    sql += f" ORDER BY {order} LIMIT ?"
+    params.append(page_size + 1)
+
+    result = conn.cursor()
+    rows = instrumentation.observe(conn, sql, params, lambda: result.execute(sql, params).fetchall(),
+                                   f"{dataset}: page")
+    return rows, [d[0] for d in result.description]
+
+
+# fetch_rows as a DataFrame: (DataFrame, cursor for the next page or None)
+def fetch_page(dataset, filters, sort_label, descending=False, page_size=50, cursor=None, db_path=db.DB_PATH,
+               match=None):
+    import pandas as pd
+
+    columns, rows, next_cursor = fetch_rows(dataset, filters, sort_label, descending, page_size, cursor, db_path,
+                                            match=match)
+    return pd.DataFrame(rows, columns=columns), next_cursor
@@ -0,0 +1,103 @@
+import re
+from datetime import datetime
+from functools import lru_cache
+
+# Formats found in the datasets: ISO from the app's forms, US style from the original CSV exports
+DATE_FORMATS = ("%Y-%m-%d", "%m/%d/%Y", "%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S")
+TIMESTAMP_FORMATS = ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%m/%d/%Y %H:%M", "%m/%d/%Y %H:%M:%S",
+                     "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d", "%m/%d/%Y")
+
+
+def _parse(value, formats):
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value
+    text = str(value).strip()
+    for fmt in formats:
+        try:
+            return datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+# Expiry dates -> datetime at midnight, or None when the text is not a recognised date.
+# A table has few distinct expiry dates, so parses are memoized.
+@lru_cache(maxsize=8192)
+def parse_date(value):
+    parsed = _parse(value, DATE_FORMATS)
+    return parsed.replace(hour=0, minute=0, second=0) if parsed else None
+
+
+# Claim timestamps -> datetime, or None
+def parse_timestamp(value):
+    return _parse(value, TIMESTAMP_FORMATS)
+
+
+_FIELDS = {"%Y": "year", "%m": "month", "%d": "day", "%H": "hour", "%M": "minute", "%S": "second"}
+
+
+def _shape_part(part):
+    if part in _FIELDS:
+        return f"(?P<{_FIELDS[part]}>" + (r"\d{4})" if part == "%Y" else r"\d{1,2})")
+    return r"\s+" if part == " " else re.escape(part)
+
+
+# Regex with the shape of a format and a named group per field, e.g. '%m/%d/%Y' ->
+# (?P<month>\d{1,2})/(?P<day>\d{1,2})/(?P<year>\d{4})
+def _shape(fmt):
+    return "^" + "".join(_shape_part(part) for part in re.findall(r"%[YmdHMS]| |[^% ]+", fmt)) + "$"
+
+
+# A whole column of dates or timestamps -> datetime64[s] Series, NaT where no format matches.
+# Same rules as _parse (text stripped, the first matching format wins), vectorized over the
+# distinct values: each format is tried once, on the values of its shape that are still unparsed.
+def parse_series(series, formats):
+    import numpy as np
+    import pandas as pd
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series.astype("datetime64[s]")
+    codes, values = pd.factorize(series.astype("str").str.strip())
+    values = pd.Series(values, dtype="str")
+    # One slot past the distinct values stays NaT for the missing ones (code -1)
+    parsed = np.full(len(values) + 1, np.datetime64("NaT"), dtype="datetime64[s]")
+    unparsed = np.ones(len(values), dtype=bool)
+    for fmt in formats:
+        shape = _shape(fmt)
+        candidates = unparsed & values.str.match(shape).to_numpy(dtype=bool, na_value=False)
+        if not candidates.any():
+            continue
+        text = pa.array(values[candidates])
+        attempt = pc.strptime(text, format=fmt, unit="s", error_is_null=True)
+        # Arrow rolls impossible values over (Feb 30 -> Mar 2, second 60 -> the next minute) where
+        # strptime rejects them, so every field must read back unchanged
+        fields = pc.extract_regex(text, shape)
+        valid = pc.is_valid(attempt)
+        for i, field in enumerate(fields.type):
+            valid = pc.and_(valid, pc.equal(pc.cast(fields.field(i), pa.int64()), getattr(pc, field.name)(attempt)))
+        found = pc.fill_null(valid, False).to_numpy(zero_copy_only=False)
+        attempt = attempt.to_numpy(zero_copy_only=False).astype("datetime64[s]")
+        rows = np.flatnonzero(candidates)[found]
+        parsed[rows] = attempt[found]
+        unparsed[rows] = False
+    return pd.Series(parsed[codes], index=series.index, name=series.name)
+
+
+# SQL expression turning a date / timestamp column in any of the formats above into
+# 'YYYY-MM-DD[ HH:MM[:SS]]', which SQLite's date functions understand; NULL when unrecognised.
+# Used by the triggers of migrations 7 and 8, so the SQL it returns must not change; a new
+# format means a new function and a migration that recreates those triggers.
+def sql_normalized(column):
+    rest = f"substr({column}, instr({column}, '/') + 1)"
+    year_part = f"substr({rest}, instr({rest}, '/') + 1)"
+    clock = f"ltrim(substr({year_part}, instr({year_part}, ' ') + 1))"
+    us_date = f"printf('%04d-%02d-%02d', CAST({year_part} AS INTEGER), CAST({column} AS INTEGER), CAST({rest} AS INTEGER))"
+    us_clock = f"printf(' %02d:%s', CAST({clock} AS INTEGER), substr({clock}, instr({clock}, ':') + 1))"
+    return f'''CASE
+        WHEN {column} GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]*' THEN replace({column}, 'T', ' ')
+        WHEN {column} GLOB '[0-9]*/[0-9]*/[0-9][0-9][0-9][0-9]' THEN {us_date}
+        WHEN {column} GLOB '[0-9]*/[0-9]*/[0-9][0-9][0-9][0-9] [0-9]*:[0-9][0-9]*' THEN {us_date} || {us_clock}
+    END'''
@@ -0,0 +1,182 @@
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+import instrumentation
+
+try:
+    import streamlit as st
+except ImportError:
+    st = None
+
+# Paths
+DB_PATH = os.environ.get('LOCAL_FOOD_WM_DB', 'D:/Guvi_Project1/env/Scripts/Local_food_WM.db')
+
+# Pool settings
+READER_COUNT = 4
+STATEMENT_CACHE_SIZE = 256
+BUSY_TIMEOUT_MS = 5000
+
+# Applied to every connection the pool opens
+PRAGMAS = (
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-16000",
+    "PRAGMA mmap_size=268435456",
+    f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}",
+)
+
+
+# One writer connection plus a fixed set of read-only readers, shared by every session
+class ConnectionPool:
+    def __init__(self, db_path=DB_PATH, readers=READER_COUNT):
+        self.db_path = db_path
+        self._write_lock = threading.RLock()
+
+        # The writer is opened first so the file (and its WAL) exists before any reader
+        self.writer = self._connect(db_path, read_only=False)
+        self.writer.execute("PRAGMA journal_mode=WAL")
+
+        self._readers = queue.LifoQueue()
+        for _ in range(readers):
+            self._readers.put(self._connect(db_path, read_only=True))
+
+    @staticmethod
+    def _connect(db_path, read_only):
+        if read_only:
+            uri = Path(os.path.abspath(db_path)).as_uri() + '?mode=ro'
+            conn = sqlite3.connect(uri, uri=True, check_same_thread=False,
+                                   cached_statements=STATEMENT_CACHE_SIZE)
+        else:
+            # Autocommit mode: transactions are opened explicitly in transaction()
+            conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None,
+                                   cached_statements=STATEMENT_CACHE_SIZE)
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        if read_only:
+            conn.execute("PRAGMA query_only=ON")
+        return conn
+
+    # Borrow a read-only connection
+    @contextmanager
+    def reader(self):
+        conn = self._readers.get()
+        try:
+            yield conn
+        finally:
+            self._readers.put(conn)
+
+    # Serialized write transaction on the single writer connection
+    @contextmanager
+    def transaction(self):
+        with self._write_lock:
+            conn = self.writer
+            if conn.in_transaction:
+                # Nested use joins the outer transaction
+                yield conn
+                return
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise
+            else:
+                if conn.in_transaction:
+                    conn.execute("COMMIT")
+
+    def close(self):
+        with self._write_lock:
+            self.writer.close()
+        while not self._readers.empty():
+            self._readers.get_nowait().close()
+
+
+# Pools are process-wide: Streamlit's resource cache when running inside the app,
+# a plain module-level registry for scripts and services
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def _local_pool(db_path):
+    import migrations
+
+    with _pools_lock:
+        if db_path not in _pools:
+            pool = ConnectionPool(db_path)
+            migrations.migrate(pool)
+            _pools[db_path] = pool
+        return _pools[db_path]
+
+
+if st is not None:
+    _cached_pool = st.cache_resource(show_spinner=False)(_local_pool)
+else:
+    _cached_pool = _local_pool
+
+
+def get_pool(db_path=DB_PATH):
+    if st is not None and st.runtime.exists():
+        return _cached_pool(db_path)
+    return _local_pool(db_path)
+
+
+@contextmanager
+def reader(db_path=DB_PATH):
+    with get_pool(db_path).reader() as conn:
+        yield conn
+
+
+# Reader holding one read transaction, so every statement inside sees the same snapshot
+@contextmanager
+def snapshot(db_path=DB_PATH):
+    with reader(db_path) as conn:
+        conn.execute("BEGIN")
+        try:
+            yield conn
+        finally:
+            conn.execute("COMMIT")
+
+
+@contextmanager
+def transaction(db_path=DB_PATH):
+    with get_pool(db_path).transaction() as conn:
+        yield conn
+
+
+# Run a SELECT and return a DataFrame.
+# `name` labels the statement on the Performance page (defaults to the start of the SQL).
+def read_sql(query, params=None, db_path=DB_PATH, name=None):
+    import pandas as pd
+
+    with reader(db_path) as conn:
+        return instrumentation.observe(conn, query, params,
+                                       lambda: pd.read_sql_query(query, conn, params=params), name)
+
+
+def fetch_one(query, params=(), db_path=DB_PATH, name=None):
+    with reader(db_path) as conn:
+        return instrumentation.observe(conn, query, params, lambda: conn.execute(query, params).fetchone(), name)
+
+
+def fetch_all(query, params=(), db_path=DB_PATH, name=None):
+    with reader(db_path) as conn:
+        return instrumentation.observe(conn, query, params, lambda: conn.execute(query, params).fetchall(), name)
+
+
+# Run a single write statement in its own transaction and return the new row id
+def execute(query, params=(), db_path=DB_PATH, name=None):
+    with transaction(db_path) as conn:
+        return instrumentation.observe(conn, query, params, lambda: conn.execute(query, params), name).lastrowid
+
+
+# Per-table write counters kept up to date by triggers (see migrations.add_data_versions)
+def data_versions(db_path=DB_PATH, conn=None):
+    if conn is not None:
+        return dict(conn.execute("SELECT Table_Name, Version FROM data_versions").fetchall())
+    return dict(fetch_all("SELECT Table_Name, Version FROM data_versions", db_path=db_path))
+
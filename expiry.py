@@ -0,0 +1,307 @@
+import argparse
+import threading
+import time
+from bisect import bisect_left, bisect_right, insort
+from collections import deque
+from datetime import datetime, timedelta
+
+import db
+from dates import parse_date
+
+# How often the background thread re-reads the change log and moves the clock forward
+TICK_SECONDS = 60
+# "Expiring" means the listing expires within this many hours
+EXPIRING_HOURS = 72
+MAX_EVENTS = 1000
+IN_BATCH = 500
+
+EXPIRED = "expired"
+EXPIRING = "expiring"
+FRESH = "fresh"
+
+# Claimed means any claim row at all, as in query 15
+_STATE_SQL = '''
+    SELECT f.Food_ID, f.Expiry_Date, EXISTS (SELECT 1 FROM claims c WHERE c.Food_ID = f.Food_ID)
+    FROM food_listings f
+'''
+
+
+# Listings touched since change-log position `seq` (migration 5), reloaded with `state_sql`.
+# Returns (gap, last seq, touched Food_IDs, reloaded rows); gap means the log was trimmed past
+# `seq` and the caller has to rebuild.
+def read_changes(conn, seq, state_sql, id_column="f.Food_ID"):
+    first = conn.execute("SELECT MIN(Seq) FROM listing_changes").fetchone()[0]
+    if first is not None and first > seq + 1:
+        return True, seq, [], []
+    changes = conn.execute("SELECT Seq, Food_ID FROM listing_changes WHERE Seq > ?", (seq,)).fetchall()
+    if not changes:
+        return False, seq, [], []
+    ids = list({food_id for _, food_id in changes if food_id is not None})
+    rows = []
+    for start in range(0, len(ids), IN_BATCH):
+        batch = ids[start:start + IN_BATCH]
+        marks = ",".join("?" * len(batch))
+        rows += conn.execute(f"{state_sql} WHERE {id_column} IN ({marks})", batch).fetchall()
+    return False, changes[-1][0], ids, rows
+
+
+# Listings run out at the end of their expiry day (local time)
+def expires_at(expiry):
+    parsed = parse_date(expiry) if expiry else None
+    if parsed is None:
+        return None
+    return (parsed + timedelta(days=1)).timestamp()
+
+
+# Every listing ordered by the moment it expires, kept current from the listing_changes log.
+# A background thread advances the clock: listings that cross the expiring / expired boundaries
+# since the last tick are recorded as events, and the expired-and-unclaimed count is kept
+# up to date, so neither the dashboard nor the matcher has to rescan the table.
+class ExpiryScheduler:
+    def __init__(self, db_path=db.DB_PATH, expiring_hours=EXPIRING_HOURS):
+        self.db_path = db_path
+        self.expiring_hours = expiring_hours
+        self._lock = threading.RLock()
+        self._order = []
+        self._listings = {}
+        self._seq = None
+        self._now = None
+        self._expired_unclaimed = 0
+        self._events = deque(maxlen=MAX_EVENTS)
+        self._listeners = []
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __len__(self):
+        return len(self._listings)
+
+    def _add(self, food_id, when, claimed):
+        self._listings[food_id] = (when, claimed)
+        insort(self._order, (when, food_id))
+        if not claimed and self._now is not None and when <= self._now:
+            self._expired_unclaimed += 1
+
+    def _remove(self, food_id):
+        entry = self._listings.pop(food_id, None)
+        if entry is None:
+            return
+        when, claimed = entry
+        i = bisect_left(self._order, (when, food_id))
+        if i < len(self._order) and self._order[i] == (when, food_id):
+            del self._order[i]
+        if not claimed and self._now is not None and when <= self._now:
+            self._expired_unclaimed -= 1
+
+    def rebuild(self):
+        with db.snapshot(self.db_path) as conn:
+            seq = conn.execute("SELECT IFNULL(MAX(Seq), 0) FROM listing_changes").fetchone()[0]
+            listings = {}
+            for food_id, expiry, claimed in conn.execute(_STATE_SQL):
+                when = expires_at(expiry)
+                if when is not None:
+                    listings[food_id] = (when, bool(claimed))
+        order = sorted((when, food_id) for food_id, (when, _) in listings.items())
+        with self._lock:
+            self._listings, self._order, self._seq = listings, order, seq
+            self._expired_unclaimed = 0
+            if self._now is not None:
+                self._expired_unclaimed = sum(1 for when, claimed in listings.values()
+                                              if when <= self._now and not claimed)
+
+    # Apply writes logged since the last refresh; returns how many listings were reloaded
+    def refresh(self):
+        with self._lock:
+            if self._seq is None:
+                self.rebuild()
+                return len(self._listings)
+            with db.snapshot(self.db_path) as conn:
+                gap, seq, ids, rows = read_changes(conn, self._seq, _STATE_SQL)
+            if gap:
+                self.rebuild()
+                return len(self._listings)
+            for food_id in ids:
+                self._remove(food_id)
+            for food_id, expiry, claimed in rows:
+                when = expires_at(expiry)
+                if when is not None:
+                    self._add(food_id, when, bool(claimed))
+            self._seq = seq
+            return len(ids)
+
+    # Move the clock to `now` (epoch seconds) and record the listings that became expiring or
+    # expired since the previous tick: two bisects plus the listings that crossed
+    def advance(self, now=None):
+        now = time.time() if now is None else now
+        horizon = now + self.expiring_hours * 3600
+        with self._lock:
+            previous = self._now
+            if previous is None or now < previous:
+                # First tick, or the clock went back: start counting from here without events
+                self._now = now
+                self._expired_unclaimed = sum(1 for when, claimed in self._listings.values()
+                                              if when <= now and not claimed)
+                return []
+            stamp = datetime.fromtimestamp(now).strftime("%Y-%m-%d %H:%M:%S")
+            events = []
+            old_horizon = previous + self.expiring_hours * 3600
+            for when, food_id in self._order[bisect_right(self._order, (old_horizon, float("inf"))):
+                                             bisect_right(self._order, (horizon, float("inf")))]:
+                if when > now:
+                    events.append((stamp, food_id, EXPIRING))
+            for when, food_id in self._order[bisect_right(self._order, (previous, float("inf"))):
+                                             bisect_right(self._order, (now, float("inf")))]:
+                events.append((stamp, food_id, EXPIRED))
+                if not self._listings[food_id][1]:
+                    self._expired_unclaimed += 1
+            self._now = now
+            self._events.extend(events)
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener(events)
+        return events
+
+    def tick(self, now=None):
+        self.refresh()
+        return self.advance(now)
+
+    # Call `listener(events)` after every tick that moved listings
+    def subscribe(self, listener):
+        with self._lock:
+            self._listeners.append(listener)
+
+    def start(self, interval=TICK_SECONDS):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, args=(interval,), daemon=True,
+                                            name="expiry-scheduler")
+        self.tick()
+        self._thread.start()
+
+    def _run(self, interval):
+        while not self._stop.wait(interval):
+            try:
+                self.tick()
+            except Exception:
+                # A locked or missing database shouldn't kill the thread; try again next tick
+                pass
+
+    def stop(self):
+        self._stop.set()
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join()
+
+    def _current(self, now):
+        if now is not None:
+            return now
+        return self._now if self._now is not None else time.time()
+
+    def state(self, food_id, now=None):
+        with self._lock:
+            entry = self._listings.get(food_id)
+            if entry is None:
+                return None
+            now = self._current(now)
+            if entry[0] <= now:
+                return EXPIRED
+            return EXPIRING if entry[0] <= now + self.expiring_hours * 3600 else FRESH
+
+    # (expires at, Food_ID) for listings that are still good now but expire within `hours`,
+    # soonest first: O(log n + k)
+    def expiring(self, hours=None, now=None):
+        hours = self.expiring_hours if hours is None else hours
+        with self._lock:
+            now = self._current(now)
+            lo = bisect_right(self._order, (now, float("inf")))
+            hi = bisect_right(self._order, (now + hours * 3600, float("inf")))
+            return self._order[lo:hi]
+
+    def expired_count(self, now=None):
+        with self._lock:
+            return bisect_right(self._order, (self._current(now), float("inf")))
+
+    def expired_unclaimed(self):
+        with self._lock:
+            return self._expired_unclaimed
+
+    # Most recent transitions, newest first
+    def events(self, limit=50):
+        with self._lock:
+            return list(self._events)[::-1][:limit]
+
+
+_schedulers = {}
+_schedulers_lock = threading.Lock()
+
+
+# The process-wide scheduler for a database, started on first use
+def get_scheduler(db_path=db.DB_PATH):
+    with _schedulers_lock:
+        if db_path not in _schedulers:
+            _schedulers[db_path] = ExpiryScheduler(db_path)
+        scheduler = _schedulers[db_path]
+    scheduler.start()
+    return scheduler
+
+
+# Query 15 from the scheduler: expired listings nobody ever claimed
+def expired_unclaimed_frame(db_path=db.DB_PATH):
+    import pandas as pd
+
+    scheduler = get_scheduler(db_path)
+    scheduler.tick()
+    return pd.DataFrame({"Expired_Unclaimed": [scheduler.expired_unclaimed()]})
+
+
+# Query 19 from the scheduler: listings expiring within `hours`, soonest first
+def expiring_frame(hours=EXPIRING_HOURS, db_path=db.DB_PATH):
+    import pandas as pd
+
+    scheduler = get_scheduler(db_path)
+    scheduler.tick()
+    due = scheduler.expiring(hours)
+    columns = ["Food_ID", "Food_Name", "Expiry_Date", "Quantity", "Location", "Hours_Left"]
+    if not due:
+        return pd.DataFrame(columns=columns)
+    ids = [food_id for _, food_id in due]
+    details = {}
+    for start in range(0, len(ids), IN_BATCH):
+        batch = ids[start:start + IN_BATCH]
+        for row in db.fetch_all(f'''
+            SELECT Food_ID, Food_Name, Expiry_Date, Quantity, Location
+            FROM food_listings
+            WHERE Food_ID IN ({",".join("?" * len(batch))})
+        ''', batch, db_path=db_path, name="expiry: listing details"):
+            details[row[0]] = row[1:]
+    now = time.time()
+    rows = [(food_id, *details[food_id], round((when - now) / 3600, 1))
+            for when, food_id in due if food_id in details]
+    return pd.DataFrame(rows, columns=columns)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show expired and soon-to-expire listings")
+    parser.add_argument("--db", default=db.DB_PATH)
+    parser.add_argument("--hours", type=float, default=EXPIRING_HOURS)
+    parser.add_argument("--now", help="YYYY-MM-DD HH:MM to evaluate at (default: now)")
+    args = parser.parse_args()
+    now = datetime.strptime(args.now, "%Y-%m-%d %H:%M").timestamp() if args.now else None
+
+    scheduler = ExpiryScheduler(args.db)
+    start = time.perf_counter()
+    scheduler.refresh()
+    scheduler.advance(now)
+    print(f"Ordered {len(scheduler):,} listings by expiry in {time.perf_counter() - start:.2f}s")
+    print(f"Expired: {scheduler.expired_count():,} ({scheduler.expired_unclaimed():,} never claimed)")
+    start = time.perf_counter()
+    due = scheduler.expiring(args.hours)
+    print(f"Expiring within {args.hours:g}h: {len(due):,} (looked up in {(time.perf_counter() - start) * 1000:.3f}ms)")
+    for when, food_id in due[:20]:
+        print(f"  Food_ID {food_id}: expires {datetime.fromtimestamp(when):%Y-%m-%d %H:%M}")
+
+
+if __name__ == "__main__":
+    main()
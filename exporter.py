@@ -0,0 +1,280 @@
+import argparse
+import csv
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import db
+from query_catalog import query_map, chart_queries
+from result_cache import tables_in
+
+# Where finished exports are kept, and how many to keep around
+EXPORT_DIR = os.environ.get('LOCAL_FOOD_WM_EXPORTS', os.path.join(tempfile.gettempdir(), 'food_wm_exports'))
+MAX_FILES = 50
+CHUNK_ROWS = 10000
+
+FORMATS = {"csv": "text/csv", "parquet": "application/vnd.apache.parquet"}
+
+# Everything that can be exported: every query_map entry, the chart queries and the full tables
+SOURCES = {
+    "Chart: wastage by category & location": chart_queries["wastage_by_category"],
+    "Chart: top providers": chart_queries["top_providers"],
+    "Chart: high-demand locations": chart_queries["demand_locations"],
+    "Chart: wastage over time": chart_queries["wastage_over_time"],
+    **query_map,
+    "Table: providers": "SELECT * FROM providers",
+    "Table: receivers": "SELECT * FROM receivers",
+    "Table: food_listings": "SELECT * FROM food_listings",
+    "Table: claims": "SELECT * FROM claims",
+}
+
+
+def _columns(cursor):
+    return [d[0] for d in cursor.description]
+
+
+# Write a cursor to CSV in CHUNK_ROWS batches, so memory stays flat
+def stream_csv(cursor, path, chunk_rows=CHUNK_ROWS):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(_columns(cursor))
+        while True:
+            rows = cursor.fetchmany(chunk_rows)
+            if not rows:
+                break
+            writer.writerows(rows)
+
+
+def _arrow_column(values):
+    import pyarrow as pa
+
+    try:
+        return pa.array(values)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError):
+        # SQLite columns can mix types (e.g. numeric and text contacts): fall back to text
+        return pa.array([None if v is None else str(v) for v in values], type=pa.string())
+
+
+# Type a column can take when one chunk infers `current` and the next `new`: a chunk that is all NULL
+# takes the other's type, integers widen to floats and any other mix becomes text
+def _common_type(current, new):
+    import pyarrow as pa
+
+    if current == new or pa.types.is_null(new):
+        return current
+    if pa.types.is_null(current):
+        return new
+    if {current, new} == {pa.int64(), pa.float64()}:
+        return pa.float64()
+    return pa.string()
+
+
+def _cast(array, type_):
+    import pyarrow as pa
+
+    if array.type == type_:
+        return array
+    try:
+        return array.cast(type_)
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        return pa.array([None if v is None else str(v) for v in array.to_pylist()], type=type_)
+
+
+# Close `writer` and copy the row groups it wrote to `current` into a new file with the wider
+# `schema`; returns the new file's writer and path. Parquet files can't be changed in place, so
+# the export alternates between `path` and a sibling until it's done.
+def _widen(writer, current, path, schema):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer.close()
+    target = path + '.widen' if current == path else path
+    widened = pq.ParquetWriter(target, schema)
+    try:
+        with pq.ParquetFile(current) as written:
+            for i in range(written.num_row_groups):
+                table = written.read_row_group(i)
+                arrays = [_cast(column, field.type) for column, field in zip(table.columns, schema)]
+                widened.write_table(pa.Table.from_arrays(arrays, schema=schema))
+    except BaseException:
+        widened.close()
+        raise
+    os.remove(current)
+    return widened, target
+
+
+# Write a cursor to Parquet one row group per chunk. The schema starts from the first chunk's
+# types; a later chunk that doesn't fit it (text in an integer column, values in a column that
+# was all NULL so far) widens the column and rewrites the row groups already written.
+def stream_parquet(cursor, path, chunk_rows=CHUNK_ROWS):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    names = _columns(cursor)
+    writer, current = None, path
+    try:
+        while True:
+            rows = cursor.fetchmany(chunk_rows)
+            if not rows and writer is not None:
+                break
+            columns = list(zip(*rows)) if rows else [()] * len(names)
+            arrays = [_arrow_column(list(col)) for col in columns]
+            if writer is None:
+                schema = pa.schema([pa.field(n, a.type) for n, a in zip(names, arrays)])
+                writer = pq.ParquetWriter(current, schema)
+            else:
+                schema = pa.schema([pa.field(f.name, _common_type(f.type, a.type))
+                                    for f, a in zip(writer.schema, arrays)])
+                if not schema.equals(writer.schema):
+                    writer, current = _widen(writer, current, path, schema)
+            arrays = [_cast(a, field.type) for a, field in zip(arrays, schema)]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            if not rows:
+                break
+    except BaseException:
+        if writer is not None:
+            writer.close()
+            writer = None
+        if current != path and os.path.exists(current):
+            os.remove(current)
+        raise
+    finally:
+        if writer is not None:
+            writer.close()
+    if current != path:
+        os.replace(current, path)
+
+
+WRITERS = {"csv": stream_csv, "parquet": stream_parquet}
+
+
+def _cache_key(source, params, fmt, versions):
+    payload = json.dumps([source, list(params), fmt, versions], default=str)
+    return hashlib.sha1(payload.encode()).hexdigest()[:20]
+
+
+def _prune():
+    files = [os.path.join(EXPORT_DIR, f) for f in os.listdir(EXPORT_DIR) if not f.endswith('.tmp')]
+    files.sort(key=os.path.getmtime)
+    for path in files[:-MAX_FILES]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+# Background exports: one worker pool and job table for the whole process
+class ExportManager:
+    def __init__(self, workers=2):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='export')
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def file_path(source, params, fmt, db_path=db.DB_PATH):
+        versions = db.data_versions(db_path)
+        key_versions = [versions.get(t, 0) for t in tables_in(SOURCES[source])]
+        # Queries relative to 'now' (expired, expiring soon) change with the day, not only with
+        # writes. SQLite's 'now' is UTC, so the key takes the UTC date.
+        if "'now'" in SOURCES[source]:
+            key_versions.append(time.strftime('%Y-%m-%d', time.gmtime()))
+        return os.path.join(EXPORT_DIR, f"{_cache_key(source, params, fmt, key_versions)}.{fmt}")
+
+    def _run(self, source, params, fmt, path, db_path):
+        os.makedirs(EXPORT_DIR, exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with db.snapshot(db_path) as conn:
+                WRITERS[fmt](conn.execute(SOURCES[source], params), tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        _prune()
+        return path
+
+    # Returns (path, future). A file already exported for the current data versions is reused.
+    def request(self, source, fmt, params=(), db_path=db.DB_PATH):
+        path = self.file_path(source, params, fmt, db_path)
+        with self._lock:
+            job = self._jobs.get(path)
+            if job is None or (job.done() and (job.exception() or not os.path.exists(path))):
+                job = self._executor.submit(self._run, source, tuple(params), fmt, path, db_path)
+                self._jobs[path] = job
+        return path, job
+
+    # Finished file for the current data versions, or None
+    def ready(self, source, fmt, params=(), db_path=db.DB_PATH):
+        path = self.file_path(source, params, fmt, db_path)
+        return path if os.path.exists(path) else None
+
+    def running(self, source, fmt, params=(), db_path=db.DB_PATH):
+        job = self._jobs.get(self.file_path(source, params, fmt, db_path))
+        return job is not None and not job.done()
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_manager():
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = ExportManager()
+        return _manager
+
+
+# Export columns whose types change across chunks to Parquet and check the values read back
+def check(chunk_rows=100):
+    import pyarrow.parquet as pq
+
+    rows = 3 * chunk_rows + chunk_rows // 2
+    expected = {
+        # integers until the last chunk, then text
+        "mixed": [i if i < 3 * chunk_rows else f"x{i}" for i in range(rows)],
+        # integers, then floats from the second chunk on
+        "numeric": [i if i < chunk_rows else i + 0.5 for i in range(rows)],
+        # NULL for the whole first chunk, integers after it
+        "late": [None if i < chunk_rows else i for i in range(rows)],
+        "empty": [None] * rows,
+    }
+    conn = sqlite3.connect(":memory:")
+    conn.execute(f"CREATE TABLE t ({', '.join(expected)})")
+    conn.executemany("INSERT INTO t VALUES (?, ?, ?, ?)", zip(*expected.values()))
+    expected["mixed"] = [None if v is None else str(v) for v in expected["mixed"]]
+    expected["numeric"] = [float(v) for v in expected["numeric"]]
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "check.parquet")
+        stream_parquet(conn.execute("SELECT * FROM t ORDER BY rowid"), path, chunk_rows)
+        table = pq.read_table(path)
+        leftovers = sorted(set(os.listdir(directory)) - {"check.parquet"})
+    conn.close()
+    failures = [f"{name}: {table.column(name).type}" for name, values in expected.items()
+                if table.column(name).to_pylist() != values]
+    if leftovers:
+        failures.append(f"files left behind: {', '.join(leftovers)}")
+    for name in expected:
+        print(f"{name:<8} {table.column(name).type}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Checks for the CSV and Parquet exports")
+    parser.add_argument("command", choices=["check"])
+    parser.add_argument("--chunk-rows", type=int, default=100, help="rows per Parquet row group")
+    args = parser.parse_args()
+
+    failures = check(args.chunk_rows)
+    if failures:
+        raise SystemExit("Parquet export check failed: " + "; ".join(failures))
+    print("OK: columns mixed across chunks were widened")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 import streamlit as st
-import pandas as pd
-import sqlite3
+import csv_export
+import instrumentation
+import startup
 
 
 st.set_page_config(page_title="LOCAL FOOD WASTE MANAGEMENT", page_icon=":material/edit:")
@@ -13,11 +14,21 @@ receiver = st.Page("Receivers.py", title="Receivers", icon=":material/circle:")
 food = st.Page("Food_listing_datas.py", title="Food Details", icon=":material/circle:")
 status = st.Page("claim_status.py", title="Claim Status", icon=":material/circle:")
 query = st.Page("Queries.py", title="Queries", icon=":material/circle:")
+performance = st.Page("Performance.py", title="Performance", icon=":material/circle:")
 about = st.Page("About.py", title="About", icon=":material/circle:")
 
 
-pg = st.navigation([home, provider,receiver,food,status,query,about])
-pg.run()
+pg = st.navigation([home, provider,receiver,food,status,query,performance,about])
+# Statements run while the page renders are tagged with its title (see Performance.py)
+with instrumentation.page(pg.title):
+    pg.run()
+
+# Once the first page is out, import the heavy modules and fill the caches in the background
+# (once per process; LOCAL_FOOD_WM_WARMUP=0 turns it off)
+startup.warm_up()
+
+# The dataset CSVs are rewritten from the database in the background (once per process)
+csv_export.get_exporter().start()
 
 
 print('✅ All Done')
\ No newline at end of file
@@ -0,0 +1,368 @@
+import argparse
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import bulk_import
+import db
+from dates import DATE_FORMATS, TIMESTAMP_FORMATS, parse_series
+
+# Compact in-memory frames of the database tables for the pages. Each process keeps one
+# read-only frame per table, shared by every session that opens a page; a session gets a view
+# of it, and only a table too big for the shared budget is read per session. The dtypes keep
+# that frame small: text with few distinct values (cities, types, statuses) is stored as
+# categories, IDs and quantities as the smallest integer type that holds them, and dates are
+# parsed once here instead of on every use. Each load is recorded against the session that
+# asked for it, which the Performance page reports.
+#
+# Sharing relies on pandas copying on write, so that a session that changes its view copies
+# only the columns it changes and never writes to the shared frame. pandas 3 always does;
+# with pandas 2 load() turns the mode.copy_on_write option on for the process.
+
+# Columns stored as categories whatever their cardinality: a handful of values repeated on every row
+CATEGORICAL = {"City", "Type", "Provider_Type", "Location", "Food_Type", "Meal_Type", "Status", "Food_Name"}
+# Other text columns become categorical when they have at most this many distinct values per row
+CATEGORY_RATIO = 0.5
+# Whole-number columns, downcast to the smallest integer type that holds every value
+INTEGERS = {"Provider_ID", "Receiver_ID", "Food_ID", "Claim_ID", "Quantity"}
+# Date columns parsed on load -> (formats, whether the value is a day at midnight)
+DATES = {"Expiry_Date": (DATE_FORMATS, True), "Timestamp": (TIMESTAMP_FORMATS, False)}
+# Sessions whose memory use is kept for the report, most recently active first
+MAX_SESSIONS = 200
+# Memory budget for the frames shared across sessions; a table bigger than this is loaded per session
+SHARED_BYTES = int(float(os.environ.get('LOCAL_FOOD_WM_SHARED_FRAMES_MB', '512')) * 1e6)
+
+_NULLABLE_INTEGERS = ("Int8", "Int16", "Int32", "Int64")
+
+
+def frame_bytes(frame):
+    return int(frame.memory_usage(deep=True).sum())
+
+
+# IDs and quantities -> int8/16/32/64, or the smallest nullable Int type when some are blank.
+# Columns with text or fractions in them are left as they are.
+def _integers(series):
+    import numpy as np
+    import pandas as pd
+    numbers = pd.to_numeric(series, errors="coerce")
+    if numbers.isna().sum() > series.isna().sum():
+        return series
+    present = numbers.dropna()
+    if not (present == present.round()).all():
+        return series
+    if len(present) == len(numbers):
+        return pd.to_numeric(numbers.astype("int64"), downcast="integer")
+    for dtype in _NULLABLE_INTEGERS:
+        limits = np.iinfo(dtype.lower())
+        if present.empty or (present.min() >= limits.min and present.max() <= limits.max):
+            return numbers.astype(dtype)
+    return series
+
+
+# Dates -> datetime64[s]; None when some value is not a recognised date, so the text is kept
+def _dates(series, formats, day):
+    parsed = parse_series(series, formats)
+    if parsed.isna().sum() > series.isna().sum():
+        return None
+    return parsed.dt.normalize() if day else parsed
+
+
+def _text(series, name):
+    if name in CATEGORICAL or series.nunique() <= CATEGORY_RATIO * len(series):
+        return series.astype("category")
+    return series
+
+
+# Replace each column of a freshly read frame with its compact dtype; returns the same frame
+def compact(frame):
+    import pandas as pd
+    for name in frame.columns:
+        series = frame[name]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            continue
+        if name in INTEGERS:
+            frame[name] = _integers(series)
+            continue
+        if name in DATES:
+            parsed = _dates(series, *DATES[name])
+            if parsed is not None:
+                frame[name] = parsed
+                continue
+        if pd.api.types.is_string_dtype(series) or series.dtype == object:
+            frame[name] = _text(series, name)
+    return frame
+
+
+# Process-wide, read-only cache of compact frames keyed on (database, table, columns). An entry
+# is used while its signature (the table's write version) still matches; otherwise the first
+# session to ask reloads it while the others asking for the same frame wait for that load
+# instead of each reading the table themselves. LRU within max_bytes.
+class SharedFrames:
+    def __init__(self, max_bytes=SHARED_BYTES):
+        self.max_bytes = max_bytes
+        # key -> (signature, frame, bytes, bytes with default dtypes)
+        self._entries = OrderedDict()
+        self._loading = {}
+        self._lock = threading.Lock()
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _lookup(self, key, signature):
+        entry = self._entries.get(key)
+        if entry is None or entry[0] != signature:
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def _evict(self):
+        while self._entries and self.size_bytes > self.max_bytes:
+            _, entry = self._entries.popitem(last=False)
+            self.size_bytes -= entry[2]
+            self.evictions += 1
+
+    # (frame, bytes with default dtypes, whether the frame is shared); `load()` returns a new
+    # compact frame and its default-dtype bytes. Callers must treat a shared frame as read-only.
+    def get(self, key, signature, load):
+        with self._lock:
+            entry = self._lookup(key, signature)
+            if entry is not None:
+                return entry[1], entry[3], True
+            loading = self._loading.setdefault(key, threading.Lock())
+        with loading:
+            with self._lock:
+                entry = self._lookup(key, signature)
+                if entry is not None:
+                    return entry[1], entry[3], True
+                self.misses += 1
+            frame, default_bytes = load()
+            size = frame_bytes(frame)
+            with self._lock:
+                stale = self._entries.pop(key, None)
+                if stale is not None:
+                    self.size_bytes -= stale[2]
+                if size > self.max_bytes:
+                    return frame, default_bytes, False
+                self._entries[key] = (signature, frame, size, default_bytes)
+                self.size_bytes += size
+                self._evict()
+        return frame, default_bytes, True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.size_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def get_shared():
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = SharedFrames()
+        return _shared
+
+
+# Memory held by the frames each session loaded: session -> {table: record}
+class SessionMemory:
+    def __init__(self, max_sessions=MAX_SESSIONS):
+        self._sessions = OrderedDict()
+        self._max_sessions = max_sessions
+        self._lock = threading.Lock()
+
+    def record(self, session, table, record):
+        with self._lock:
+            tables = self._sessions.pop(session, {})
+            tables[table] = record
+            self._sessions[session] = tables
+            while len(self._sessions) > self._max_sessions:
+                self._sessions.popitem(last=False)
+
+    def sessions(self):
+        with self._lock:
+            return {session: dict(tables) for session, tables in reversed(self._sessions.items())}
+
+    def clear(self):
+        with self._lock:
+            self._sessions.clear()
+
+
+_memory = None
+_memory_lock = threading.Lock()
+
+
+def get_memory():
+    global _memory
+    with _memory_lock:
+        if _memory is None:
+            _memory = SessionMemory()
+        return _memory
+
+
+# Streamlit session running this script, or None outside the app
+def session_id():
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+    except ImportError:
+        return None
+    ctx = get_script_run_ctx(suppress_warning=True)
+    return ctx.session_id if ctx else None
+
+
+# `columns` of `table` (by default those of its CSV) in key order, with default dtypes
+def _query(conn, table, columns=None):
+    import pandas as pd
+    import instrumentation
+    columns = list(columns or bulk_import.SCHEMAS[table])
+    sql = f"SELECT {', '.join(columns)} FROM {table} ORDER BY {next(iter(bulk_import.SCHEMAS[table]))}"
+    return instrumentation.observe(conn, sql, (), lambda: pd.read_sql_query(sql, conn), f"frame: {table}")
+
+
+# Copy-on-write is always on from pandas 3 (where setting the option is deprecated)
+def _copy_on_write():
+    import pandas as pd
+    if int(pd.__version__.split('.')[0]) < 3:
+        pd.set_option("mode.copy_on_write", True)
+
+
+# A new compact frame and its bytes with the dtypes it was read with
+def _read(conn, table, columns):
+    frame = _query(conn, table, columns)
+    default_bytes = frame_bytes(frame)
+    return compact(frame), default_bytes
+
+
+# A new, unshared compact frame of `table`
+def read(table, columns=None, db_path=db.DB_PATH):
+    with db.snapshot(db_path) as conn:
+        return _read(conn, table, columns)[0]
+
+
+# `columns` of `table` (by default those of its CSV) in compact dtypes: a view of the shared
+# frame, which only costs this session memory for the columns it changes. The memory it takes
+# is recorded against the current session.
+def load(table, columns=None, db_path=db.DB_PATH):
+    import instrumentation
+    _copy_on_write()
+    start = time.perf_counter()
+    # The version and the rows come from the same read transaction, so an entry is never stored
+    # under a version older than its data
+    with db.snapshot(db_path) as conn:
+        version = db.data_versions(conn=conn).get(table, 0)
+        key = (os.path.abspath(db_path), table, tuple(columns) if columns else None)
+        frame, default_bytes, shared = get_shared().get(key, version, lambda: _read(conn, table, columns))
+    elapsed = (time.perf_counter() - start) * 1000
+    session = session_id()
+    if session is not None:
+        size = frame_bytes(frame)
+        get_memory().record(session, table, {
+            "page": instrumentation.current_page(), "rows": len(frame), "default_bytes": default_bytes,
+            "compact_bytes": size, "private_bytes": 0 if shared else size, "load_ms": elapsed,
+            "loaded": time.time(),
+        })
+    return frame.copy(deep=False)
+
+
+# One row per session: the frames its latest render of each page held, newest session first
+def session_summary():
+    now = time.time()
+    rows = []
+    for session, tables in get_memory().sessions().items():
+        default_bytes = sum(r["default_bytes"] for r in tables.values())
+        compact_bytes = sum(r["compact_bytes"] for r in tables.values())
+        latest = max(tables.values(), key=lambda r: r["loaded"])
+        rows.append({"Session": session[:8], "Tables": ", ".join(sorted(tables)),
+                     "Rows": sum(r["rows"] for r in tables.values()),
+                     "Default_MB": default_bytes / 1e6, "Compact_MB": compact_bytes / 1e6,
+                     "Private_MB": sum(r["private_bytes"] for r in tables.values()) / 1e6,
+                     "Reduction": default_bytes / compact_bytes if compact_bytes else None,
+                     "Last_Page": latest["page"], "Idle_s": now - latest["loaded"]})
+    return rows
+
+
+# Resident set size of this process in bytes, or None where /proc is not available
+def process_rss():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+# `sessions` sessions opening `table` at once: each reading a private copy, then all going through
+# the shared cache, cold and then warm (a rerun)
+def benchmark_sessions(table, sessions, db_path=db.DB_PATH):
+    with ThreadPoolExecutor(sessions) as pool:
+        start = time.perf_counter()
+        private = list(pool.map(lambda _: read(table, db_path=db_path), range(sessions)))
+        private_s = time.perf_counter() - start
+        private_bytes = sum(frame_bytes(frame) for frame in private)
+        del private
+        get_shared().clear()
+        timings = []
+        for _ in range(2):
+            start = time.perf_counter()
+            views = list(pool.map(lambda _: load(table, db_path=db_path), range(sessions)))
+            timings.append(time.perf_counter() - start)
+    print(f"  {sessions} sessions, private copies: {private_s * 1000:8.0f}ms, {private_bytes / 1e6:8.1f}MB")
+    print(f"  {sessions} sessions, shared frame:   {timings[0] * 1000:8.0f}ms, {get_shared().size_bytes / 1e6:8.1f}MB "
+          f"(rerun {timings[1] * 1000:.1f}ms; {len(views)} views)")
+
+
+def main():
+    import pandas as pd
+    parser = argparse.ArgumentParser(description="Compare the memory of each table with default and compact dtypes")
+    parser.add_argument("tables", nargs="*", help=f"any of {', '.join(bulk_import.SCHEMAS)} (default: all)")
+    parser.add_argument("--db", default=db.DB_PATH)
+    parser.add_argument("--columns", action="store_true", help="also list the bytes of every column")
+    parser.add_argument("--sessions", type=int, default=0,
+                        help="also time this many sessions loading each table at once, with and without sharing")
+    args = parser.parse_args()
+    unknown = [t for t in args.tables if t not in bulk_import.SCHEMAS]
+    if unknown:
+        parser.error(f"unknown table(s): {', '.join(unknown)}")
+    if not os.path.exists(args.db):
+        raise SystemExit(f"Database file not found: {args.db}")
+
+    for table in args.tables or list(bulk_import.SCHEMAS):
+        start = time.perf_counter()
+        with db.snapshot(args.db) as conn:
+            frame = _query(conn, table)
+        read_ms = (time.perf_counter() - start) * 1000
+        before = frame.memory_usage(deep=True, index=False)
+        dtypes = frame.dtypes.astype(str)
+        start = time.perf_counter()
+        frame = compact(frame)
+        compact_ms = (time.perf_counter() - start) * 1000
+        after = frame.memory_usage(deep=True, index=False)
+        print(f"{table}: {len(frame):,} rows, {before.sum() / 1e6:.1f}MB -> {after.sum() / 1e6:.1f}MB "
+              f"({before.sum() / max(after.sum(), 1):.1f}x smaller; read {read_ms:.0f}ms, compact {compact_ms:.0f}ms)")
+        if args.columns:
+            report = pd.DataFrame({"default": dtypes, "MB": before / 1e6, "compact": frame.dtypes.astype(str),
+                                   "compact MB": after / 1e6})
+            print(report.round(2).to_string())
+        if args.sessions:
+            benchmark_sessions(table, args.sessions, args.db)
+
+
+if __name__ == "__main__":
+    main()
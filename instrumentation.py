@@ -0,0 +1,183 @@
+import os
+import re
+import threading
+import time
+from collections import deque, OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+
+# Set LOCAL_FOOD_WM_INSTRUMENT=0 to turn statement recording off
+ENABLED = os.environ.get('LOCAL_FOOD_WM_INSTRUMENT', '1') != '0'
+
+# How much history the process keeps
+MAX_STATEMENTS = 5000
+MAX_RENDERS_PER_PAGE = 500
+MAX_PLANS = 1000
+# Rows inspected when estimating the size of a large fetch
+SIZE_SAMPLE_ROWS = 1000
+
+UNTAGGED = "(untagged)"
+_current_page = ContextVar('current_page', default=UNTAGGED)
+
+# "SCAN t" without an index is a full table scan; "SCAN t USING [COVERING] INDEX" walks an index
+_FULL_SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)(?: AS \w+)?$")
+_PLANNABLE = re.compile(r"^\s*(SELECT|WITH|INSERT|UPDATE|DELETE|REPLACE)\b", re.IGNORECASE)
+_LIMIT = re.compile(r"\bLIMIT\s+(\d+|\?)\s*$", re.IGNORECASE)
+# Bookkeeping and summary tables are small by design; scanning them is expected
+_SMALL_TABLES = re.compile(r"^(sqlite_\w+|data_versions|agg_\w+)$")
+
+
+def _short_name(sql):
+    return " ".join(sql.split())[:80]
+
+
+# Tables (or aliases) a plan reads end to end. A scan that already matches the ORDER BY of a
+# LIMITed statement stops early, so it only counts when the plan also sorts in a temp b-tree.
+def full_scans(plan, sql):
+    if _LIMIT.search(sql.strip()) and not any("TEMP B-TREE" in line for line in plan):
+        return []
+    tables = []
+    for line in plan:
+        match = _FULL_SCAN.match(line.strip())
+        if match and not _SMALL_TABLES.match(match.group(1)):
+            tables.append(match.group(1))
+    return tables
+
+
+# (rows, bytes) for whatever a statement produced: a DataFrame, a list of rows, one row or a cursor
+def _result_size(result):
+    if result is None:
+        return 0, 0
+    if hasattr(result, 'memory_usage'):
+        return len(result), int(result.memory_usage(index=True, deep=True).sum())
+    if hasattr(result, 'rowcount'):
+        return max(result.rowcount, 0), 0
+    if isinstance(result, tuple):
+        return 1, _row_bytes(result)
+    if isinstance(result, list):
+        sample = result[:SIZE_SAMPLE_ROWS]
+        sampled = sum(_row_bytes(row) for row in sample)
+        return len(result), sampled * len(result) // max(len(sample), 1)
+    return 0, 0
+
+
+def _row_bytes(row):
+    return sum(len(v) if isinstance(v, (str, bytes)) else 8 for v in row)
+
+
+# Statement timings, query plans and page render times for the whole process
+class PerformanceLog:
+    def __init__(self, max_statements=MAX_STATEMENTS, max_renders=MAX_RENDERS_PER_PAGE):
+        self._statements = deque(maxlen=max_statements)
+        self._renders = {}
+        # The first render of each page pays for its imports and cold caches
+        self._first_renders = {}
+        self._max_renders = max_renders
+        self._plans = OrderedDict()
+        self._lock = threading.Lock()
+
+    # EXPLAIN QUERY PLAN once per distinct statement text
+    def plan(self, conn, sql, params):
+        with self._lock:
+            if sql in self._plans:
+                return self._plans[sql]
+        plan = []
+        if _PLANNABLE.match(sql):
+            try:
+                plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params or ())]
+            except Exception:
+                plan = []
+        with self._lock:
+            self._plans[sql] = plan
+            while len(self._plans) > MAX_PLANS:
+                self._plans.popitem(last=False)
+        return plan
+
+    def add_statement(self, record):
+        with self._lock:
+            self._statements.append(record)
+
+    def add_render(self, page, ms):
+        with self._lock:
+            self._renders.setdefault(page, deque(maxlen=self._max_renders)).append(ms)
+            self._first_renders.setdefault(page, ms)
+
+    def first_renders(self):
+        with self._lock:
+            return dict(self._first_renders)
+
+    def statements(self):
+        with self._lock:
+            return list(self._statements)
+
+    def renders(self):
+        with self._lock:
+            return {page: list(times) for page, times in self._renders.items()}
+
+    def clear(self):
+        with self._lock:
+            self._statements.clear()
+            self._renders.clear()
+            self._first_renders.clear()
+            self._plans.clear()
+
+
+_log = None
+_log_lock = threading.Lock()
+
+
+def get_log():
+    global _log
+    with _log_lock:
+        if _log is None:
+            _log = PerformanceLog()
+        return _log
+
+
+def current_page():
+    return _current_page.get()
+
+
+# Tag everything run inside the block with `name` and record how long the block took
+@contextmanager
+def page(name):
+    token = _current_page.set(name)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        get_log().add_render(name, (time.perf_counter() - start) * 1000)
+        _current_page.reset(token)
+
+
+# Run `run()` (which executes `sql` on `conn`) and record its timing, size and plan
+def observe(conn, sql, params, run, name=None):
+    if not ENABLED:
+        return run()
+    log = get_log()
+    start = time.perf_counter()
+    error = None
+    result = None
+    try:
+        result = run()
+        return result
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        ms = (time.perf_counter() - start) * 1000
+        rows, size = _result_size(result)
+        plan = log.plan(conn, sql, params)
+        log.add_statement({
+            "at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "page": current_page(),
+            "name": name or _short_name(sql),
+            "sql": sql,
+            "ms": ms,
+            "rows": rows,
+            "bytes": size,
+            "plan": plan,
+            "full_scans": full_scans(plan, sql),
+            "error": error,
+        })
@@ -0,0 +1,254 @@
+import argparse
+import random
+import threading
+import time
+from bisect import bisect_left, insort
+from datetime import date, datetime
+
+import db
+import expiry
+from allocator import AVAILABLE_SQL
+from dates import parse_date
+
+TOP_K = 10
+
+# Quantity is what is still unreserved (see allocator.py)
+_STATE_SQL = f'''
+    SELECT f.Food_ID, f.Location, f.Expiry_Date, {AVAILABLE_SQL}, f.Food_Type, f.Meal_Type
+    FROM food_listings f
+'''
+
+
+# In-memory indexes over the listings a receiver could still claim:
+# city -> [(expiry day, Food_ID)] sorted by expiry, plus the same across all cities.
+# Kept current from the listing_changes log (migration 5), so a refresh only reloads touched listings.
+class ListingIndex:
+    def __init__(self, db_path=db.DB_PATH):
+        self.db_path = db_path
+        self._lock = threading.RLock()
+        self._listings = {}
+        self._by_city = {}
+        self._all = []
+        self._seq = None
+        self._pruned_through = None
+        # Share one str object per distinct city / type across millions of listings
+        self._strings = {}
+
+    def __len__(self):
+        return len(self._listings)
+
+    def _intern(self, value):
+        return None if value is None else self._strings.setdefault(value, value)
+
+    # (city, expiry day, quantity left, food type, meal type) for a claimable listing, else None
+    def _entry(self, row):
+        _, city, expiry, quantity, food_type, meal_type = row
+        parsed = parse_date(expiry) if expiry else None
+        if parsed is None or not quantity or quantity <= 0:
+            return None
+        return (self._intern(city), parsed.toordinal(), quantity, self._intern(food_type), self._intern(meal_type))
+
+    def _add(self, food_id, entry):
+        self._listings[food_id] = entry
+        key = (entry[1], food_id)
+        insort(self._by_city.setdefault(entry[0], []), key)
+        insort(self._all, key)
+
+    def _remove(self, food_id):
+        entry = self._listings.pop(food_id, None)
+        if entry is None:
+            return
+        key = (entry[1], food_id)
+        for keys in (self._by_city[entry[0]], self._all):
+            i = bisect_left(keys, key)
+            if i < len(keys) and keys[i] == key:
+                del keys[i]
+
+    def rebuild(self):
+        with db.snapshot(self.db_path) as conn:
+            seq = conn.execute("SELECT IFNULL(MAX(Seq), 0) FROM listing_changes").fetchone()[0]
+            listings, by_city = {}, {}
+            for row in conn.execute(_STATE_SQL):
+                entry = self._entry(row)
+                if entry is not None:
+                    listings[row[0]] = entry
+                    by_city.setdefault(entry[0], []).append((entry[1], row[0]))
+        for keys in by_city.values():
+            keys.sort()
+        everything = sorted(key for keys in by_city.values() for key in keys)
+        with self._lock:
+            self._listings, self._by_city, self._all, self._seq = listings, by_city, everything, seq
+
+    # Apply writes logged since the last refresh; returns how many listings were reloaded
+    def refresh(self):
+        with self._lock:
+            if self._seq is None:
+                self.rebuild()
+                return len(self._listings)
+            with db.snapshot(self.db_path) as conn:
+                gap, seq, ids, rows = expiry.read_changes(conn, self._seq, _STATE_SQL)
+            if gap:
+                self.rebuild()
+                return len(self._listings)
+            for food_id in ids:
+                self._remove(food_id)
+            for row in rows:
+                entry = self._entry(row)
+                if entry is not None:
+                    self._add(row[0], entry)
+            self._seq = seq
+            return len(ids)
+
+    # Drop listings that expired before `today_ord`; they can never match again
+    def _prune(self, today_ord):
+        if self._pruned_through == today_ord:
+            return
+        for keys in list(self._by_city.values()) + [self._all]:
+            cut = bisect_left(keys, (today_ord,))
+            if keys is self._all:
+                for _, food_id in keys[:cut]:
+                    self._listings.pop(food_id, None)
+            del keys[:cut]
+        self._pruned_through = today_ord
+
+    # Walk `keys` (expiry order) from today; stop once k are found and the expiry day moves on,
+    # so listings tied on the k-th day still get ranked by quantity and fit
+    def _collect(self, keys, today_ord, k, food_type, meal_type, skip_city=None):
+        found, cutoff = [], None
+        for i in range(bisect_left(keys, (today_ord,)), len(keys)):
+            day, food_id = keys[i]
+            if cutoff is not None and day > cutoff:
+                break
+            entry = self._listings[food_id]
+            if skip_city is not None and entry[0] == skip_city:
+                continue
+            if (food_type and entry[3] != food_type) or (meal_type and entry[4] != meal_type):
+                continue
+            found.append((food_id, entry))
+            if len(found) == k:
+                cutoff = day
+        return found
+
+    # Top-k claimable, unexpired listings for a receiver: same city first, then soonest expiry,
+    # then largest quantity, then best fit with the Food_Type / Meal_Type the receiver usually claims
+    def top_matches(self, receiver_id, k=TOP_K, food_type=None, meal_type=None, today=None):
+        self.refresh()
+        city, fit = receiver_profile(receiver_id, self.db_path)
+        with self._lock:
+            if today is None:
+                today = date.today()
+                self._prune(today.toordinal())
+            today_ord = today.toordinal()
+            picked = self._collect(self._by_city.get(city, []), today_ord, k, food_type, meal_type)
+            if len(picked) < k:
+                picked += self._collect(self._all, today_ord, k - len(picked), food_type, meal_type, skip_city=city)
+
+        def rank(item):
+            food_id, (listing_city, day, quantity, ftype, mtype) = item
+            return (listing_city != city, day, -quantity, -fit(ftype, mtype), food_id)
+
+        matches = []
+        for food_id, (listing_city, day, quantity, ftype, mtype) in sorted(picked, key=rank)[:k]:
+            matches.append({
+                "Food_ID": food_id,
+                "Location": listing_city,
+                "Expiry_Date": date.fromordinal(day).isoformat(),
+                "Days_Left": day - today_ord,
+                "Quantity_Left": quantity,
+                "Food_Type": ftype,
+                "Meal_Type": mtype,
+                "Same_City": listing_city == city,
+                "Fit": round(fit(ftype, mtype), 2),
+            })
+        return matches
+
+
+# Receiver's city and a fit function scoring (Food_Type, Meal_Type) by the share of their past claims
+def receiver_profile(receiver_id, db_path=db.DB_PATH):
+    row = db.fetch_one("SELECT City FROM receivers WHERE Receiver_ID = ?", (receiver_id,), db_path=db_path,
+                       name="matching: receiver city")
+    if row is None:
+        raise ValueError(f"Receiver {receiver_id} not found")
+    history = db.fetch_all('''
+        SELECT f.Food_Type, f.Meal_Type, COUNT(*)
+        FROM claims c
+        JOIN food_listings f ON f.Food_ID = c.Food_ID
+        WHERE c.Receiver_ID = ?
+        GROUP BY f.Food_Type, f.Meal_Type
+    ''', (receiver_id,), db_path=db_path, name="matching: receiver history")
+    total = sum(n for _, _, n in history) or 1
+    food_share, meal_share = {}, {}
+    for food_type, meal_type, n in history:
+        food_share[food_type] = food_share.get(food_type, 0) + n / total
+        meal_share[meal_type] = meal_share.get(meal_type, 0) + n / total
+    return row[0], lambda ftype, mtype: food_share.get(ftype, 0) + meal_share.get(mtype, 0)
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_index(db_path=db.DB_PATH):
+    with _indexes_lock:
+        if db_path not in _indexes:
+            _indexes[db_path] = ListingIndex(db_path)
+        return _indexes[db_path]
+
+
+# top_matches plus Food_Name, provider details and the expiry scheduler's state, as a DataFrame
+# in rank order
+def match_frame(receiver_id, k=TOP_K, food_type=None, meal_type=None, db_path=db.DB_PATH):
+    import pandas as pd
+
+    matches = get_index(db_path).top_matches(receiver_id, k, food_type, meal_type)
+    if not matches:
+        return pd.DataFrame(columns=["Food_ID", "Food_Name", "Provider_Name", "Location", "Expiry_Date",
+                                     "Days_Left", "Quantity_Left", "Food_Type", "Meal_Type", "Same_City", "Fit",
+                                     "Expiring_Soon"])
+    ids = [m["Food_ID"] for m in matches]
+    details = {row[0]: row[1:] for row in db.fetch_all(f'''
+        SELECT f.Food_ID, f.Food_Name, p.Name
+        FROM food_listings f
+        LEFT JOIN providers p ON p.Provider_ID = f.Provider_ID
+        WHERE f.Food_ID IN ({",".join("?" * len(ids))})
+    ''', ids, db_path=db_path, name="matching: listing details")}
+    df = pd.DataFrame(matches)
+    df.insert(1, "Food_Name", [details.get(i, (None, None))[0] for i in ids])
+    df.insert(2, "Provider_Name", [details.get(i, (None, None))[1] for i in ids])
+    scheduler = expiry.get_scheduler(db_path)
+    df["Expiring_Soon"] = [scheduler.state(i) == expiry.EXPIRING for i in ids]
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rank claimable food for a receiver, or time the matcher")
+    parser.add_argument("--db", default=db.DB_PATH)
+    parser.add_argument("--receiver", type=int, help="print the matches for this Receiver_ID")
+    parser.add_argument("-k", type=int, default=TOP_K)
+    parser.add_argument("--today", help="YYYY-MM-DD to match as of (default: today)")
+    parser.add_argument("--bench", type=int, default=0, help="time this many random receivers")
+    args = parser.parse_args()
+    today = datetime.strptime(args.today, "%Y-%m-%d").date() if args.today else None
+
+    index = get_index(args.db)
+    start = time.perf_counter()
+    index.refresh()
+    print(f"Indexed {len(index):,} claimable listings in {time.perf_counter() - start:.2f}s")
+
+    if args.receiver is not None:
+        for match in index.top_matches(args.receiver, args.k, today=today):
+            print(match)
+    if args.bench:
+        receivers = [r[0] for r in db.fetch_all("SELECT Receiver_ID FROM receivers", db_path=args.db)]
+        samples = []
+        for receiver_id in random.Random(0).choices(receivers, k=args.bench):
+            start = time.perf_counter()
+            index.top_matches(receiver_id, args.k, today=today)
+            samples.append((time.perf_counter() - start) * 1000)
+        samples.sort()
+        print(f"{args.bench} matches: median {samples[len(samples) // 2]:.2f}ms, "
+              f"p99 {samples[int(len(samples) * 0.99) - 1]:.2f}ms, max {samples[-1]:.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,641 @@
+import argparse
+from datetime import datetime
+
+import db
+
+# Target definitions for the four core tables; these match the page initialize_db() schemas
+TABLES = {
+    "providers": {
+        "key": "Provider_ID",
+        "unique": "Contact",
+        "ddl": '''
+            CREATE TABLE providers (
+                Provider_ID INTEGER PRIMARY KEY AUTOINCREMENT,
+                Name TEXT NOT NULL,
+                Type TEXT,
+                Address TEXT,
+                City TEXT,
+                Contact TEXT UNIQUE
+            )
+        ''',
+        "columns": ["Name", "Type", "Address", "City", "Contact"],
+        "not_null": ["Name"],
+    },
+    "receivers": {
+        "key": "Receiver_ID",
+        "unique": "Contact",
+        "ddl": '''
+            CREATE TABLE receivers (
+                Receiver_ID INTEGER PRIMARY KEY AUTOINCREMENT,
+                Name TEXT,
+                Type TEXT,
+                City TEXT,
+                Contact TEXT UNIQUE
+            )
+        ''',
+        "columns": ["Name", "Type", "City", "Contact"],
+        "not_null": [],
+    },
+    "food_listings": {
+        "key": "Food_ID",
+        "unique": None,
+        "ddl": '''
+            CREATE TABLE food_listings (
+                Food_ID INTEGER PRIMARY KEY AUTOINCREMENT,
+                Food_Name TEXT,
+                Quantity INTEGER,
+                Expiry_Date TEXT,
+                Provider_ID INTEGER,
+                Provider_Type TEXT,
+                Location TEXT,
+                Food_Type TEXT,
+                Meal_Type TEXT
+            )
+        ''',
+        "columns": ["Food_Name", "Quantity", "Expiry_Date", "Provider_ID", "Provider_Type",
+                    "Location", "Food_Type", "Meal_Type"],
+        "not_null": [],
+    },
+    "claims": {
+        "key": "Claim_ID",
+        "unique": None,
+        "ddl": '''
+            CREATE TABLE claims (
+                Claim_ID INTEGER PRIMARY KEY AUTOINCREMENT,
+                Food_ID INTEGER,
+                Receiver_ID INTEGER,
+                Status TEXT,
+                Timestamp TEXT
+            )
+        ''',
+        "columns": ["Food_ID", "Receiver_ID", "Status", "Timestamp"],
+        "not_null": [],
+    },
+}
+
+# Secondary indexes for the JOIN / filter columns used by Queries.py and homepage.py
+INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_providers_city ON providers (City)",
+    "CREATE INDEX IF NOT EXISTS idx_receivers_city ON receivers (City)",
+    "CREATE INDEX IF NOT EXISTS idx_food_provider ON food_listings (Provider_ID)",
+    "CREATE INDEX IF NOT EXISTS idx_food_location ON food_listings (Location)",
+    "CREATE INDEX IF NOT EXISTS idx_food_expiry ON food_listings (Expiry_Date)",
+    "CREATE INDEX IF NOT EXISTS idx_claims_food ON claims (Food_ID)",
+    "CREATE INDEX IF NOT EXISTS idx_claims_receiver ON claims (Receiver_ID)",
+    "CREATE INDEX IF NOT EXISTS idx_claims_status ON claims (Status)",
+]
+
+
+def table_exists(conn, table):
+    row = conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (table,)).fetchone()
+    return row is not None
+
+
+# Each migration below carries its own copy of the DDL it runs instead of calling the modules
+# that use the objects (aggregates.py, allocator.py, search.py). A migration must do the same
+# thing on every database it ever runs on, so it is never edited once released: a schema change
+# goes in a new migration, as version 8 does for the version 3 triggers.
+
+# Version 1: rebuild the to_sql-created tables with primary keys, UNIQUE contacts and indexes
+def add_keys_and_indexes(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS migration_conflicts (
+            Table_Name TEXT,
+            Row_ID INTEGER,
+            Column_Name TEXT,
+            Old_Value TEXT,
+            Note TEXT
+        )
+    ''')
+
+    for table, spec in TABLES.items():
+        if not table_exists(conn, table):
+            conn.execute(spec["ddl"])
+            continue
+
+        old = f"{table}_pre_v1"
+        key = spec["key"]
+        unique = spec["unique"]
+        conn.execute(f"ALTER TABLE {table} RENAME TO {old}")
+        conn.execute(spec["ddl"])
+
+        # Duplicate keys get a fresh id, duplicate unique values are cleared; both are logged
+        key_rank = f"ROW_NUMBER() OVER (PARTITION BY {key} ORDER BY rowid)"
+        conn.execute(f'''
+            INSERT INTO migration_conflicts
+            SELECT '{table}', {key}, '{key}', {key}, 'duplicate key, row given a new id'
+            FROM (SELECT {key}, {key_rank} AS rnk FROM {old})
+            WHERE {key} IS NOT NULL AND rnk > 1
+        ''')
+        new_key = f"CASE WHEN {key_rank} = 1 THEN {key} END"
+
+        select_cols = []
+        for col in spec["columns"]:
+            expr = col
+            if col == unique:
+                unique_rank = f"ROW_NUMBER() OVER (PARTITION BY {col} ORDER BY rowid)"
+                conn.execute(f'''
+                    INSERT INTO migration_conflicts
+                    SELECT '{table}', {key}, '{col}', {col}, 'duplicate unique value, cleared'
+                    FROM (SELECT {key}, {col}, {unique_rank} AS rnk FROM {old})
+                    WHERE {col} IS NOT NULL AND rnk > 1
+                ''')
+                expr = f"CASE WHEN {unique_rank} = 1 THEN {col} END"
+            if col in spec["not_null"]:
+                expr = f"COALESCE({expr}, '')"
+            select_cols.append(expr)
+
+        # Rows that keep their id go in first so generated ids never collide with later explicit ones
+        columns = ", ".join([key] + spec["columns"])
+        conn.execute(f'''
+            INSERT INTO {table} ({columns})
+            SELECT {columns} FROM (
+                SELECT {new_key} AS {key}, {", ".join(f"{e} AS {c}" for e, c in zip(select_cols, spec["columns"]))},
+                       rowid AS old_rowid
+                FROM {old}
+            )
+            ORDER BY {key} IS NULL, old_rowid
+        ''')
+        conn.execute(f"DROP TABLE {old}")
+
+    for statement in INDEXES:
+        conn.execute(statement)
+    conn.execute("ANALYZE")
+
+
+# Version 2: per-table data version counters, bumped by triggers on every write
+def add_data_versions(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS data_versions (
+            Table_Name TEXT PRIMARY KEY,
+            Version INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    for table in TABLES:
+        conn.execute("INSERT OR IGNORE INTO data_versions (Table_Name, Version) VALUES (?, 0)", (table,))
+        for event in ("INSERT", "UPDATE", "DELETE"):
+            conn.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_{table}_version_{event.lower()}
+                AFTER {event} ON {table}
+                BEGIN
+                    UPDATE data_versions SET Version = Version + 1 WHERE Table_Name = '{table}';
+                END
+            ''')
+
+
+# Version 3: trigger-maintained summary tables for the Queries.py charts (see aggregates.py).
+# NULL group keys are stored as '' (primary keys can't hold NULL) and mapped back on read.
+CHART_SUMMARIES = {
+    "agg_food_type_location": '''
+            CREATE TABLE IF NOT EXISTS agg_food_type_location (
+                Food_Type TEXT NOT NULL,
+                Location TEXT NOT NULL,
+                Total_Wasted INTEGER NOT NULL,
+                PRIMARY KEY (Food_Type, Location)
+            )
+        ''',
+    "agg_provider_contributions": '''
+            CREATE TABLE IF NOT EXISTS agg_provider_contributions (
+                Provider_ID INTEGER PRIMARY KEY,
+                Contributions INTEGER NOT NULL
+            )
+        ''',
+    "agg_location_claims": '''
+            CREATE TABLE IF NOT EXISTS agg_location_claims (
+                Location TEXT PRIMARY KEY,
+                Claim_Count INTEGER NOT NULL
+            )
+        ''',
+    "agg_expiry_date": '''
+            CREATE TABLE IF NOT EXISTS agg_expiry_date (
+                Date TEXT PRIMARY KEY,
+                Wasted_Food_Count INTEGER NOT NULL
+            )
+        ''',
+}
+
+
+# Day key of agg_expiry_date as version 3 wrote it (version 8 replaces it)
+def _expiry_date_key(column):
+    return f"IFNULL(DATE({column}), '')"
+
+
+# Trigger bodies: add (+1) or remove (-1) one listing / claim from every summary. `day` gives the
+# agg_expiry_date key of an Expiry_Date column.
+def _summary_listing_delta(row, sign, day):
+    if sign > 0:
+        return f'''
+            INSERT INTO agg_food_type_location VALUES (IFNULL({row}.Food_Type, ''), IFNULL({row}.Location, ''), 1)
+                ON CONFLICT DO UPDATE SET Total_Wasted = Total_Wasted + 1;
+            INSERT INTO agg_provider_contributions SELECT {row}.Provider_ID, 1 WHERE {row}.Provider_ID IS NOT NULL
+                ON CONFLICT DO UPDATE SET Contributions = Contributions + 1;
+            INSERT INTO agg_expiry_date VALUES ({day(f'{row}.Expiry_Date')}, 1)
+                ON CONFLICT DO UPDATE SET Wasted_Food_Count = Wasted_Food_Count + 1;
+            INSERT INTO agg_location_claims
+                SELECT IFNULL({row}.Location, ''), COUNT(*) FROM claims WHERE Food_ID = {row}.Food_ID HAVING COUNT(*) > 0
+                ON CONFLICT DO UPDATE SET Claim_Count = Claim_Count + excluded.Claim_Count;
+        '''
+    return f'''
+        UPDATE agg_food_type_location SET Total_Wasted = Total_Wasted - 1
+            WHERE Food_Type = IFNULL({row}.Food_Type, '') AND Location = IFNULL({row}.Location, '');
+        DELETE FROM agg_food_type_location WHERE Total_Wasted <= 0
+            AND Food_Type = IFNULL({row}.Food_Type, '') AND Location = IFNULL({row}.Location, '');
+        UPDATE agg_provider_contributions SET Contributions = Contributions - 1 WHERE Provider_ID = {row}.Provider_ID;
+        DELETE FROM agg_provider_contributions WHERE Contributions <= 0 AND Provider_ID = {row}.Provider_ID;
+        UPDATE agg_expiry_date SET Wasted_Food_Count = Wasted_Food_Count - 1
+            WHERE Date = {day(f'{row}.Expiry_Date')};
+        DELETE FROM agg_expiry_date WHERE Wasted_Food_Count <= 0 AND Date = {day(f'{row}.Expiry_Date')};
+        UPDATE agg_location_claims
+            SET Claim_Count = Claim_Count - (SELECT COUNT(*) FROM claims WHERE Food_ID = {row}.Food_ID)
+            WHERE Location = IFNULL({row}.Location, '');
+        DELETE FROM agg_location_claims WHERE Claim_Count <= 0 AND Location = IFNULL({row}.Location, '');
+    '''
+
+
+def _summary_claim_delta(row, sign):
+    if sign > 0:
+        return f'''
+            INSERT INTO agg_location_claims
+                SELECT IFNULL(Location, ''), 1 FROM food_listings WHERE Food_ID = {row}.Food_ID
+                ON CONFLICT DO UPDATE SET Claim_Count = Claim_Count + 1;
+        '''
+    return f'''
+        UPDATE agg_location_claims SET Claim_Count = Claim_Count - 1
+            WHERE Location = (SELECT IFNULL(Location, '') FROM food_listings WHERE Food_ID = {row}.Food_ID);
+        DELETE FROM agg_location_claims WHERE Claim_Count <= 0
+            AND Location = (SELECT IFNULL(Location, '') FROM food_listings WHERE Food_ID = {row}.Food_ID);
+    '''
+
+
+def _summary_listing_triggers(day):
+    return {
+        "trg_agg_food_insert": f"AFTER INSERT ON food_listings BEGIN {_summary_listing_delta('NEW', +1, day)} END",
+        "trg_agg_food_delete": f"AFTER DELETE ON food_listings BEGIN {_summary_listing_delta('OLD', -1, day)} END",
+        "trg_agg_food_update": (
+            "AFTER UPDATE OF Food_ID, Provider_ID, Location, Food_Type, Expiry_Date ON food_listings "
+            f"BEGIN {_summary_listing_delta('OLD', -1, day)} {_summary_listing_delta('NEW', +1, day)} END"
+        ),
+    }
+
+
+SUMMARY_CLAIM_TRIGGERS = {
+    "trg_agg_claim_insert": f"AFTER INSERT ON claims BEGIN {_summary_claim_delta('NEW', +1)} END",
+    "trg_agg_claim_delete": f"AFTER DELETE ON claims BEGIN {_summary_claim_delta('OLD', -1)} END",
+    "trg_agg_claim_update": (
+        "AFTER UPDATE OF Food_ID ON claims "
+        f"BEGIN {_summary_claim_delta('OLD', -1)} {_summary_claim_delta('NEW', +1)} END"
+    ),
+}
+
+
+def _fill_expiry_summary(conn, day):
+    conn.execute("DELETE FROM agg_expiry_date")
+    conn.execute(f'''
+        INSERT INTO agg_expiry_date
+        SELECT {day('Expiry_Date')}, COUNT(*)
+        FROM food_listings
+        GROUP BY 1
+    ''')
+
+
+def add_chart_summaries(conn):
+    for ddl in CHART_SUMMARIES.values():
+        conn.execute(ddl)
+    triggers = {**_summary_listing_triggers(_expiry_date_key), **SUMMARY_CLAIM_TRIGGERS}
+    for name, body in triggers.items():
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {body}")
+    for table in CHART_SUMMARIES:
+        conn.execute(f"DELETE FROM {table}")
+    conn.execute('''
+        INSERT INTO agg_food_type_location
+        SELECT IFNULL(Food_Type, ''), IFNULL(Location, ''), COUNT(*)
+        FROM food_listings
+        GROUP BY 1, 2
+    ''')
+    conn.execute('''
+        INSERT INTO agg_provider_contributions
+        SELECT Provider_ID, COUNT(*)
+        FROM food_listings
+        WHERE Provider_ID IS NOT NULL
+        GROUP BY Provider_ID
+    ''')
+    conn.execute('''
+        INSERT INTO agg_location_claims
+        SELECT IFNULL(f.Location, ''), COUNT(*)
+        FROM claims c
+        JOIN food_listings f ON c.Food_ID = f.Food_ID
+        GROUP BY 1
+    ''')
+    _fill_expiry_summary(conn, _expiry_date_key)
+
+
+# Version 4: indexes behind the homepage.py filter dropdowns and WHERE clauses
+def add_filter_indexes(conn):
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_providers_type ON providers (Type)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_receivers_type ON receivers (Type)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_food_food_type ON food_listings (Food_Type)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_food_meal_type ON food_listings (Meal_Type)")
+
+
+# Version 5: log of listings touched by writes, read by the in-memory indexes in matching.py.
+# Claims log the Food_ID they point at. The log trims itself every LOG_TRIM_EVERY rows.
+LOG_KEEP = 100000
+LOG_TRIM_EVERY = 10000
+
+
+def add_listing_changes(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS listing_changes (
+            Seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            Food_ID INTEGER
+        )
+    ''')
+    for table in ("food_listings", "claims"):
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_changes_insert AFTER INSERT ON {table}
+            BEGIN
+                INSERT INTO listing_changes (Food_ID) VALUES (NEW.Food_ID);
+            END
+        ''')
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_changes_delete AFTER DELETE ON {table}
+            BEGIN
+                INSERT INTO listing_changes (Food_ID) VALUES (OLD.Food_ID);
+            END
+        ''')
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_changes_update AFTER UPDATE ON {table}
+            BEGIN
+                INSERT INTO listing_changes (Food_ID) SELECT OLD.Food_ID UNION SELECT NEW.Food_ID;
+            END
+        ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_listing_changes_trim AFTER INSERT ON listing_changes
+        WHEN NEW.Seq % {LOG_TRIM_EVERY} = 0
+        BEGIN
+            DELETE FROM listing_changes WHERE Seq <= NEW.Seq - {LOG_KEEP};
+        END
+    ''')
+
+
+# Version 6: claims carry the quantity they reserve; triggers refuse over-allocation (see allocator.py).
+# Claims in these states hold quantity.
+CLAIM_ACTIVE = "'Pending', 'Completed'"
+
+
+# Trigger bodies: the database itself refuses any write that would leave a listing with more
+# explicitly claimed quantity than it has
+def _claim_guard_triggers():
+    def left(exclude_self):
+        other = " AND c.Claim_ID != OLD.Claim_ID" if exclude_self else ""
+        return f'''IFNULL((
+            SELECT f.Quantity - (
+                SELECT IFNULL(SUM(COALESCE(c.Quantity, f.Quantity)), 0)
+                FROM claims c
+                WHERE c.Food_ID = f.Food_ID AND c.Status IN ({CLAIM_ACTIVE}){other}
+            )
+            FROM food_listings f WHERE f.Food_ID = NEW.Food_ID
+        ), 0)'''
+
+    message = "claim quantity exceeds what is left of the listing"
+    return {
+        "trg_claims_guard_insert": f'''
+            BEFORE INSERT ON claims
+            WHEN NEW.Quantity IS NOT NULL AND NEW.Status IN ({CLAIM_ACTIVE})
+            BEGIN
+                SELECT RAISE(ABORT, '{message}') WHERE NEW.Quantity <= 0 OR NEW.Quantity > {left(False)};
+            END
+        ''',
+        "trg_claims_guard_update": f'''
+            BEFORE UPDATE OF Food_ID, Status, Quantity ON claims
+            WHEN NEW.Quantity IS NOT NULL AND NEW.Status IN ({CLAIM_ACTIVE})
+            BEGIN
+                SELECT RAISE(ABORT, '{message}') WHERE NEW.Quantity <= 0 OR NEW.Quantity > {left(True)};
+            END
+        ''',
+        "trg_food_guard_quantity": f'''
+            BEFORE UPDATE OF Quantity ON food_listings
+            BEGIN
+                SELECT RAISE(ABORT, 'quantity is below what is already claimed')
+                WHERE IFNULL(NEW.Quantity, 0) < (
+                    SELECT IFNULL(SUM(c.Quantity), 0) FROM claims c
+                    WHERE c.Food_ID = NEW.Food_ID AND c.Status IN ({CLAIM_ACTIVE})
+                );
+            END
+        ''',
+    }
+
+
+def add_claim_quantities(conn):
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(claims)")]
+    if "Quantity" not in columns:
+        conn.execute("ALTER TABLE claims ADD COLUMN Quantity INTEGER")
+    for name, body in _claim_guard_triggers().items():
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {body}")
+
+
+# Version 7: indexed epoch / month / weekday columns derived from the free-text Expiry_Date and
+# claims.Timestamp, so the time-based questions use range scans and covering indexes instead of
+# parsing every row. Triggers fill them on every insert and on updates of the text column.
+# (table, key, text column, prefix of the derived columns, whether the epoch is truncated to the day)
+EPOCH_COLUMNS = [
+    ("food_listings", "Food_ID", "Expiry_Date", "Expiry", True),
+    ("claims", "Claim_ID", "Timestamp", "Timestamp", False),
+]
+
+
+def _epoch_sql(source, day):
+    from dates import sql_normalized
+
+    start_of_day = ", 'start of day'" if day else ""
+    return f"CAST(strftime('%s', {sql_normalized(source)}{start_of_day}) AS INTEGER)"
+
+
+def _calendar_assignments(prefix, epoch):
+    return (f"{prefix}_Month = strftime('%Y-%m', {epoch}, 'unixepoch'), "
+            f"{prefix}_Weekday = CAST(strftime('%w', {epoch}, 'unixepoch') AS INTEGER)")
+
+
+# Recompute every derived column from the text, e.g. after a bulk load that ran with triggers
+# dropped. Filling derived columns is not a data change, so the version counters and the change
+# log are left alone while it runs.
+def backfill_epoch_columns(conn):
+    names = [f"trg_{table}_{log}_update" for table, *_ in EPOCH_COLUMNS for log in ("version", "changes")]
+    paused = conn.execute(f"SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND name IN ({','.join('?' * len(names))})",
+                          names).fetchall()
+
+    for name, _ in paused:
+        conn.execute(f"DROP TRIGGER {name}")
+    # Parse each row's text once, then derive month and weekday from the stored epoch
+    for table, _, column, prefix, day in EPOCH_COLUMNS:
+        conn.execute(f"UPDATE {table} SET {prefix}_Epoch = {_epoch_sql(column, day)}")
+        conn.execute(f"UPDATE {table} SET {_calendar_assignments(prefix, f'{prefix}_Epoch')}")
+    for _, sql in paused:
+        conn.execute(sql)
+
+
+def add_epoch_columns(conn):
+    for table, key, column, prefix, day in EPOCH_COLUMNS:
+        existing = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+        for name, kind in (("Epoch", "INTEGER"), ("Month", "TEXT"), ("Weekday", "INTEGER")):
+            if f"{prefix}_{name}" not in existing:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {prefix}_{name} {kind}")
+        epoch = _epoch_sql(f"NEW.{column}", day)
+        assignments = f"{prefix}_Epoch = {epoch}, {_calendar_assignments(prefix, epoch)}"
+        for name, event in (("insert", "INSERT"), ("update", f"UPDATE OF {column}")):
+            conn.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_{table}_epoch_{name} AFTER {event} ON {table}
+                BEGIN
+                    UPDATE {table} SET {assignments} WHERE {key} = NEW.{key};
+                END
+            ''')
+    backfill_epoch_columns(conn)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_food_expiry_epoch ON food_listings (Expiry_Epoch)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_food_expiry_month ON food_listings (Expiry_Month, Quantity)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_food_expiry_weekday ON food_listings (Expiry_Weekday)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_food_provider_month ON food_listings (Provider_ID, Expiry_Month, Quantity)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_claims_food_timestamp ON claims (Food_ID, Timestamp_Epoch)")
+    conn.execute("ANALYZE")
+
+
+# Version 8: agg_expiry_date keyed on the normalized expiry day (US-style dates used to land in
+# the '' bucket); the listing triggers are recreated with the new key and the summary refilled.
+# Like version 7 it takes the normalization from dates.sql_normalized, whose SQL must therefore
+# stay the same.
+def _normalized_expiry_key(column):
+    from dates import sql_normalized
+
+    return f"IFNULL(DATE({sql_normalized(column)}), '')"
+
+
+def normalize_expiry_summary(conn):
+    triggers = _summary_listing_triggers(_normalized_expiry_key)
+    for name, body in triggers.items():
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+        conn.execute(f"CREATE TRIGGER {name} {body}")
+    _fill_expiry_summary(conn, _normalized_expiry_key)
+
+
+# Version 9: the over-allocation guards and allocator.RESERVED_SQL sum the active claims of a
+# listing on every claim insert; a covering index lets that sum skip the table rows. It replaces
+# idx_claims_food, which is its prefix.
+def add_claim_reservation_index(conn):
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_claims_food_status_qty ON claims (Food_ID, Status, Quantity)")
+    conn.execute("DROP INDEX IF EXISTS idx_claims_food")
+
+
+# Version 10: FTS5 indexes over listing, provider and receiver names (see search.py). Each is an
+# external-content table over its base table, kept in step by triggers.
+# FTS5 table -> base table, key, indexed columns and their bm25 weights (names above addresses)
+SEARCH_INDEXES = {
+    "search_food": {"table": "food_listings", "key": "Food_ID", "columns": ["Food_Name"], "weights": [1.0]},
+    "search_providers": {"table": "providers", "key": "Provider_ID", "columns": ["Name", "Address"],
+                         "weights": [2.0, 1.0]},
+    "search_receivers": {"table": "receivers", "key": "Receiver_ID", "columns": ["Name"], "weights": [1.0]},
+}
+# Same folding as the unicode61 tokenizer: case and diacritics are ignored
+SEARCH_TOKENIZER = "unicode61 remove_diacritics 2"
+# Prefix indexes make 2- and 3-letter prefix queries a single b-tree range
+SEARCH_PREFIXES = "2 3"
+
+
+def _search_triggers(fts, spec):
+    table, key, columns = spec["table"], spec["key"], spec["columns"]
+    names = ", ".join(columns)
+    new = ", ".join(f"NEW.{c}" for c in columns)
+    old = ", ".join(f"OLD.{c}" for c in columns)
+    insert = f"INSERT INTO {fts} (rowid, {names}) VALUES (NEW.{key}, {new});"
+    delete = f"INSERT INTO {fts} ({fts}, rowid, {names}) VALUES ('delete', OLD.{key}, {old});"
+    return {
+        f"trg_{fts}_insert": f"AFTER INSERT ON {table} BEGIN {insert} END",
+        f"trg_{fts}_delete": f"AFTER DELETE ON {table} BEGIN {delete} END",
+        f"trg_{fts}_update": f"AFTER UPDATE OF {key}, {names} ON {table} BEGIN {delete} {insert} END",
+    }
+
+
+def add_search_indexes(conn):
+    for fts, spec in SEARCH_INDEXES.items():
+        conn.execute(f'''
+            CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+                {", ".join(spec["columns"])},
+                content='{spec["table"]}', content_rowid='{spec["key"]}',
+                tokenize='{SEARCH_TOKENIZER}', prefix='{SEARCH_PREFIXES}'
+            )
+        ''')
+        # The `rank` column (and ORDER BY rank) uses the weighted bm25
+        conn.execute(f"INSERT INTO {fts} ({fts}, rank) VALUES ('rank', ?)",
+                     (f"bm25({', '.join(str(w) for w in spec['weights'])})",))
+        conn.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts}_vocab USING fts5vocab({fts}, row)")
+        for name, body in _search_triggers(fts, spec).items():
+            conn.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {body}")
+        conn.execute(f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')")
+
+
+# Ordered list of (version, description, function); append new migrations at the end
+MIGRATIONS = [
+    (1, "primary keys, unique contacts and secondary indexes", add_keys_and_indexes),
+    (2, "data version counters for cache invalidation", add_data_versions),
+    (3, "materialized chart aggregates", add_chart_summaries),
+    (4, "filter indexes for the dataset viewer", add_filter_indexes),
+    (5, "listing change log for the matching indexes", add_listing_changes),
+    (6, "claimed quantities and over-allocation guards", add_claim_quantities),
+    (7, "epoch, month and weekday columns for expiry dates and claim timestamps", add_epoch_columns),
+    (8, "chart summary of expiry days keyed on normalized dates", normalize_expiry_summary),
+    (9, "covering index for reserved claim quantities", add_claim_reservation_index),
+    (10, "full-text search over listing, provider and receiver names", add_search_indexes),
+]
+
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+# Apply every pending migration, each in its own transaction; safe to call on every startup
+def migrate(pool):
+    applied = []
+    with pool.transaction() as conn:
+        version = current_version(conn)
+    if version >= LATEST_VERSION:
+        return applied
+
+    for target, description, upgrade in MIGRATIONS:
+        with pool.transaction() as conn:
+            # Re-check inside the write lock in case another process migrated meanwhile
+            if current_version(conn) >= target:
+                continue
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    Version INTEGER PRIMARY KEY,
+                    Description TEXT,
+                    Applied_At TEXT
+                )
+            ''')
+            upgrade(conn)
+            conn.execute("INSERT INTO schema_migrations VALUES (?, ?, ?)",
+                         (target, description, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+            conn.execute(f"PRAGMA user_version = {target}")
+        applied.append(target)
+    return applied
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply pending schema migrations")
+    parser.add_argument("--db", default=db.DB_PATH)
+    args = parser.parse_args()
+
+    pool = db.ConnectionPool(args.db)
+    with pool.reader() as conn:
+        before = current_version(conn)
+    applied = migrate(pool)
+    pool.close()
+    if applied:
+        print(f"Migrated {args.db} from version {before} to {applied[-1]}")
+    else:
+        print(f"{args.db} is already at version {before}")
+
+
+if __name__ == "__main__":
+    main()
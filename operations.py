@@ -0,0 +1,120 @@
+import os
+
+import allocator
+import csv_journal
+import db
+import instrumentation
+
+# CSV copy of each table. The database is the source of truth: writes go only there and
+# csv_export.py rewrites these files from it in the background. An empty table is seeded from
+# its CSV (see the pages' initialize_db).
+CSV_DIR = os.environ.get('LOCAL_FOOD_WM_CSV_DIR', 'D:/Guvi_Project1/dataset')
+CSV_PATHS = {
+    "providers": f'{CSV_DIR}/providers_data.csv',
+    "receivers": f'{CSV_DIR}/Receivers_data.csv',
+    "food_listings": f'{CSV_DIR}/Food_listings_data.csv',
+    "claims": f'{CSV_DIR}/claims_data.csv',
+}
+KEYS = {"providers": "Provider_ID", "receivers": "Receiver_ID", "food_listings": "Food_ID", "claims": "Claim_ID"}
+
+# Choices offered by the registration forms
+PROVIDER_TYPES = ["Restaurant", "Catering Service", "Grocery Store", "Supermarket"]
+RECEIVER_TYPES = ["Individual", "Charity", "NGO", "Shelter"]
+FOOD_TYPES = ["Vegetarian", "Non-Vegetarian", "Vegan"]
+MEAL_TYPES = ["Breakfast", "Lunch", "Dinner", "Snacks"]
+
+
+# Change log CSVs carried before the database became the source of truth; the pages fold a
+# leftover log into its CSV before seeding an empty table from it
+def journal(table):
+    return csv_journal.get_journal(CSV_PATHS[table], KEYS[table])
+
+
+# Run one write statement; returns the cursor so callers can read lastrowid / rowcount
+def _write(sql, params, db_path, name):
+    with db.transaction(db_path) as conn:
+        return instrumentation.observe(conn, sql, params, lambda: conn.execute(sql, params), name)
+
+
+# --- Providers ---
+# Returns the new Provider_ID; a duplicate Contact raises sqlite3.IntegrityError
+def insert_provider(name, ptype, address, city, contact, db_path=db.DB_PATH):
+    return _write('''
+        INSERT INTO providers (Name, Type, Address, City, Contact)
+        VALUES (?, ?, ?, ?, ?)
+    ''', (name, ptype, address, city, contact), db_path, "insert provider").lastrowid
+
+
+# The update / delete functions return False when the row doesn't exist
+def update_provider(pid, name, ptype, address, city, contact, db_path=db.DB_PATH):
+    cursor = _write('''
+        UPDATE providers
+        SET Name=?, Type=?, Address=?, City=?, Contact=?
+        WHERE Provider_ID=?
+    ''', (name, ptype, address, city, contact, pid), db_path, "update provider")
+    return cursor.rowcount > 0
+
+
+def delete_provider(pid, db_path=db.DB_PATH):
+    return _write("DELETE FROM providers WHERE Provider_ID=?", (pid,), db_path, "delete provider").rowcount > 0
+
+
+# --- Receivers ---
+def insert_receiver(name, rtype, city, contact, db_path=db.DB_PATH):
+    return _write('''
+        INSERT INTO receivers (Name, Type, City, Contact)
+        VALUES (?, ?, ?, ?)
+    ''', (name, rtype, city, contact), db_path, "insert receiver").lastrowid
+
+
+def update_receiver(rid, name, rtype, city, contact, db_path=db.DB_PATH):
+    cursor = _write('''
+        UPDATE receivers
+        SET Name=?, Type=?, City=?, Contact=?
+        WHERE Receiver_ID=?
+    ''', (name, rtype, city, contact, rid), db_path, "update receiver")
+    return cursor.rowcount > 0
+
+
+def delete_receiver(rid, db_path=db.DB_PATH):
+    return _write("DELETE FROM receivers WHERE Receiver_ID=?", (rid,), db_path, "delete receiver").rowcount > 0
+
+
+# --- Food listings ---
+# `exp` is the expiry date as YYYY-MM-DD
+def insert_food(name, qty, exp, pid, ptype, loc, ftype, meal, db_path=db.DB_PATH):
+    return _write('''
+        INSERT INTO food_listings (Food_Name, Quantity, Expiry_Date, Provider_ID, Provider_Type, Location, Food_Type, Meal_Type)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ''', (name, qty, exp, pid, ptype, loc, ftype, meal), db_path, "insert food").lastrowid
+
+
+# Lowering the quantity below what is already claimed raises sqlite3.IntegrityError (migration 6)
+def update_food(fid, name, qty, exp, ftype, meal, db_path=db.DB_PATH):
+    cursor = _write('''
+        UPDATE food_listings
+        SET Food_Name=?, Quantity=?, Expiry_Date=?, Food_Type=?, Meal_Type=?
+        WHERE Food_ID=?
+    ''', (name, qty, exp, ftype, meal, fid), db_path, "update food")
+    return cursor.rowcount > 0
+
+
+def delete_food(fid, db_path=db.DB_PATH):
+    return _write("DELETE FROM food_listings WHERE Food_ID=?", (fid,), db_path, "delete food").rowcount > 0
+
+
+# --- Claims ---
+# Reserve quantity through the allocator (raises allocator.ClaimError).
+# Returns (claim_id, timestamp, quantity granted).
+def insert_claim(food_id, receiver_id, quantity=None, db_path=db.DB_PATH):
+    return allocator.claim(food_id, receiver_id, quantity, db_path=db_path)
+
+
+# False when the claim wasn't pending
+def complete_claim(claim_id, db_path=db.DB_PATH):
+    return allocator.complete(claim_id, db_path=db_path)
+
+
+# Its reserved quantity goes back to the listing; False when it was already cancelled
+def cancel_claim(claim_id, db_path=db.DB_PATH):
+    return allocator.cancel(claim_id, db_path=db_path)
@@ -0,0 +1,144 @@
+import argparse
+import os
+import sqlite3
+import statistics
+import sys
+import time
+
+import benchmark_scale
+import db
+import migrations
+from benchmark_queries import query_params
+from query_catalog import query_map
+from result_cache import tables_in
+
+# Work is counted in SQLite VM instructions (each row a plan visits costs a handful), sampled
+# every STEP_INTERVAL instructions through the progress handler
+STEP_INTERVAL = 100
+# Default budgets, relative to the rows in the tables a query reads. A plan that stays linear
+# uses well under 20 instructions per row; a join that multiplies rows goes far over.
+STEPS_PER_ROW = 25
+MS_PER_1K_ROWS = 3.0
+MIN_MS = 50.0
+# Per-query exceptions: question number -> (steps per row, ms per 1k rows)
+OVERRIDES = {}
+
+
+def question(name):
+    return name.split(".", 1)[0]
+
+
+def budget(name, base_rows, ms_per_1k_rows=MS_PER_1K_ROWS):
+    steps_per_row, ms_per_1k = OVERRIDES.get(question(name), (STEPS_PER_ROW, ms_per_1k_rows))
+    return steps_per_row * max(base_rows, 1), max(MIN_MS, ms_per_1k * base_rows / 1000)
+
+
+# Run one query: (VM instructions, median ms over `runs`, result rows)
+def measure(conn, name, sql, runs):
+    params = query_params(conn, name)
+    ticks = [0]
+
+    def tick():
+        ticks[0] += 1
+        return 0
+
+    conn.set_progress_handler(tick, STEP_INTERVAL)
+    try:
+        rows = len(conn.execute(sql, params).fetchall())
+    finally:
+        conn.set_progress_handler(None, STEP_INTERVAL)
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        conn.execute(sql, params).fetchall()
+        samples.append((time.perf_counter() - start) * 1000)
+    return ticks[0] * STEP_INTERVAL, statistics.median(samples), rows
+
+
+# Check every query_map entry against its budgets; returns one result dict per query
+def check(db_path, runs=3, ms_per_1k_rows=MS_PER_1K_ROWS, only=None):
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        counts = {}
+        results = []
+        for name, sql in query_map.items():
+            if only and question(name) not in only:
+                continue
+            tables = tables_in(sql)
+            for table in tables:
+                if table not in counts:
+                    counts[table] = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            base_rows = sum(counts[t] for t in tables)
+            plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", query_params(conn, name))]
+            steps, ms, rows = measure(conn, name, sql, runs)
+            max_steps, max_ms = budget(name, base_rows, ms_per_1k_rows)
+            failures = []
+            if steps > max_steps:
+                failures.append(f"{steps:,} VM steps > budget {max_steps:,}")
+            if ms > max_ms:
+                failures.append(f"{ms:.1f}ms > budget {max_ms:.0f}ms")
+            results.append({
+                "name": name,
+                "tables": {t: counts[t] for t in tables},
+                "base_rows": base_rows,
+                "plan": plan,
+                "steps": steps,
+                "steps_per_row": steps / max(base_rows, 1),
+                "ms": ms,
+                "rows": rows,
+                "failures": failures,
+            })
+        return results
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run every query_map entry on a synthetic database and fail "
+                                                 "when one goes over its VM-step or latency budget")
+    parser.add_argument("--size", default="100k", help="synthetic scale (see synthetic_data.py)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--db", help="check this database instead of a synthetic one")
+    parser.add_argument("--workdir", default=benchmark_scale.WORKDIR)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--ms-per-1k-rows", type=float, default=MS_PER_1K_ROWS,
+                        help="latency budget; raise it on slow machines")
+    parser.add_argument("--only", nargs="*", help="question numbers to check, e.g. 1 18")
+    parser.add_argument("--plans", action="store_true", help="print every plan, not only failing ones")
+    args = parser.parse_args()
+
+    if args.db:
+        if not os.path.exists(args.db):
+            raise SystemExit(f"Database file not found: {args.db}")
+        db_path = args.db
+        with sqlite3.connect(db_path) as conn:
+            if migrations.current_version(conn) < migrations.LATEST_VERSION:
+                raise SystemExit(f"{db_path} is not on the latest schema; run migrations.py --db {db_path} first")
+    else:
+        db_path, _ = benchmark_scale.prepare(args.size, args.seed, args.workdir, False)
+        # Databases kept in the workdir may predate newer migrations
+        pool = db.ConnectionPool(db_path)
+        migrations.migrate(pool)
+        pool.close()
+
+    results = check(db_path, args.runs, args.ms_per_1k_rows, args.only)
+    print(f"{'Query':<52}{'base rows':>11}{'result':>8}{'VM steps':>13}{'/row':>7}{'ms':>9}")
+    for r in results:
+        status = "FAIL" if r["failures"] else "ok"
+        print(f"{r['name'][:50]:<52}{r['base_rows']:>11,}{r['rows']:>8,}{r['steps']:>13,}"
+              f"{r['steps_per_row']:>7.1f}{r['ms']:>9.1f}  {status}")
+        if r["failures"] or args.plans:
+            for failure in r["failures"]:
+                print(f"    ! {failure}")
+            print("    reads " + ", ".join(f"{t} ({n:,} rows)" for t, n in r["tables"].items()))
+            for line in r["plan"]:
+                print(f"    {line}")
+    failed = [r for r in results if r["failures"]]
+    if failed:
+        print(f"FAIL: {len(failed)} of {len(results)} queries over budget", file=sys.stderr)
+        sys.exit(1)
+    print(f"OK: all {len(results)} queries within budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+# -------------------------------
+# Query Map with Descriptions
+# -------------------------------
+# Every ORDER BY breaks ties on the group key, so a LIMIT always keeps the same rows and the
+# columnar engine (columnar.py) can reproduce the order exactly
+query_map = {
+    # --- Providers & Receivers ---
+    # Count each side per city first; joining the raw rows on City multiplies them per city
+    "1. How many food providers and receivers are there in each city?": """
+        WITH p AS (SELECT City, COUNT(*) AS Providers FROM providers GROUP BY City),
+             r AS (SELECT City, COUNT(*) AS Receivers FROM receivers GROUP BY City)
+        SELECT p.City, p.Providers, IFNULL(r.Receivers, 0) AS Receivers
+        FROM p
+        LEFT JOIN r ON p.City = r.City
+        ORDER BY p.City
+    """,
+
+    "2. Which type of food provider contributes the most food?": """
+        SELECT Provider_Type, COUNT(*) AS Total_Food_Items
+        FROM food_listings
+        GROUP BY Provider_Type
+        ORDER BY Total_Food_Items DESC, Provider_Type
+        LIMIT 1
+    """,
+
+    "3. What is the contact information of food providers in a specific city?": """
+        SELECT Name, Type, Address, Contact
+        FROM providers
+        WHERE City = ?
+    """,
+
+    "4. Which receivers have claimed the most food?": """
+        SELECT r.Name, COUNT(c.Claim_ID) AS Claims
+        FROM claims c
+        JOIN receivers r ON c.Receiver_ID = r.Receiver_ID
+        GROUP BY r.Name
+        ORDER BY Claims DESC, r.Name
+        LIMIT 5
+    """,
+
+    # --- Food Listings ---
+    "5. What is the total quantity of food available from all providers?": """
+        SELECT SUM(Quantity) AS Total_Quantity FROM food_listings
+    """,
+
+    "6. Which city has the highest number of food listings?": """
+        SELECT City, COUNT(*) AS Listings
+        FROM food_listings f
+        JOIN providers p ON f.Provider_ID = p.Provider_ID
+        GROUP BY City
+        ORDER BY Listings DESC, City
+        LIMIT 1
+    """,
+
+    "7. What are the most commonly available food types?": """
+        SELECT Food_Type, COUNT(*) AS Count
+        FROM food_listings
+        GROUP BY Food_Type
+        ORDER BY Count DESC, Food_Type
+        LIMIT 5
+    """,
+
+    # --- Claims & Distribution ---
+    "8. How many food claims have been made for each food item?": """
+        SELECT f.Food_Name, COUNT(c.Claim_ID) AS Total_Claims
+        FROM claims c
+        JOIN food_listings f ON c.Food_ID = f.Food_ID
+        GROUP BY f.Food_Name
+        ORDER BY Total_Claims DESC, f.Food_Name
+    """,
+
+    "9. Which provider has had the highest number of successful food claims?": """
+        SELECT p.Name, COUNT(*) AS Successful_Claims
+        FROM claims c
+        JOIN food_listings f ON c.Food_ID = f.Food_ID
+        JOIN providers p ON f.Provider_ID = p.Provider_ID
+        WHERE c.Status = 'Completed'
+        GROUP BY p.Name
+        ORDER BY Successful_Claims DESC, p.Name
+        LIMIT 1
+    """,
+
+    "10. What percentage of food claims are completed vs. pending vs. canceled?": """
+        SELECT Status,
+               ROUND(COUNT(*) * 100.0 / (SELECT COUNT(*) FROM claims), 2) AS Percentage
+        FROM claims
+        GROUP BY Status
+    """,
+
+    # --- Insights & Analysis ---
+    "11. What is the average quantity of food claimed per receiver?": """
+        SELECT r.Name, ROUND(AVG(f.Quantity), 2) AS Avg_Quantity
+        FROM claims c
+        JOIN food_listings f ON c.Food_ID = f.Food_ID
+        JOIN receivers r ON c.Receiver_ID = r.Receiver_ID
+        GROUP BY r.Name
+        ORDER BY Avg_Quantity DESC, r.Name
+        LIMIT 10
+    """,
+
+    "12. Which meal type is claimed the most?": """
+        SELECT Meal_Type, COUNT(*) AS Claim_Count
+        FROM food_listings f
+        JOIN claims c ON f.Food_ID = c.Food_ID
+        GROUP BY Meal_Type
+        ORDER BY Claim_Count DESC, Meal_Type
+        LIMIT 1
+    """,
+
+    "13. What is the total quantity of food donated by each provider?": """
+        SELECT p.Name, SUM(f.Quantity) AS Total_Donated
+        FROM food_listings f
+        JOIN providers p ON f.Provider_ID = p.Provider_ID
+        GROUP BY p.Name
+        ORDER BY Total_Donated DESC, p.Name
+        LIMIT 10""",
+        # --- Operational / Time-based ---
+    "14. What is the average time between food listing and claim?": """
+        SELECT ROUND(AVG(c.Timestamp_Epoch - f.Expiry_Epoch) / 86400.0, 2) AS Avg_Days_Before_Expiry
+        FROM food_listings f
+        JOIN claims c ON c.Food_ID = f.Food_ID
+    """,
+
+    "15. How many expired food items are still unclaimed?": """
+        SELECT COUNT(*) AS Expired_Unclaimed
+        FROM food_listings f
+        LEFT JOIN claims c ON f.Food_ID = c.Food_ID
+        WHERE f.Expiry_Epoch < CAST(strftime('%s', 'now', 'start of day') AS INTEGER) AND c.Claim_ID IS NULL
+    """,
+
+    "16. What is the average quantity of food provided by each type of provider?": """
+        SELECT Provider_Type, ROUND(AVG(Quantity), 2) AS Avg_Quantity
+        FROM food_listings
+        GROUP BY Provider_Type
+    """,
+
+    "17. Which city has the highest amount of unclaimed food?": """
+        SELECT p.City, SUM(f.Quantity) AS Unclaimed_Quantity
+        FROM food_listings f
+        JOIN providers p ON f.Provider_ID = p.Provider_ID
+        LEFT JOIN claims c ON f.Food_ID = c.Food_ID
+        WHERE c.Claim_ID IS NULL
+        GROUP BY p.City
+        ORDER BY Unclaimed_Quantity DESC, p.City
+        LIMIT 1
+    """,
+
+    # Same rows as joining every listing and claim, but each provider stops at its first
+    # listing without a claim (or has no listings at all)
+    "18. List providers who haven't had any claims": """
+        SELECT DISTINCT p.Name, p.City
+        FROM providers p
+        WHERE NOT EXISTS (SELECT 1 FROM food_listings f WHERE f.Provider_ID = p.Provider_ID)
+           OR EXISTS (
+                SELECT 1 FROM food_listings f
+                WHERE f.Provider_ID = p.Provider_ID
+                  AND NOT EXISTS (SELECT 1 FROM claims c WHERE c.Food_ID = f.Food_ID)
+           )
+    """,
+
+    "19. Which food types are expiring soon (next 3 days)?": """
+        SELECT Food_Name, Expiry_Date, Quantity
+        FROM food_listings
+        WHERE Expiry_Epoch BETWEEN CAST(strftime('%s', 'now', 'start of day') AS INTEGER)
+                               AND CAST(strftime('%s', 'now', 'start of day', '+3 days') AS INTEGER)
+        ORDER BY Expiry_Epoch, Food_ID
+    """,
+
+    "20. Monthly trend of food donations": """
+        SELECT Expiry_Month AS Month, SUM(Quantity) AS Total_Donated
+        FROM food_listings
+        GROUP BY Expiry_Month
+        ORDER BY Month DESC
+    """,
+
+    "21. Top 5 most donated food items": """
+        SELECT Food_Name, SUM(Quantity) AS Total_Quantity
+        FROM food_listings
+        GROUP BY Food_Name
+        ORDER BY Total_Quantity DESC, Food_Name
+        LIMIT 5
+    """,
+
+    "22. Number of unique receivers per city": """
+        SELECT City, COUNT(DISTINCT Receiver_ID) AS Unique_Receivers
+        FROM receivers
+        GROUP BY City
+    """,
+
+    "23. What is the total number of canceled claims per receiver?": """
+        SELECT r.Name, COUNT(*) AS Canceled_Claims
+        FROM claims c
+        JOIN receivers r ON c.Receiver_ID = r.Receiver_ID
+        WHERE c.Status = 'Canceled'
+        GROUP BY r.Name
+        ORDER BY Canceled_Claims DESC, r.Name
+        LIMIT 5
+    """,
+
+    "24. Average food quantity listed per provider per month": """
+        SELECT p.Name, f.Expiry_Month AS Month, ROUND(AVG(f.Quantity), 2) AS Avg_Quantity
+        FROM food_listings f
+        JOIN providers p ON f.Provider_ID = p.Provider_ID
+        GROUP BY p.Name, f.Expiry_Month
+        ORDER BY Month DESC, p.Name
+    """,
+
+    "25. Which day of the week has the most food donations?": """
+        SELECT Expiry_Weekday AS Weekday, COUNT(*) AS Listings
+        FROM food_listings
+        GROUP BY Expiry_Weekday
+        ORDER BY Listings DESC, Weekday
+    """
+}
+
+# Question 3 is the only entry that takes a parameter (the selected city)
+CITY_QUERY = "3. What is the contact information of food providers in a specific city?"
+
+# Questions 15 and 19 are answered on the page by the expiry scheduler (expiry.py); the SQL
+# above is kept for exports
+EXPIRED_QUERY = "15. How many expired food items are still unclaimed?"
+EXPIRING_QUERY = "19. Which food types are expiring soon (next 3 days)?"
+
+
+# -------------------------------
+# Data Analysis & Chart queries
+# (read the trigger-maintained summary tables from aggregates.py)
+# -------------------------------
+chart_queries = {
+    "wastage_by_category": """
+        SELECT NULLIF(Food_Type, '') AS Food_Type, NULLIF(Location, '') AS Location, Total_Wasted
+        FROM agg_food_type_location
+        ORDER BY Food_Type, Location
+    """,
+
+    "top_providers": """
+        SELECT p.Name AS Provider_Name, SUM(a.Contributions) AS Contributions
+        FROM agg_provider_contributions a
+        JOIN providers p ON a.Provider_ID = p.Provider_ID
+        GROUP BY p.Name
+        ORDER BY Contributions DESC, Provider_Name
+        LIMIT 10
+    """,
+
+    "demand_locations": """
+        SELECT NULLIF(Location, '') AS Location, Claim_Count
+        FROM agg_location_claims
+        ORDER BY Claim_Count DESC, Location
+        LIMIT 10
+    """,
+
+    "wastage_over_time": """
+        SELECT NULLIF(Date, '') AS Date, Wasted_Food_Count
+        FROM agg_expiry_date
+        ORDER BY Date
+    """,
+}
+
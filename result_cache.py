@@ -0,0 +1,140 @@
+import re
+import threading
+from collections import OrderedDict
+
+import aggregates
+import db
+import instrumentation
+
+# Bounds for the process-wide cache
+MAX_ENTRIES = 256
+MAX_BYTES = 64 * 1024 * 1024
+
+TABLES = ("providers", "receivers", "food_listings", "claims")
+_TABLE_PATTERN = re.compile(r"\b(" + "|".join(TABLES) + r")\b", re.IGNORECASE)
+
+
+_SUMMARY_PATTERN = re.compile(r"\b(" + "|".join(aggregates.SUMMARIES) + r")\b", re.IGNORECASE)
+
+
+# Tables a statement reads from, used to pick the version counters that belong in its key.
+# Summary tables are tracked through the base tables their triggers follow.
+def tables_in(sql):
+    tables = {name.lower() for name in _TABLE_PATTERN.findall(sql)}
+    for summary in _SUMMARY_PATTERN.findall(sql):
+        tables.update(aggregates.SUMMARIES[summary.lower()]["sources"])
+    return tuple(sorted(tables))
+
+
+def _frame_bytes(df):
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+# LRU cache of query results keyed on (query id, params, versions of the tables it reads).
+# A write bumps the table's version, so stale entries are never matched again and age out.
+class ResultCache:
+    def __init__(self, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _evict(self):
+        while self._entries and (len(self._entries) > self.max_entries or self.size_bytes > self.max_bytes):
+            _, (_, size) = self._entries.popitem(last=False)
+            self.size_bytes -= size
+            self.evictions += 1
+
+    def get_or_run(self, query_id, sql, params=None, db_path=db.DB_PATH):
+        import pandas as pd
+
+        # Versions and data come from the same read transaction, so an entry can never
+        # be stored under a version older than the data it holds
+        with db.snapshot(db_path) as conn:
+            versions = db.data_versions(conn=conn)
+            key = (db_path, query_id, tuple(params or ()), tuple(versions.get(t, 0) for t in tables_in(sql)))
+
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[0]
+                self.misses += 1
+
+            df = instrumentation.observe(conn, sql, params,
+                                         lambda: pd.read_sql_query(sql, conn, params=params), query_id)
+
+        size = _frame_bytes(df)
+        with self._lock:
+            if size <= self.max_bytes and key not in self._entries:
+                self._entries[key] = (df, size)
+                self.size_bytes += size
+                self._evict()
+        return df
+
+    # Bytes produced by `render(df)` for a query result (a chart image), cached in the same LRU
+    # under the same table versions, so a chart is only redrawn after its tables change
+    def get_or_render(self, figure_id, sql, render, params=None, db_path=db.DB_PATH):
+        with db.snapshot(db_path) as conn:
+            versions = db.data_versions(conn=conn)
+        key = (db_path, ("figure", figure_id), tuple(params or ()),
+               tuple(versions.get(t, 0) for t in tables_in(sql)))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        image = render(self.get_or_run(figure_id, sql, params=params, db_path=db_path))
+        with self._lock:
+            if len(image) <= self.max_bytes and key not in self._entries:
+                self._entries[key] = (image, len(image))
+                self.size_bytes += len(image)
+                self._evict()
+        return image
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.size_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResultCache()
+        return _cache
+
+
+# Cached replacement for db.read_sql; callers must treat the returned frame as read-only
+def cached_read_sql(query_id, sql, params=None, db_path=db.DB_PATH):
+    return get_cache().get_or_run(query_id, sql, params=params, db_path=db_path)
+
+
+def cached_figure(figure_id, sql, render, params=None, db_path=db.DB_PATH):
+    return get_cache().get_or_render(figure_id, sql, render, params=params, db_path=db_path)
+
@@ -0,0 +1,185 @@
+import argparse
+import re
+import time
+import unicodedata
+
+import db
+
+# Full-text search over listing, provider and receiver names (SQLite FTS5).
+# Each index is an external-content FTS5 table over its base table, so the text is stored once;
+# triggers keep it in step with every insert, update and delete. Queries match every word as a
+# prefix ("chick" finds "Chicken"); a word with no prefix match is replaced by the closest terms
+# in the index vocabulary (one typo from four letters, two from eight), so "chiken" still
+# finds "Chicken". Results are ranked by bm25, with names weighted above addresses.
+
+# index -> base table, key and indexed columns. The FTS5 tables, their tokenizer, prefix indexes,
+# bm25 weights and sync triggers are created by migration 10.
+INDEXES = {
+    "food": {"table": "food_listings", "key": "Food_ID", "columns": ["Food_Name"]},
+    "providers": {"table": "providers", "key": "Provider_ID", "columns": ["Name", "Address"]},
+    "receivers": {"table": "receivers", "key": "Receiver_ID", "columns": ["Name"]},
+}
+
+# Relevance order lists at most MAX_RANKED matches. Up to RANK_LIMIT matches are scored with bm25;
+# a broader search (a common word over millions of rows) lists the newest matches first instead,
+# which FTS5 streams without scoring every match.
+MAX_RANKED = 1000
+RANK_LIMIT = 20000
+# Closest vocabulary terms tried for a word that matches nothing
+FUZZY_TERMS = 3
+
+_WORD = re.compile(r"[^\W_]+")
+
+
+def fts_table(index):
+    return f"search_{index}"
+
+
+def vocab_table(index):
+    return f"search_{index}_vocab"
+
+
+# Re-index every row from the base tables, e.g. after a bulk load that ran with triggers dropped
+def rebuild(conn):
+    for index in INDEXES:
+        conn.execute(f"INSERT INTO {fts_table(index)} ({fts_table(index)}) VALUES ('rebuild')")
+
+
+# Lower-cased words with diacritics removed, as the tokenizer sees them
+def words(text):
+    text = unicodedata.normalize("NFKD", text.lower())
+    return _WORD.findall("".join(ch for ch in text if not unicodedata.combining(ch)))
+
+
+def _max_typos(word):
+    return 0 if len(word) < 4 else 1 if len(word) < 8 else 2
+
+
+# Optimal string alignment distance (edits plus adjacent swaps), or limit + 1 once it exceeds limit
+def distance(a, b, limit):
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2, previous = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+def _quote(term):
+    return '"' + term.replace('"', '""') + '"'
+
+
+def _has_prefix(conn, index, word):
+    return conn.execute(f"SELECT 1 FROM {vocab_table(index)} WHERE term >= ? AND term < ? LIMIT 1",
+                        (word, word + "\U0010ffff")).fetchone() is not None
+
+
+# Vocabulary terms within the typo budget of `word`, compared whole and as a prefix of the same
+# length (so a mistyped partial word still finds its completions). Only terms sharing the first
+# letter are scanned. Closest and most common first.
+def _fuzzy_terms(conn, index, word):
+    limit = _max_typos(word)
+    if limit == 0:
+        return []
+    scored = []
+    rows = conn.execute(f"SELECT term, doc FROM {vocab_table(index)} WHERE term >= ? AND term < ?",
+                        (word[0], chr(ord(word[0]) + 1)))
+    for term, docs in rows:
+        if len(term) + limit < len(word):
+            continue
+        d = min(distance(word, term, limit), distance(word, term[:len(word)], limit))
+        if d <= limit:
+            scored.append((d, -docs, term))
+    return [term for _, _, term in sorted(scored)[:FUZZY_TERMS]]
+
+
+# FTS5 MATCH expression for free text, or None when there are no words. Returns
+# (expression, {word: [replacement terms]}) with the typo corrections that were applied.
+def match_expression(index, text, db_path=db.DB_PATH, conn=None):
+    found = words(text or "")
+    if not found:
+        return None, {}
+    if conn is None:
+        with db.reader(db_path) as conn:
+            return match_expression(index, text, db_path, conn)
+    parts, corrections = [], {}
+    for word in found:
+        if _has_prefix(conn, index, word):
+            parts.append(_quote(word) + "*")
+            continue
+        terms = _fuzzy_terms(conn, index, word)
+        if terms:
+            corrections[word] = terms
+            parts.append("(" + " OR ".join(_quote(t) + "*" for t in terms) + ")")
+        else:
+            # Keeps the expression valid; it matches nothing
+            parts.append(_quote(word) + "*")
+    return " AND ".join(parts), corrections
+
+
+def count(conn, index, expression):
+    fts = fts_table(index)
+    return conn.execute(f"SELECT COUNT(*) FROM {fts} WHERE {fts} MATCH ?", (expression,)).fetchone()[0]
+
+
+# Subquery with the best MAX_RANKED matches of one `?` MATCH parameter, as (Match_ID, Search_Rank);
+# lower Search_Rank is better. `ranked` is False for searches broader than RANK_LIMIT.
+def ranked_sql(index, ranked=True):
+    fts = fts_table(index)
+    if ranked:
+        return f"SELECT rowid AS Match_ID, rank AS Search_Rank FROM {fts} WHERE {fts} MATCH ? ORDER BY rank LIMIT {MAX_RANKED}"
+    return f"SELECT rowid AS Match_ID, -rowid AS Search_Rank FROM {fts} WHERE {fts} MATCH ? ORDER BY rowid DESC LIMIT {MAX_RANKED}"
+
+
+# Subquery with the keys of every match of one `?` MATCH parameter
+def matching_sql(index):
+    fts = fts_table(index)
+    return f"SELECT rowid FROM {fts} WHERE {fts} MATCH ?"
+
+
+# Best `limit` matches for free text: ([(key, rank)], corrections), best first
+def search(index, text, limit=20, db_path=db.DB_PATH):
+    with db.reader(db_path) as conn:
+        expression, corrections = match_expression(index, text, db_path, conn)
+        if expression is None:
+            return [], corrections
+        ranked = count(conn, index, expression) <= RANK_LIMIT
+        rows = conn.execute(f"SELECT * FROM ({ranked_sql(index, ranked)}) LIMIT ?", (expression, limit)).fetchall()
+    return rows, corrections
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search listing, provider or receiver names")
+    parser.add_argument("index", choices=list(INDEXES))
+    parser.add_argument("text", nargs="+")
+    parser.add_argument("--db", default=db.DB_PATH)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--runs", type=int, default=5, help="repeat the search and report the median time")
+    args = parser.parse_args()
+
+    text = " ".join(args.text)
+    spec = INDEXES[args.index]
+    times = []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        rows, corrections = search(args.index, text, args.limit, args.db)
+        times.append((time.perf_counter() - start) * 1000)
+    print(f"{len(rows)} result(s) in {sorted(times)[len(times) // 2]:.2f}ms (median of {args.runs})")
+    for word, terms in corrections.items():
+        print(f"  '{word}' matched nothing; searched for {', '.join(terms)}")
+    for key, rank in rows:
+        values = db.fetch_one(f"SELECT {', '.join(spec['columns'])} FROM {spec['table']} WHERE {spec['key']} = ?",
+                              (key,), db_path=args.db)
+        print(f"  {key:>8}  {rank:8.3f}  " + " | ".join(str(v) for v in values))
+
+
+if __name__ == "__main__":
+    main()
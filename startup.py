@@ -0,0 +1,264 @@
+import argparse
+import importlib
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+import db
+
+# Set LOCAL_FOOD_WM_WARMUP=0 to skip the background warm-up
+WARM_UP = os.environ.get('LOCAL_FOOD_WM_WARMUP', '1') != '0'
+
+# Third-party packages that cost hundreds of milliseconds to import; pages only pull them in
+# when they actually render a table or a chart
+HEAVY_MODULES = ("pandas", "numpy", "pyarrow", "matplotlib", "seaborn", "scipy")
+
+
+def _import(*names):
+    def run():
+        for name in names:
+            importlib.import_module(name)
+    return run
+
+
+def _prime_viewer(db_path):
+    import dataset_view
+
+    for dataset, spec in dataset_view.DATASETS.items():
+        dataset_view.count_rows(dataset, {}, db_path)
+        for label in spec["filters"]:
+            if label != spec["id_filter"]:
+                dataset_view.filter_options(dataset, label, db_path)
+
+
+def _prime_charts(db_path):
+    import result_cache
+    import timeseries
+    from query_catalog import chart_queries
+
+    for chart_id in ("wastage_by_category", "top_providers", "demand_locations"):
+        result_cache.cached_read_sql(chart_id, chart_queries[chart_id], db_path=db_path)
+    timeseries.wastage_series(db_path=db_path)
+
+
+def _prime_expiry(db_path):
+    import expiry
+
+    expiry.get_scheduler(db_path)
+
+
+def _prime_matching(db_path):
+    import matching
+
+    matching.get_index(db_path).refresh()
+
+
+# Run in order on the warm-up thread; a step that fails is recorded and the rest still run
+WARM_UP_STEPS = [
+    ("import pandas / pyarrow", lambda db_path: _import("pandas", "pyarrow")()),
+    ("import matplotlib / seaborn", lambda db_path: _import("matplotlib.figure", "matplotlib.backends.backend_agg",
+                                                            "seaborn")()),
+    ("dataset viewer counts and filters", _prime_viewer),
+    ("chart summaries", _prime_charts),
+    ("expiry scheduler", _prime_expiry),
+    ("claim matching index", _prime_matching),
+]
+
+
+# Imports the heavy modules and fills the database-backed caches on a daemon thread, so the
+# first visit to the other pages doesn't pay for them. Started once per database, after the
+# first page has rendered.
+class WarmUp:
+    def __init__(self, db_path=db.DB_PATH, steps=WARM_UP_STEPS):
+        self.db_path = db_path
+        self.steps = steps
+        self._lock = threading.Lock()
+        self._results = []
+        self._thread = None
+        self._started_at = None
+        self._finished_at = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._started_at = time.time()
+            self._thread = threading.Thread(target=self._run, daemon=True, name="warm-up")
+        self._thread.start()
+
+    def _run(self):
+        for name, step in self.steps:
+            start = time.perf_counter()
+            error = None
+            try:
+                step(self.db_path)
+            except Exception as e:
+                # A missing database shouldn't stop the imports; the page will report it itself
+                error = f"{type(e).__name__}: {e}"
+            with self._lock:
+                self._results.append({"step": name, "ms": (time.perf_counter() - start) * 1000, "error": error})
+        with self._lock:
+            self._finished_at = time.time()
+
+    def join(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def done(self):
+        with self._lock:
+            return self._finished_at is not None
+
+    # One dict per finished step, in order
+    def results(self):
+        with self._lock:
+            return list(self._results)
+
+
+_warm_ups = {}
+_warm_ups_lock = threading.Lock()
+
+
+def get_warm_up(db_path=db.DB_PATH):
+    with _warm_ups_lock:
+        if db_path not in _warm_ups:
+            _warm_ups[db_path] = WarmUp(db_path)
+        return _warm_ups[db_path]
+
+
+# Start the warm-up for this process unless LOCAL_FOOD_WM_WARMUP=0; returns it, or None
+def warm_up(db_path=db.DB_PATH):
+    if not WARM_UP:
+        return None
+    warm = get_warm_up(db_path)
+    warm.start()
+    return warm
+
+
+# ---------------------------------------------------------------------------
+# Startup profile. Each sample runs the page in a fresh interpreter (python -X importtime)
+# under Streamlit's AppTest and reports when the first element went out, when the script
+# finished, and where the import time went.
+# ---------------------------------------------------------------------------
+
+_IMPORT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+_RESULT_MARK = "STARTUP_PROFILE "
+
+
+# Child side: render `script` once and print the timings as one JSON line
+def _render(script, warm):
+    started = time.perf_counter()
+    from streamlit.runtime.scriptrunner_utils.script_run_context import ScriptRunContext
+    from streamlit.testing.v1 import AppTest
+
+    first_delta = []
+    enqueue = ScriptRunContext.enqueue
+
+    def timed_enqueue(self, msg):
+        if not first_delta and msg.HasField("delta"):
+            first_delta.append(time.perf_counter())
+        return enqueue(self, msg)
+
+    ScriptRunContext.enqueue = timed_enqueue
+    # Streamlit sets its runtime up on the first run; do that with an empty script, then time a
+    # second empty run as the harness overhead every render below includes
+    AppTest.from_string("import streamlit as st").run()
+    baseline_start = time.perf_counter()
+    AppTest.from_string("import streamlit as st").run()
+    baseline = time.perf_counter() - baseline_start
+    first_delta.clear()
+    app = AppTest.from_file(os.path.abspath(script), default_timeout=300)
+    if warm:
+        get_warm_up().start()
+        get_warm_up().join()
+    before = set(sys.modules)
+    run_start = time.perf_counter()
+    app.run()
+    finished = time.perf_counter()
+    loaded = {name.split(".")[0] for name in set(sys.modules) - before}
+    print(_RESULT_MARK + json.dumps({
+        "streamlit_ms": (run_start - started) * 1000,
+        "harness_ms": baseline * 1000,
+        "first_element_ms": ((first_delta[0] if first_delta else finished) - run_start) * 1000,
+        "render_ms": (finished - run_start) * 1000,
+        "heavy_loaded": sorted(loaded & set(HEAVY_MODULES)),
+        "errors": [str(e.value) for e in app.exception],
+    }))
+
+
+# Self import time (ms) per top-level package, from python -X importtime output
+def import_breakdown(stderr):
+    totals = {}
+    for line in stderr.splitlines():
+        match = _IMPORT_LINE.match(line)
+        if match:
+            package = match.group(4).split(".")[0]
+            totals[package] = totals.get(package, 0) + int(match.group(1)) / 1000
+    return dict(sorted(totals.items(), key=lambda item: -item[1]))
+
+
+# Render `script` in `runs` fresh interpreters; returns the samples and the import breakdown of
+# the first one
+def profile(script, runs=3, warm=False):
+    samples, breakdown = [], None
+    command = [sys.executable, "-X", "importtime", os.path.abspath(__file__), "_render", script]
+    if warm:
+        command.append("--warm")
+    for _ in range(runs):
+        done = subprocess.run(command, capture_output=True, text=True, env={**os.environ, "LOCAL_FOOD_WM_WARMUP": "0"})
+        lines = [line for line in done.stdout.splitlines() if line.startswith(_RESULT_MARK)]
+        if done.returncode or not lines:
+            raise SystemExit(f"Rendering {script} failed:\n{done.stdout}\n{done.stderr[-3000:]}")
+        samples.append(json.loads(lines[-1][len(_RESULT_MARK):]))
+        if breakdown is None:
+            breakdown = import_breakdown(done.stderr)
+    return samples, breakdown
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "_render":
+        _render(sys.argv[2], "--warm" in sys.argv[3:])
+        return
+
+    parser = argparse.ArgumentParser(description="Measure cold-start time to first render, or run the warm-up")
+    sub = parser.add_subparsers(dest="action", required=True)
+    prof = sub.add_parser("profile", help="time-to-first-render and import breakdown for a page")
+    prof.add_argument("--page", default="food_waste_management.py",
+                      help="script to render (the entry script lands on the homepage)")
+    prof.add_argument("--runs", type=int, default=3)
+    prof.add_argument("--warm", action="store_true", help="finish the warm-up before rendering")
+    prof.add_argument("--top", type=int, default=15, help="packages to list in the import breakdown")
+    warm = sub.add_parser("warm-up", help="run the warm-up steps in the foreground and time them")
+    warm.add_argument("--db", default=db.DB_PATH)
+    args = parser.parse_args()
+
+    if args.action == "warm-up":
+        runner = WarmUp(args.db)
+        runner.start()
+        runner.join()
+        for result in runner.results():
+            print(f"{result['step']:<36}{result['ms']:>9.1f}ms  {result['error'] or ''}")
+        return
+
+    samples, breakdown = profile(args.page, args.runs, args.warm)
+    print(f"Streamlit startup  median {statistics.median(s['streamlit_ms'] for s in samples):>8.1f}ms")
+    print(f"Harness overhead   median {statistics.median(s['harness_ms'] for s in samples):>8.1f}ms "
+          "(an empty script; subtracted below)")
+    for key, label in (("first_element_ms", "First element"), ("render_ms", "Full render")):
+        values = [s[key] - s["harness_ms"] for s in samples]
+        print(f"{label:<18} median {statistics.median(values):>8.1f}ms  (min {min(values):.1f}, max {max(values):.1f})")
+
+    print(f"Heavy modules loaded while rendering: {', '.join(samples[0]['heavy_loaded']) or 'none'}")
+    if samples[0]["errors"]:
+        print(f"Errors: {samples[0]['errors']}")
+    print(f"Import time by package (self, ms, {args.page}):")
+    for package, ms in list(breakdown.items())[:args.top]:
+        print(f"  {package:<28}{ms:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+import argparse
+import os
+import random
+import sqlite3
+import time
+from datetime import date, timedelta
+
+import db
+import migrations
+import aggregates
+import search
+from exporter import stream_csv
+
+# Named sizes: rows in food_listings and in claims. Providers and receivers get a tenth of that
+# (at least 100 each), so a provider has ~10 listings on average, heavily skewed.
+SIZES = {"10k": 10_000, "100k": 100_000, "1M": 1_000_000, "10M": 10_000_000}
+BATCH_ROWS = 50_000
+
+# Same file names as the CSV mirrors the pages read
+CSV_FILES = {
+    "providers": "providers_data.csv",
+    "receivers": "Receivers_data.csv",
+    "food_listings": "Food_listings_data.csv",
+    "claims": "claims_data.csv",
+}
+
+BASE_CITIES = [
+    "Chennai", "Coimbatore", "Madurai", "Trichy", "Salem", "Tirunelveli", "Erode", "Vellore", "Thoothukudi",
+    "Thanjavur", "Dindigul", "Karur", "Hosur", "Nagercoil", "Kanchipuram", "Cuddalore", "Kumbakonam",
+    "Tiruppur", "Pudukkottai", "Namakkal", "Bengaluru", "Mysuru", "Hyderabad", "Kochi", "Thiruvananthapuram",
+    "Puducherry", "Mumbai", "Pune", "Delhi", "Kolkata",
+]
+STREETS = ["Anna Salai", "Gandhi Road", "Nehru Street", "Main Road", "Temple Street", "Market Road",
+           "Station Road", "Lake View Road", "Church Street", "Bazaar Street"]
+FIRST_NAMES = ["Arun", "Priya", "Karthik", "Divya", "Suresh", "Lakshmi", "Vijay", "Meena", "Rahul", "Anitha",
+               "Ganesh", "Harini", "Mohan", "Kavya", "Ravi", "Deepa", "Sanjay", "Nisha", "Ajay", "Revathi"]
+LAST_NAMES = ["Kumar", "Raman", "Iyer", "Nair", "Reddy", "Sharma", "Pillai", "Das", "Menon", "Rao"]
+
+PROVIDER_TYPES = (["Restaurant", "Grocery Store", "Supermarket", "Catering Service"], [40, 25, 20, 15])
+RECEIVER_TYPES = (["NGO", "Charity", "Shelter", "Individual"], [35, 30, 20, 15])
+FOOD_NAMES = (["Rice", "Bread", "Vegetables", "Fruits", "Dairy", "Soup", "Salad", "Pasta", "Chicken", "Fish",
+               "Tiffen"], [18, 14, 12, 10, 9, 8, 7, 7, 8, 6, 1])
+NON_VEG_FOODS = {"Chicken", "Fish"}
+VEG_TYPES = (["Vegetarian", "Vegan"], [70, 30])
+MEAL_TYPES = (["Lunch", "Dinner", "Breakfast", "Snacks"], [35, 30, 20, 15])
+STATUSES = (["Completed", "Pending", "Cancelled"], [45, 30, 25])
+
+# The shipped CSVs use US-style dates; rows entered through the forms are ISO
+ISO_SHARE = 0.05
+FIRST_EXPIRY = date(2025, 3, 1)
+EXPIRY_DAYS = 365
+
+
+def _cum(weights):
+    total, out = 0, []
+    for w in weights:
+        total += w
+        out.append(total)
+    return out
+
+
+# Zipf-like weights: a few items (cities, big providers, popular listings) get most of the rows
+def _zipf(n, s):
+    return _cum([1 / (rank ** s) for rank in range(1, n + 1)])
+
+
+def _city_names(n):
+    return [BASE_CITIES[i] if i < len(BASE_CITIES) else f"{BASE_CITIES[i % len(BASE_CITIES)]} {i // len(BASE_CITIES)}"
+            for i in range(n)]
+
+
+def _fmt_date(rng, day):
+    if rng.random() < ISO_SHARE:
+        return day.isoformat()
+    return f"{day.month}/{day.day}/{day.year}"
+
+
+def _fmt_timestamp(rng, day, minute):
+    if rng.random() < ISO_SHARE:
+        return f"{day.isoformat()} {minute // 60:02d}:{minute % 60:02d}:{rng.randrange(60):02d}"
+    return f"{day.month}/{day.day}/{day.year} {minute // 60}:{minute % 60:02d}"
+
+
+def _weighted(rng, spec, k):
+    values, weights = spec
+    return rng.choices(values, cum_weights=_cum(weights), k=k)
+
+
+def _providers(rng, start, count, cities, city_weights):
+    types = _weighted(rng, PROVIDER_TYPES, count)
+    picked = rng.choices(cities, cum_weights=city_weights, k=count)
+    rows = []
+    for i in range(count):
+        pid = start + i
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {types[i]}"
+        address = f"{rng.randrange(1, 400)} {rng.choice(STREETS)}\n{picked[i]}"
+        rows.append((pid, name, types[i], address, picked[i], f"+91-9{pid:09d}"))
+    return rows
+
+
+def _receivers(rng, start, count, cities, city_weights):
+    types = _weighted(rng, RECEIVER_TYPES, count)
+    picked = rng.choices(cities, cum_weights=city_weights, k=count)
+    return [(start + i, f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}", types[i], picked[i],
+             f"+91-8{start + i:09d}") for i in range(count)]
+
+
+def _listings(rng, start, count, providers, provider_weights):
+    owners = rng.choices(providers, cum_weights=provider_weights, k=count)
+    names = _weighted(rng, FOOD_NAMES, count)
+    meals = _weighted(rng, MEAL_TYPES, count)
+    veg = _weighted(rng, VEG_TYPES, count)
+    rows = []
+    for i in range(count):
+        pid, ptype, city = owners[i]
+        food_type = "Non-Vegetarian" if names[i] in NON_VEG_FOODS else veg[i]
+        quantity = min(50, int(rng.expovariate(1 / 10)) + 1)
+        expiry = FIRST_EXPIRY + timedelta(days=rng.randrange(EXPIRY_DAYS))
+        rows.append((start + i, names[i], quantity, _fmt_date(rng, expiry), pid, ptype, city, food_type, meals[i]))
+    return rows
+
+
+# Like the shipped CSV, claims carry no Quantity, so each active one holds its whole listing
+def _claims(rng, start, count, listings, listing_weights, receivers, receiver_weights):
+    foods = rng.choices(range(1, listings + 1), cum_weights=listing_weights, k=count)
+    takers = rng.choices(range(1, receivers + 1), cum_weights=receiver_weights, k=count)
+    statuses = _weighted(rng, STATUSES, count)
+    rows = []
+    for i in range(count):
+        day = FIRST_EXPIRY + timedelta(days=rng.randrange(EXPIRY_DAYS))
+        rows.append((start + i, foods[i], takers[i], statuses[i], _fmt_timestamp(rng, day, rng.randrange(1440))))
+    return rows
+
+
+def _insert(conn, table, rows):
+    spec = migrations.TABLES[table]
+    columns = ", ".join([spec["key"]] + spec["columns"])
+    marks = ", ".join("?" * len(rows[0]))
+    conn.executemany(f"INSERT INTO {table} ({columns}) VALUES ({marks})", rows)
+
+
+def _batches(total):
+    for start in range(1, total + 1, BATCH_ROWS):
+        yield start, min(BATCH_ROWS, total - start + 1)
+
+
+# Build a migrated database with `rows` listings and claims. Triggers and secondary indexes are
+# dropped for the load and recreated afterwards, then the summary tables are rebuilt once.
+def generate(db_path, rows, seed=42, report=print):
+    if os.path.exists(db_path):
+        raise FileExistsError(db_path)
+    started = time.perf_counter()
+    rng = random.Random(seed)
+    people = max(100, rows // 10)
+
+    pool = db.ConnectionPool(db_path)
+    migrations.migrate(pool)
+    pool.close()
+
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.execute("BEGIN")
+        saved = conn.execute(
+            "SELECT type, name, sql FROM sqlite_master WHERE type IN ('trigger', 'index') AND sql IS NOT NULL"
+        ).fetchall()
+        for kind, name, _ in saved:
+            conn.execute(f"DROP {kind.upper()} {name}")
+
+        cities = _city_names(max(20, people // 50))
+        city_weights = _zipf(len(cities), 1.1)
+
+        providers = []
+        for start, count in _batches(people):
+            batch = _providers(rng, start, count, cities, city_weights)
+            _insert(conn, "providers", batch)
+            providers += [(r[0], r[2], r[4]) for r in batch]
+        rng.shuffle(providers)
+        for start, count in _batches(people):
+            _insert(conn, "receivers", _receivers(rng, start, count, cities, city_weights))
+        report(f"{people:,} providers and receivers")
+
+        provider_weights = _zipf(len(providers), 0.8)
+        for start, count in _batches(rows):
+            _insert(conn, "food_listings", _listings(rng, start, count, providers, provider_weights))
+        report(f"{rows:,} food listings")
+
+        listing_weights = _zipf(rows, 0.6)
+        receiver_weights = _zipf(people, 0.7)
+        for start, count in _batches(rows):
+            _insert(conn, "claims", _claims(rng, start, count, rows, listing_weights, people, receiver_weights))
+        report(f"{rows:,} claims")
+
+        migrations.backfill_epoch_columns(conn)
+
+        for _, _, sql in sorted(saved, key=lambda s: s[0] != "index"):
+            conn.execute(sql)
+        aggregates.rebuild(conn)
+        search.rebuild(conn)
+        conn.execute("ANALYZE")
+        conn.execute("COMMIT")
+        conn.execute("PRAGMA journal_mode = WAL")
+    finally:
+        conn.close()
+    report(f"Generated {db_path} in {time.perf_counter() - started:.1f}s")
+
+
+# Write the four dataset CSVs, next to each other in csv_dir
+def export_csvs(db_path, csv_dir):
+    os.makedirs(csv_dir, exist_ok=True)
+    pool = db.ConnectionPool(db_path, readers=1)
+    try:
+        with pool.reader() as conn:
+            for table, name in CSV_FILES.items():
+                stream_csv(conn.execute(f"SELECT * FROM {table}"), os.path.join(csv_dir, name))
+    finally:
+        pool.close()
+
+
+def parse_size(text):
+    if text in SIZES:
+        return SIZES[text]
+    return int(text.replace("_", "").replace(",", ""))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a seeded synthetic database at a given scale")
+    parser.add_argument("size", help=f"{', '.join(SIZES)} or a row count")
+    parser.add_argument("--db", required=True, help="output database (must not exist)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--csv-dir", help="also write the dataset CSVs here")
+    args = parser.parse_args()
+
+    generate(args.db, parse_size(args.size), seed=args.seed)
+    if args.csv_dir:
+        export_csvs(args.db, args.csv_dir)
+        print(f"CSV mirrors written to {args.csv_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+import argparse
+import time
+from datetime import date
+
+import numpy as np
+
+import db
+import result_cache
+
+# Width the wastage chart is drawn at; the chart never gets more points than this
+CHART_WIDTH_PX = 700
+# A bucket size is picked so the SQL returns at most this many times the points the chart can
+# show; largest-triangle-three-buckets then reduces them to the pixel budget
+OVERSAMPLE = 4
+
+# Bucket key for each granularity, computed in SQL over the per-day summary (agg_expiry_date).
+# Weeks start on Monday; every key is the ISO date the bucket starts on.
+BUCKETS = {
+    "day": "Date",
+    "week": "DATE(Date, '-6 days', 'weekday 1')",
+    "month": "DATE(Date, 'start of month')",
+    "year": "DATE(Date, 'start of year')",
+}
+BUCKET_DAYS = {"day": 1, "week": 7, "month": 30.44, "year": 365.25}
+
+_RANGE_SQL = "SELECT MIN(Date), MAX(Date) FROM agg_expiry_date WHERE Date != ''"
+
+
+def _bucket_sql(bucket):
+    return f'''
+        SELECT {BUCKETS[bucket]} AS Date, SUM(Wasted_Food_Count) AS Wasted_Food_Count
+        FROM agg_expiry_date
+        WHERE Date != '' AND Date BETWEEN ? AND ?
+        GROUP BY 1
+        ORDER BY 1
+    '''
+
+
+# First and last expiry day on record, as dates (None, None when there are none)
+def date_range(db_path=db.DB_PATH):
+    df = result_cache.cached_read_sql("wastage_over_time: range", _RANGE_SQL, db_path=db_path)
+    first, last = df.iloc[0]
+    if first is None:
+        return None, None
+    return date.fromisoformat(first), date.fromisoformat(last)
+
+
+# Finest bucket that keeps the SQL result within OVERSAMPLE x the pixel budget
+def choose_bucket(start, end, max_points=CHART_WIDTH_PX):
+    days = (end - start).days + 1
+    for bucket, size in BUCKET_DAYS.items():
+        if days / size <= max_points * OVERSAMPLE:
+            return bucket
+    return "year"
+
+
+# Largest-triangle-three-buckets: indices of `threshold` points that keep the visual shape of
+# (x, y), always including the first and last point
+def lttb(x, y, threshold):
+    n = len(x)
+    if threshold >= n or n <= 2:
+        return np.arange(n)
+    if threshold < 3:
+        return np.array([0, n - 1])[:max(threshold, 1)]
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    every = (n - 2) / (threshold - 2)
+    picked = np.empty(threshold, dtype=int)
+    picked[0], picked[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        next_start, next_end = end, min(int((i + 2) * every) + 1, n)
+        if next_end <= next_start:
+            next_start, next_end = n - 1, n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(area.argmax())
+        picked[i + 1] = a
+    return picked
+
+
+# Wastage counts between `start` and `end` (dates), bucketed in SQL and reduced to at most
+# `max_points` points. Returns (DataFrame of Date / Wasted_Food_Count, info dict).
+def wastage_series(start=None, end=None, max_points=CHART_WIDTH_PX, db_path=db.DB_PATH):
+    import pandas as pd
+
+    first, last = date_range(db_path)
+    if first is None:
+        return pd.DataFrame(columns=["Date", "Wasted_Food_Count"]), {"bucket": None, "buckets": 0, "points": 0}
+    start = max(start or first, first)
+    end = min(end or last, last)
+    bucket = choose_bucket(start, end, max_points)
+    df = result_cache.cached_read_sql(f"wastage_over_time: {bucket}", _bucket_sql(bucket),
+                                      params=(start.isoformat(), end.isoformat()), db_path=db_path)
+    buckets = len(df)
+    if buckets > max_points:
+        days = pd.to_datetime(df["Date"]).map(pd.Timestamp.toordinal).to_numpy()
+        df = df.iloc[lttb(days, df["Wasted_Food_Count"].to_numpy(), max_points)]
+    df = df.assign(Date=pd.to_datetime(df["Date"])).reset_index(drop=True)
+    return df, {"bucket": bucket, "buckets": buckets, "points": len(df)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show how the wastage-over-time series is downsampled")
+    parser.add_argument("--db", default=db.DB_PATH)
+    parser.add_argument("--start", type=date.fromisoformat)
+    parser.add_argument("--end", type=date.fromisoformat)
+    parser.add_argument("--width", type=int, default=CHART_WIDTH_PX)
+    args = parser.parse_args()
+
+    first, last = date_range(args.db)
+    print(f"Expiry days on record: {first} to {last}")
+    start = time.perf_counter()
+    df, info = wastage_series(args.start, args.end, args.width, args.db)
+    print(f"{info['bucket']} buckets: {info['buckets']:,} from SQL, {info['points']:,} plotted "
+          f"(width {args.width}px) in {(time.perf_counter() - start) * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()